@@ -0,0 +1,21 @@
+import hmac
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+
+load_dotenv()
+
+# Token for the bulk data endpoints from environment variable. They read
+# and write every lead's personal data, so they stay off until one is set
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Endpoint dependency: require ``Authorization: Bearer <ADMIN_API_TOKEN>``, and 404 while no token is set"""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,206 @@
+import asyncio
+import errno
+import os
+import socket
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Broker settings from environment variables
+WS_BROKER = os.getenv("WS_BROKER", "inprocess")
+WS_BROKER_DIR = os.getenv("WS_BROKER_DIR", "/tmp/chatbot-broker")
+# Messages held for a peer whose receive queue is full, and how long that
+# peer may go without accepting one before its backlog is dropped
+WS_BROKER_BACKLOG = int(os.getenv("WS_BROKER_BACKLOG", "1024"))
+WS_BROKER_SEND_TIMEOUT_MS = float(os.getenv("WS_BROKER_SEND_TIMEOUT_MS", "200"))
+
+# Receives (session_id, message_text) for delivery to this worker's sockets
+Deliver = Callable[[str, str], Awaitable[None]]
+
+
+class Broker:
+    """Pub/sub interface ConnectionManager publishes broadcasts through.
+
+    Every worker subscribes with its own deliver callback, which sends to
+    the WebSockets that worker holds.
+    """
+
+    async def start(self, deliver: Deliver):
+        raise NotImplementedError
+
+    async def publish(self, session_id: str, message_text: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InProcessBroker(Broker):
+    """Single-process broker: publishing delivers straight to local sockets"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, session_id: str, message_text: str):
+        if self._deliver:
+            await self._deliver(session_id, message_text)
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    def __init__(self, broker: "UnixSocketBroker"):
+        self.broker = broker
+        # Keep delivery tasks referenced until they finish
+        self._tasks = set()
+
+    def datagram_received(self, data: bytes, addr):
+        session_id, _, message_text = data.decode().partition("\n")
+        task = asyncio.ensure_future(self.broker._deliver(session_id, message_text))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class UnixSocketBroker(Broker):
+    """Multi-process broker for workers on one host.
+
+    Each worker binds a Unix datagram socket in a shared directory and
+    publishing sends one datagram to every peer socket found there, so no
+    separate hub process is needed. It stands in for a networked broker
+    such as Redis when running several uvicorn workers locally. Messages
+    must fit in a datagram. A peer's receive queue holds only a few
+    datagrams (net.unix.max_dgram_qlen, 10 by default), so messages for a
+    peer whose queue is full wait in a bounded per-peer backlog that a
+    background task sends in order; publishing never waits on a peer.
+    Messages are dropped (counted in ``dropped``) when a backlog overflows,
+    oldest first, or when its peer accepts nothing for ``send_timeout_ms``.
+    """
+
+    PEER_REFRESH_SECONDS = 1.0
+
+    def __init__(self,
+                 directory: str = WS_BROKER_DIR,
+                 backlog: int = WS_BROKER_BACKLOG,
+                 send_timeout_ms: float = WS_BROKER_SEND_TIMEOUT_MS):
+        self.directory = directory
+        self.backlog = backlog
+        self.send_timeout = send_timeout_ms / 1000
+        self._backlogs: Dict[str, deque] = {}
+        self._senders: Dict[str, asyncio.Task] = {}
+        self.path = os.path.join(directory, f"worker-{os.getpid()}.sock")
+        self._deliver: Optional[Deliver] = None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._sock: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_checked = 0.0
+        self.published = 0
+        self.dropped = 0
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramReceiver(self), sock=self._sock
+        )
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_checked > self.PEER_REFRESH_SECONDS:
+            self._peers = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".sock") and os.path.join(self.directory, name) != self.path
+            ]
+            self._peers_checked = now
+        return self._peers
+
+    async def publish(self, session_id: str, message_text: str):
+        self.published += 1
+        data = f"{session_id}\n{message_text}".encode()
+        for peer in self._peer_paths():
+            backlog = self._backlogs.get(peer)
+            if backlog is not None:
+                # Keep behind what the peer has not taken yet
+                self._hold(backlog, data)
+                continue
+            try:
+                self._sock.sendto(data, peer)
+            except BlockingIOError:
+                backlog = self._backlogs[peer] = deque()
+                self._hold(backlog, data)
+                self._senders[peer] = asyncio.ensure_future(self._send_backlog(peer, backlog))
+            except OSError as e:
+                self._peer_failed(peer, e)
+        # Deliver to this worker's own sockets without a round trip
+        await self._deliver(session_id, message_text)
+
+    def _hold(self, backlog: deque, data: bytes):
+        if len(backlog) >= self.backlog:
+            backlog.popleft()
+            self.dropped += 1
+        backlog.append(data)
+
+    async def _send_backlog(self, peer: str, backlog: deque):
+        """Send a peer's backlog in order, backing off while its receive queue is full"""
+        delay = 0.0005
+        last_progress = time.monotonic()
+        try:
+            while backlog:
+                try:
+                    self._sock.sendto(backlog[0], peer)
+                except BlockingIOError:
+                    if time.monotonic() - last_progress > self.send_timeout:
+                        # The peer has stopped reading; give up on what it missed
+                        self.dropped += len(backlog)
+                        return
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.02)
+                    continue
+                except OSError as e:
+                    self._peer_failed(peer, e, len(backlog))
+                    return
+                backlog.popleft()
+                delay = 0.0005
+                last_progress = time.monotonic()
+        finally:
+            self._backlogs.pop(peer, None)
+            self._senders.pop(peer, None)
+
+    def _peer_failed(self, peer: str, e: OSError, lost: int = 1):
+        if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+            # The peer worker is gone; forget its socket
+            try:
+                os.unlink(peer)
+            except OSError:
+                pass
+            self._peers_checked = 0.0
+        else:
+            print(f"Error publishing to {peer}: {e}")
+            self.dropped += lost
+
+    async def close(self):
+        for sender in list(self._senders.values()):
+            sender.cancel()
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def create_broker() -> Broker:
+    """Build the configured broker"""
+    if WS_BROKER == "unix":
+        return UnixSocketBroker()
+    return InProcessBroker()
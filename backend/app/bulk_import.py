@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, IO, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .flow import Flow
+from .models import Session, Vehicle
+
+load_dotenv()
+
+# Bulk import settings from environment variables
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Largest upload /api/import accepts, in bytes
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Answers assumed when a lead row leaves a step out
+DEFAULT_ANSWERS = {"add_another_vehicle": "no"}
+
+# Guard against flows that loop without consuming new answers
+MAX_STEPS_PER_ROW = 100
+
+# Rows parsed between yields to the event loop during long imports
+YIELD_EVERY = 1000
+
+
+def answer_text(value: Any) -> Optional[str]:
+    """Render a typed NDJSON value as the text a user would have typed, or None if it is not a scalar"""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, float) and value.is_integer():
+        # 12000.0 would otherwise lose its decimal point to the digit-only validators
+        return str(int(value))
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    return None
+
+
+def validate_row(flow: Flow, row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Walk the flow over one lead row, returning (session data, None) or (None, rejection reason)"""
+    data: Dict[str, Any] = {}
+    step = flow.steps[flow.start]
+    for _ in range(MAX_STEPS_PER_ROW):
+        if step.terminal:
+            return data, None
+        value = None
+        if step.validate:
+            answer = row.get(step.name, DEFAULT_ANSWERS.get(step.name))
+            if answer is None or answer == "":
+                return None, f"{step.name}: missing"
+            text = answer_text(answer)
+            if text is None:
+                return None, f"{step.name}: expected a single value"
+            is_valid, value, error_message = step.validate(text)
+            if not is_valid:
+                return None, f"{step.name}: {error_message}"
+            if step.name in data:
+                # Flat rows hold one vehicle, so a loop back means a repeat answer
+                return None, f"{step.name}: answered more than once"
+            data[step.name] = value
+        step = flow.steps[flow.next_step(step, value, data)]
+    return None, "flow did not complete"
+
+
+def vehicle_row(session_id: str, data: Dict[str, Any], created_at: datetime) -> Dict[str, Any]:
+    """Build the vehicle insert row for a validated lead"""
+    vehicle_data = data.get("vehicle_info", {})
+    return {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "vin": vehicle_data.get("vin"),
+        "year": vehicle_data.get("year"),
+        "make": vehicle_data.get("make"),
+        "body_type": vehicle_data.get("body_type"),
+        "vehicle_use": data.get("vehicle_use"),
+        "blind_spot_warning": bool(data.get("blind_spot", False)),
+        "commute_days_per_week": data.get("commute_days"),
+        "commute_one_way_miles": data.get("commute_miles"),
+        "annual_mileage": data.get("annual_mileage"),
+        "created_at": created_at
+    }
+
+
+async def parse_lines(f: IO[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Parse an NDJSON or CSV file into (line number, row, parse error) tuples.
+
+    CSV goes through a single reader over the whole file, so quoted fields
+    may span lines; the line number is where the record starts.
+    """
+    count = 0
+    if fmt == "csv":
+        reader = csv.reader(f)
+        header: Optional[List[str]] = None
+        line_number = 0
+        for fields in reader:
+            start, line_number = line_number + 1, reader.line_num
+            count += 1
+            if count % YIELD_EVERY == 0:
+                # Let other tasks run during long imports
+                await asyncio.sleep(0)
+            if not any(field.strip() for field in fields):
+                continue
+            if header is None:
+                header = [field.strip() for field in fields]
+                continue
+            yield start, dict(zip(header, fields)), None
+        return
+
+    for line_number, line in enumerate(f, 1):
+        if line_number % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "invalid JSON: expected an object"
+            continue
+        yield line_number, row, None
+
+
+async def import_leads(f: IO[str],
+                       fmt: str,
+                       flow: Flow,
+                       session_factory: async_sessionmaker,
+                       batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Validate and bulk insert leads, yielding rejected rows and a final summary.
+
+    Only one batch of rows is held in memory at a time, so memory use does
+    not depend on the input size.
+    """
+    start = time.perf_counter()
+    total = imported = rejected = 0
+    sessions: List[Dict[str, Any]] = []
+    vehicles: List[Dict[str, Any]] = []
+
+    async def flush():
+        nonlocal imported
+        if not sessions:
+            return
+        async with session_factory() as db:
+            await db.execute(insert(Session), sessions)
+            await db.execute(insert(Vehicle), vehicles)
+            await db.commit()
+        imported += len(sessions)
+        sessions.clear()
+        vehicles.clear()
+
+    async for line_number, row, error in parse_lines(f, fmt):
+        total += 1
+        data = None
+        if row is not None:
+            data, error = validate_row(flow, row)
+        if data is None:
+            rejected += 1
+            yield {"type": "rejected", "line": line_number, "reason": error}
+            continue
+
+        now = datetime.utcnow()
+        session_id = str(uuid.uuid4())
+        sessions.append({
+            "id": session_id,
+            "status": "completed",
+            "current_step": "complete",
+            "data": data,
+            "created_at": now,
+            "updated_at": now
+        })
+        vehicles.append(vehicle_row(session_id, data, now))
+        if len(sessions) >= batch_size:
+            await flush()
+
+    await flush()
+    elapsed = time.perf_counter() - start
+    yield {
+        "type": "summary",
+        "rows": total,
+        "imported": imported,
+        "rejected": rejected,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total / elapsed, 1) if elapsed else None
+    }
+
+
+async def _main(path: str, fmt: str, batch_size: int, rejects: Optional[str]):
+    from .chatbot import ChatBot
+    from .database import AsyncSessionLocal, async_engine
+
+    chatbot = ChatBot()
+    out = open(rejects, "w") if rejects else sys.stdout
+    try:
+        with open(path, newline="") as f:
+            async for record in import_leads(f, fmt, chatbot.flow, AsyncSessionLocal, batch_size):
+                if record["type"] == "summary":
+                    print(json.dumps(record), file=sys.stderr)
+                else:
+                    out.write(json.dumps(record) + "\n")
+    finally:
+        if rejects:
+            out.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import onboarding leads from an NDJSON or CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None,
+                        help="input format (defaults to the file extension)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--rejects", help="write rejected rows here instead of stdout")
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    asyncio.run(_main(args.path, fmt, args.batch_size, args.rejects))
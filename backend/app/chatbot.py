@@ -1,90 +1,59 @@
-import openai
-import os
+import asyncio
 import re
 import json
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, Optional, List, AsyncIterator, Callable
 from dotenv import load_dotenv
 
+from .llm_client import LLMClient
+from .llm_coalescer import PromptCoalescer
+from .llm_routing import ModelRouter
+from .prefetch import LLM_PREFETCH, Prefetcher
+from .response_cache import ResponseCache, create_response_cache
+from .error_replies import ErrorReplyTable, ERROR_REPLIES_VARIANTS
+from .flow import Flow, load_flow
+from .tracing import span
+
 load_dotenv()
 
+# Validator patterns, compiled once
+NON_DIGITS = re.compile(r'\D')
+NON_DECIMAL = re.compile(r'[^\d.]')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+VIN_PATTERN = re.compile(r'^[A-HJ-NPR-Z0-9]{17}$')
+
+# Longest placeholder held back while streaming a cached template
+PLACEHOLDER_MAX_LENGTH = 32
+
+# A routed reply: ("text", text), ("enhance", base_response, extracted_data)
+# or ("error", error_message, current_step)
+Reply = Tuple[Any, ...]
+
 class ChatBot:
-    def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        self.model = "gpt-4"
+    def __init__(self, 
+                 llm: Optional[LLMClient] = None, 
+                 response_cache: Optional[ResponseCache] = None, 
+                 error_replies: Optional[ErrorReplyTable] = None, 
+                 flow: Optional[Flow] = None,
+                 router: Optional[ModelRouter] = None,
+                 prefetcher: Optional[Prefetcher] = None):
+        self.llm = llm or LLMClient()
+        # Identical prompts in flight at once share one upstream call
+        self.prompts = PromptCoalescer(self.llm)
+        self.response_cache = response_cache if response_cache is not None else create_response_cache()
+        self.error_replies = error_replies if error_replies is not None else ErrorReplyTable.load()
+        
+        # Conversation flow, compiled from its YAML spec at startup
+        self.flow = flow if flow is not None else load_flow(self)
         
-        # Define the conversation flow
-        self.flow_steps = {
-            "zip_code": {
-                "prompt": "What's your ZIP code?",
-                "validation": self._validate_zip_code,
-                "next": "full_name"
-            },
-            "full_name": {
-                "prompt": "Great! What's your full name?",
-                "validation": self._validate_name,
-                "next": "email"
-            },
-            "email": {
-                "prompt": "Thanks! What's your email address?",
-                "validation": self._validate_email,
-                "next": "vehicle_start"
-            },
-            "vehicle_start": {
-                "prompt": "Now let's add your vehicle information. Would you like to provide the VIN or the Year, Make, and Body Type?",
-                "next": "vehicle_info"
-            },
-            "vehicle_info": {
-                "prompt": "Please provide either:\n1. Your vehicle's VIN number, or\n2. Year, Make, and Body Type (e.g., '2022 Toyota Camry Sedan')",
-                "validation": self._validate_vehicle_info,
-                "next": "vehicle_use"
-            },
-            "vehicle_use": {
-                "prompt": "How is this vehicle primarily used? (commuting, commercial, farming, or business)",
-                "validation": self._validate_vehicle_use,
-                "next": "blind_spot"
-            },
-            "blind_spot": {
-                "prompt": "Is this vehicle equipped with blind spot warning? (Yes or No)",
-                "validation": self._validate_yes_no,
-                "next": "vehicle_use_details"
-            },
-            "vehicle_use_details": {
-                "dynamic": True,  # This step changes based on vehicle use
-            },
-            "commute_days": {
-                "prompt": "How many days per week do you use this vehicle for commuting?",
-                "validation": self._validate_days,
-                "next": "commute_miles"
-            },
-            "commute_miles": {
-                "prompt": "What's the one-way distance in miles to work/school?",
-                "validation": self._validate_miles,
-                "next": "add_another_vehicle"
-            },
-            "annual_mileage": {
-                "prompt": "What's the estimated annual mileage for this vehicle?",
-                "validation": self._validate_mileage,
-                "next": "add_another_vehicle"
-            },
-            "add_another_vehicle": {
-                "prompt": "Would you like to add another vehicle? (Yes or No)",
-                "validation": self._validate_yes_no,
-                "next": "license_type"  # or back to vehicle_info if yes
-            },
-            "license_type": {
-                "prompt": "What type of US driver's license do you have? (Foreign, Personal, or Commercial)",
-                "validation": self._validate_license_type,
-                "next": "license_status"
-            },
-            "license_status": {
-                "prompt": "What's your license status? (Valid or Suspended)",
-                "validation": self._validate_license_status,
-                "next": "complete"
-            },
-            "complete": {
-                "prompt": "Thank you! I've collected all the necessary information. Your onboarding is complete!"
-            }
-        }
+        # Model, latency SLO and token budget per call kind and flow step
+        self.router = router if router is not None else ModelRouter.load(self.llm.providers, self.flow.steps)
+        
+        # Speculative replies for the next answer, if enabled
+        self.prefetcher = prefetcher if prefetcher is not None else (Prefetcher() if LLM_PREFETCH else None)
+        # Placeholder shape of the last valid answer to each step, e.g.
+        # {"year": "{vehicle_info.year}", ...} for vehicle_info; prefetch keys
+        # must use it to match the key the next turn looks up
+        self.answer_shapes: Dict[str, Any] = {}
     
     async def get_greeting(self) -> str:
         """Get initial greeting message"""
@@ -93,107 +62,96 @@ class ChatBot:
     async def process_message(self, 
                             message: str, 
                             current_step: str, 
-                            session_data: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+                            session_data: Dict[str, Any],
+                            session_id: Optional[str] = None) -> Tuple[str, str, Dict[str, Any]]:
         """Process user message and return response, next step, and extracted data"""
-        
-        # Get current step configuration
-        step_config = self.flow_steps.get(current_step, {})
-        
-        # Handle dynamic steps
-        if step_config.get("dynamic"):
-            return await self._handle_dynamic_step(message, current_step, session_data)
+        with span("route"):
+            reply, next_step, extracted_data = self._route_message(message, current_step, session_data)
+        with span("llm"):
+            response = await self._render_reply(reply, session_id)
+        return response, next_step, extracted_data
+    
+    async def process_message_stream(self, 
+                                   message: str, 
+                                   current_step: str, 
+                                   session_data: Dict[str, Any],
+                                   session_id: Optional[str] = None) -> Tuple[AsyncIterator[str], str, Dict[str, Any]]:
+        """Process user message and return a stream of response deltas, next step, and extracted data"""
+        with span("route"):
+            reply, next_step, extracted_data = self._route_message(message, current_step, session_data)
+        return self._render_reply_stream(reply, session_id), next_step, extracted_data
+    
+    def _route_message(self, 
+                       message: str, 
+                       current_step: str, 
+                       session_data: Dict[str, Any]) -> Tuple[Reply, str, Dict[str, Any]]:
+        """Validate the message and decide the reply, next step, and extracted data"""
+        step = self.flow.steps.get(current_step)
+        if step is None:
+            return ("text", "I'm not sure how to proceed. Let me help you."), current_step, {}
         
         # Validate input if validation exists
         extracted_data = {}
-        validation_func = step_config.get("validation")
-        
-        if validation_func:
-            is_valid, cleaned_value, error_message = validation_func(message)
+        value = None
+        if step.validate:
+            is_valid, value, error_message = step.validate(message)
             
             if not is_valid:
                 # Use AI to generate a friendly error message
-                response = await self._generate_error_response(error_message, current_step)
-                return response, current_step, {}
+                return ("error", error_message, current_step), current_step, {}
             
             # Store the validated data
-            extracted_data[current_step] = cleaned_value
-        else:
-    # If no validation function and has a next step, just move forward
-            if "next" in step_config:
-                next_step = step_config["next"]
-                if next_step in self.flow_steps:
-                    response = self.flow_steps[next_step].get("prompt", "")
-                    response = await self._enhance_response(response, {})
-                    return response, next_step, {}
+            extracted_data[current_step] = value
         
-        # Determine next step
-        next_step = self._determine_next_step(current_step, message, session_data)
+        # Look up the next step in the compiled transition table
+        next_step = self.flow.next_step(step, value, session_data)
         
-        # Generate response for next step
-        if next_step in self.flow_steps:
-            response = self.flow_steps[next_step].get("prompt", "")
-            
-            # Use AI to make the response more conversational
-            response = await self._enhance_response(response, extracted_data)
+        # Use AI to make the next prompt more conversational
+        return ("enhance", self.flow.steps[next_step].prompt, extracted_data), next_step, extracted_data
+    
+    async def _render_reply(self, reply: Reply, session_id: Optional[str] = None) -> str:
+        """Turn a routed reply into its final text"""
+        kind = reply[0]
+        if kind == "error":
+            return await self._generate_error_response(reply[1], reply[2])
+        if kind == "enhance":
+            return await self._enhance_response(reply[1], reply[2], session_id)
+        return reply[1]
+    
+    async def _render_reply_stream(self, reply: Reply, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Turn a routed reply into a stream of text deltas"""
+        kind = reply[0]
+        if kind == "error":
+            error_message, current_step = reply[1], reply[2]
+            precomputed = self.error_replies.get(current_step, error_message)
+            if precomputed is not None:
+                yield precomputed
+                return
+            fallback = f"I couldn't process that. {error_message} Please try again."
+            async for delta in self._stream_completion(
+                self._error_prompt(error_message, current_step),
+                fallback,
+                on_complete=lambda text: self.error_replies.add(current_step, error_message, text),
+                call_site="error",
+                step=current_step
+            ):
+                yield delta
+        elif kind == "enhance" and reply[2]:
+            async for delta in self._enhance_response_stream(reply[1], reply[2], session_id):
+                yield delta
         else:
-            response = "Thank you for providing that information."
-        
-        return response, next_step, extracted_data
+            yield reply[1]
     
-    def _determine_next_step(self, current_step: str, message: str, session_data: Dict[str, Any]) -> str:
-        """Determine the next step in the flow"""
-        step_config = self.flow_steps.get(current_step, {})
-        
-        # Handle special cases
-        if current_step == "add_another_vehicle":
-            if self._is_affirmative(message):
-                return "vehicle_info"
-            else:
-                return "license_type"
-        
-        if current_step == "blind_spot":
-            vehicle_use = session_data.get("vehicle_use", "").lower()
-            if vehicle_use == "commuting":
-                return "commute_days"
-            elif vehicle_use in ["commercial", "farming", "business"]:
-                return "annual_mileage"
-            else:
-                return "add_another_vehicle"
-        
-        if current_step == "license_type":
-            license_type = message.lower()
-            if license_type in ["personal", "commercial"]:
-                return "license_status"
-            else:
-                return "complete"
-        
-        return step_config.get("next", "complete")
-    
-    async def _handle_dynamic_step(self, 
-                                 message: str, 
-                                 current_step: str, 
-                                 session_data: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
-        """Handle dynamic flow steps"""
-        if current_step == "vehicle_use_details":
-            vehicle_use = session_data.get("vehicle_use", "").lower()
-            
-            if vehicle_use == "commuting":
-                next_step = "commute_days"
-                response = self.flow_steps["commute_days"]["prompt"]
-            elif vehicle_use in ["commercial", "farming", "business"]:
-                next_step = "annual_mileage"
-                response = self.flow_steps["annual_mileage"]["prompt"]
-            else:
-                next_step = "add_another_vehicle"
-                response = self.flow_steps["add_another_vehicle"]["prompt"]
-            
-            return response, next_step, {}
-        
-        return "I'm not sure how to proceed. Let me help you.", current_step, {}
+    def _chat_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Wrap a prompt in the assistant's chat messages"""
+        return [
+            {"role": "system", "content": "You are a friendly onboarding assistant."},
+            {"role": "user", "content": prompt}
+        ]
     
-    async def _generate_error_response(self, error_message: str, current_step: str) -> str:
-        """Generate a friendly error response using AI"""
-        prompt = f"""
+    def _error_prompt(self, error_message: str, current_step: str) -> str:
+        """Build the LLM prompt for a friendly error response"""
+        return f"""
         The user provided invalid input for {current_step.replace('_', ' ')}.
         Error: {error_message}
         
@@ -205,53 +163,274 @@ class ChatBot:
         
         Keep it conversational and helpful, not robotic.
         """
+    
+    def _enhance_prompt(self, base_response: str, extracted_data: Dict[str, Any], templated: bool = False) -> str:
+        """Build the LLM prompt for a conversational response"""
+        placeholders = ""
+        if templated:
+            placeholders = "Values in curly braces like {zip_code} are placeholders. Copy them exactly as written, braces included."
+        return f"""
+        The user just provided: {json.dumps(extracted_data)}
+        {placeholders}
         
+        Enhance this response to acknowledge what they said and then ask the next question:
+        "{base_response}"
+        
+        Keep it natural, friendly, and conversational. Don't be overly enthusiastic.
+        """
+    
+    def _templatize(self, extracted_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Replace typed values with placeholders, returning the template data and placeholder values"""
+        template_data = {}
+        values = {}
+        for step, value in extracted_data.items():
+            if step in self.flow.categorical_steps:
+                template_data[step] = value
+            elif isinstance(value, dict):
+                template_data[step] = {}
+                for field, field_value in value.items():
+                    placeholder = f"{{{step}.{field}}}"
+                    template_data[step][field] = placeholder
+                    values[placeholder] = str(field_value)
+            else:
+                placeholder = f"{{{step}}}"
+                template_data[step] = placeholder
+                values[placeholder] = str(value)
+        return template_data, values
+    
+    def _fill_template(self, template: str, values: Dict[str, str]) -> str:
+        """Fill placeholders in a cached template with the user's values"""
+        for placeholder, value in values.items():
+            template = template.replace(placeholder, value)
+        return template
+    
+    async def _complete(self,
+                        prompt: str,
+                        call_site: str,
+                        step: Optional[str],
+                        kind: Optional[str] = None,
+                        coalesce: bool = True) -> str:
+        """Run one completion on the model routed for this call kind and step.
+        
+        ``kind`` is the route's call kind when it differs from the metrics
+        call site. Raises LookupError when every routed model is over its
+        SLO, so callers fall back to their static text as they do on LLM errors.
+        Without ``coalesce`` the call is not shared with identical prompts,
+        so cancelling this call cancels the upstream request.
+        """
+        choice = self.router.choose(kind or call_site, step)
+        if choice is None:
+            raise LookupError(f"No model within its latency SLO for {call_site} at {step}")
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a friendly onboarding assistant."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await (self.prompts if coalesce else self.llm).complete(
+                messages=self._chat_messages(prompt),
                 temperature=0.7,
-                max_tokens=150
+                call_site=call_site,
+                **choice.params
             )
-            return response.choices[0].message.content.strip()
+        except Exception:
+            self.router.record(choice, ok=False)
+            raise
+        self.router.record(choice)
+        return response
+    
+    async def _stream_completion(self, 
+                                 prompt: str, 
+                                 fallback: str, 
+                                 on_complete: Optional[Callable[[str], None]] = None,
+                                 call_site: str = "enhance",
+                                 step: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream completion deltas, yielding the fallback if the LLM fails before any output"""
+        choice = self.router.choose(call_site, step, streaming=True)
+        if choice is None:
+            yield fallback
+            return
+        emitted = False
+        parts = []
+        try:
+            async for delta in self.prompts.stream(
+                messages=self._chat_messages(prompt),
+                temperature=0.7,
+                call_site=call_site,
+                **choice.params
+            ):
+                if not emitted:
+                    self.router.record(choice)
+                emitted = True
+                parts.append(delta)
+                yield delta
+        except Exception:
+            if not emitted:
+                self.router.record(choice, ok=False)
+                yield fallback
+            return
+        if on_complete:
+            on_complete("".join(parts).strip())
+    
+    async def _generate_error_response(self, error_message: str, current_step: str) -> str:
+        """Generate a friendly error response, preferring the precomputed table over the LLM"""
+        precomputed = self.error_replies.get(current_step, error_message)
+        if precomputed is not None:
+            return precomputed
+        
+        try:
+            response = await self._complete(self._error_prompt(error_message, current_step), "error", current_step)
         except:
             return f"I couldn't process that. {error_message} Please try again."
+        self.error_replies.add(current_step, error_message, response)
+        return response
+    
+    def error_pairs(self) -> List[Tuple[str, str]]:
+        """List every (step, error message) pair the validators can produce"""
+        pairs = []
+        for step in self.flow.steps.values():
+            if step.validate:
+                # Each validator has a single error message, returned for empty input
+                is_valid, _, error_message = step.validate("")
+                if not is_valid:
+                    pairs.append((step.name, error_message))
+        return pairs
+    
+    async def precompute_error_replies(self, variants: int = ERROR_REPLIES_VARIANTS) -> int:
+        """Generate missing error reply variants into the table, returning how many were added"""
+        needed = self.error_replies.missing(self.error_pairs(), variants)
+        
+        async def generate(step: str, error_message: str) -> Optional[str]:
+            # Straight to the client: identical prompts here are meant to yield distinct variants
+            try:
+                return await self.llm.complete(
+                    messages=self._chat_messages(self._error_prompt(error_message, step)),
+                    temperature=0.9,
+                    max_tokens=150,
+                    call_site="precompute"
+                )
+            except Exception:
+                return None
+        
+        replies = await asyncio.gather(*[generate(step, error) for step, error in needed])
+        added = 0
+        for (step, error_message), reply in zip(needed, replies):
+            if reply and self.error_replies.add(step, error_message, reply, variants):
+                added += 1
+        return added
     
-    async def _enhance_response(self, base_response: str, extracted_data: Dict[str, Any]) -> str:
+    def _template_key(self, base_response: str, template_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Response cache (and prefetch) key: the next prompt and the data shape"""
+        return base_response, json.dumps(template_data, sort_keys=True)
+    
+    def prefetch(self, session_id: str, step_name: str, session_data: Dict[str, Any]) -> bool:
+        """Start generating the template the answer to ``step_name`` will most likely need.
+        
+        Only free-text steps are predicted: their template depends on the
+        next prompt and the answer's placeholders, not on the answer itself.
+        Structured answers (such as a VIN or a year, make and body type) are
+        assumed to take the shape the step's last answer had.
+        """
+        if self.prefetcher is None:
+            return False
+        step = self.flow.steps.get(step_name)
+        if step is None or step.validate is None or step.categorical or step.branch_on == "value":
+            return False
+        base_response = self.flow.steps[self.flow.next_step(step, None, session_data)].prompt
+        template_data = {step_name: self.answer_shapes.get(step_name, f"{{{step_name}}}")}
+        key = self._template_key(base_response, template_data)
+        if self.response_cache is not None and self.response_cache.ready(key):
+            return False
+        prompt = self._enhance_prompt(base_response, template_data, templated=True)
+        # Not coalesced: a discarded prefetch must cancel its own upstream call
+        return self.prefetcher.start(
+            session_id, step_name, key,
+            lambda: self._complete(prompt, "prefetch", step_name, kind="enhance", coalesce=False),
+            expected_tokens=self.router.route("enhance", step_name).max_tokens
+        )
+    
+    async def _ready_template(self, session_id: Optional[str], step: str, key: Tuple[str, str]) -> Optional[str]:
+        """A template for the reply that needs no LLM call: cached, or prefetched for this session if it fits"""
+        template = self.response_cache.get(key) if self.response_cache is not None else None
+        if self.prefetcher is None or session_id is None:
+            return template
+        if template is not None:
+            self.prefetcher.drop(session_id, step)
+            return template
+        template = await self.prefetcher.take(session_id, step, key)
+        if template is not None and self.response_cache is not None:
+            self.response_cache.add(key, template)
+        return template
+    
+    async def _enhance_response(self, base_response: str, extracted_data: Dict[str, Any], session_id: Optional[str] = None) -> str:
         """Enhance response to be more conversational"""
         if not extracted_data:
             return base_response
+        # The step just answered, which the call is routed by
+        step = next(iter(extracted_data))
         
-        prompt = f"""
-        The user just provided: {json.dumps(extracted_data)}
-        
-        Enhance this response to acknowledge what they said and then ask the next question:
-        "{base_response}"
+        # Serve from a cached or prefetched template keyed on the next prompt and the data shape
+        template_data, values = self._templatize(extracted_data)
+        self.answer_shapes[step] = template_data[step]
+        key = self._template_key(base_response, template_data)
+        template = await self._ready_template(session_id, step, key)
+        if template is not None:
+            return self._fill_template(template, values)
         
-        Keep it natural, friendly, and conversational. Don't be overly enthusiastic.
-        """
+        if self.response_cache is None:
+            try:
+                return await self._complete(self._enhance_prompt(base_response, extracted_data), "enhance", step)
+            except:
+                return base_response
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a friendly onboarding assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=150
+            template = await self._complete(
+                self._enhance_prompt(base_response, template_data, templated=True), "enhance", step
             )
-            return response.choices[0].message.content.strip()
         except:
             return base_response
+        self.response_cache.add(key, template)
+        return self._fill_template(template, values)
+    
+    async def _enhance_response_stream(self, 
+                                       base_response: str, 
+                                       extracted_data: Dict[str, Any], 
+                                       session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream an enhanced response, serving and filling the response cache like _enhance_response"""
+        step = next(iter(extracted_data))
+        template_data, values = self._templatize(extracted_data)
+        self.answer_shapes[step] = template_data[step]
+        key = self._template_key(base_response, template_data)
+        template = await self._ready_template(session_id, step, key)
+        if template is not None:
+            yield self._fill_template(template, values)
+            return
+        
+        if self.response_cache is None:
+            async for delta in self._stream_completion(
+                self._enhance_prompt(base_response, extracted_data), base_response, step=step
+            ):
+                yield delta
+            return
+        
+        # Stream the template, holding back text that may be an unfinished placeholder
+        pending = ""
+        async for delta in self._stream_completion(
+            self._enhance_prompt(base_response, template_data, templated=True),
+            base_response,
+            on_complete=lambda text: self.response_cache.add(key, text),
+            step=step
+        ):
+            pending += delta
+            cut = pending.rfind("{")
+            if cut != -1 and "}" not in pending[cut:] and len(pending) - cut <= PLACEHOLDER_MAX_LENGTH:
+                ready, pending = pending[:cut], pending[cut:]
+            else:
+                ready, pending = pending, ""
+            if ready:
+                yield self._fill_template(ready, values)
+        if pending:
+            yield self._fill_template(pending, values)
     
     # Validation functions
     def _validate_zip_code(self, value: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """Validate ZIP code"""
-        cleaned = re.sub(r'\D', '', value)
+        cleaned = NON_DIGITS.sub('', value)
         if len(cleaned) == 5 or (len(cleaned) == 9 and cleaned[5:].isdigit()):
             return True, cleaned[:5], None
         return False, None, "Please provide a valid 5-digit ZIP code"
@@ -265,9 +444,8 @@ class ChatBot:
     
     def _validate_email(self, value: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """Validate email address"""
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         cleaned = value.strip().lower()
-        if re.match(email_pattern, cleaned):
+        if EMAIL_PATTERN.match(cleaned):
             return True, cleaned, None
         return False, None, "Please provide a valid email address"
     
@@ -276,8 +454,7 @@ class ChatBot:
         cleaned = value.strip()
         
         # Check if it's a VIN (17 characters, alphanumeric)
-        vin_pattern = r'^[A-HJ-NPR-Z0-9]{17}$'
-        if re.match(vin_pattern, cleaned.upper()):
+        if VIN_PATTERN.match(cleaned.upper()):
             return True, {"vin": cleaned.upper()}, None
         
         # Try to parse Year/Make/Body
@@ -319,7 +496,7 @@ class ChatBot:
     def _validate_days(self, value: str) -> Tuple[bool, Optional[int], Optional[str]]:
         """Validate days per week"""
         try:
-            days = int(re.sub(r'\D', '', value))
+            days = int(NON_DIGITS.sub('', value))
             if 0 <= days <= 7:
                 return True, days, None
         except ValueError:
@@ -329,7 +506,7 @@ class ChatBot:
     def _validate_miles(self, value: str) -> Tuple[bool, Optional[float], Optional[str]]:
         """Validate miles"""
         try:
-            miles = float(re.sub(r'[^\d.]', '', value))
+            miles = float(NON_DECIMAL.sub('', value))
             if 0 <= miles <= 500:
                 return True, miles, None
         except ValueError:
@@ -339,7 +516,7 @@ class ChatBot:
     def _validate_mileage(self, value: str) -> Tuple[bool, Optional[int], Optional[str]]:
         """Validate annual mileage"""
         try:
-            mileage = int(re.sub(r'\D', '', value))
+            mileage = int(NON_DIGITS.sub('', value))
             if 0 <= mileage <= 200000:
                 return True, mileage, None
         except ValueError:
@@ -365,8 +542,3 @@ class ChatBot:
         elif "suspend" in cleaned:
             return True, "suspended", None
         return False, None, "Please specify: Valid or Suspended"
-    
-    def _is_affirmative(self, value: str) -> bool:
-        """Check if response is affirmative"""
-        affirmative = ["yes", "y", "yeah", "yep", "sure", "ok", "okay"]
-        return value.strip().lower() in affirmative
\ No newline at end of file
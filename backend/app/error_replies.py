@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Error reply table settings from environment variables
+ERROR_REPLIES_PATH = os.getenv(
+    "ERROR_REPLIES_PATH",
+    os.path.join(os.path.dirname(__file__), "error_replies.json")
+)
+ERROR_REPLIES_VARIANTS = int(os.getenv("ERROR_REPLIES_VARIANTS", "3"))
+ERROR_REPLIES_WARM = os.getenv("ERROR_REPLIES_WARM", "false").lower() == "true"
+
+
+class ErrorReplyTable:
+    """Friendly replies for validation failures, keyed by (step, error message).
+
+    The table ships as ``error_replies.json`` next to this module, covering
+    every pair the onboarding flow can produce; it is loaded at boot so
+    invalid input can be answered without calling the LLM. Pairs added by a
+    flow change are filled in with ``python -m app.error_replies`` (only
+    missing variants are generated) or at startup with ERROR_REPLIES_WARM.
+    """
+
+    def __init__(self, replies: Optional[Dict[Tuple[str, str], List[str]]] = None):
+        self.replies: Dict[Tuple[str, str], List[str]] = replies or {}
+
+    @classmethod
+    def load(cls, path: str = ERROR_REPLIES_PATH) -> "ErrorReplyTable":
+        """Load the table from disk, starting empty if the file does not exist"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            rows = json.load(f)
+        return cls({(row["step"], row["error"]): list(row["variants"]) for row in rows})
+
+    def save(self, path: str = ERROR_REPLIES_PATH):
+        """Write the table to disk atomically"""
+        rows = [
+            {"step": step, "error": error, "variants": variants}
+            for (step, error), variants in sorted(self.replies.items())
+        ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(rows, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def get(self, step: str, error: str) -> Optional[str]:
+        """Return a random reply variant for the pair, if any"""
+        variants = self.replies.get((step, error))
+        if not variants:
+            return None
+        return random.choice(variants)
+
+    def add(self, step: str, error: str, reply: str, max_variants: int = ERROR_REPLIES_VARIANTS) -> bool:
+        """Add a reply variant for the pair, up to max_variants, returning whether it was added"""
+        variants = self.replies.setdefault((step, error), [])
+        if len(variants) >= max_variants or reply in variants:
+            return False
+        variants.append(reply)
+        return True
+
+    def missing(self, pairs: Iterable[Tuple[str, str]], variants: int = ERROR_REPLIES_VARIANTS) -> List[Tuple[str, str]]:
+        """Return one entry per variant still needed for each pair"""
+        needed = []
+        for pair in pairs:
+            needed.extend([pair] * max(0, variants - len(self.replies.get(pair, []))))
+        return needed
+
+
+async def _main(path: str, variants: int):
+    from .chatbot import ChatBot
+
+    chatbot = ChatBot()
+    chatbot.error_replies = ErrorReplyTable.load(path)
+    try:
+        generated = await chatbot.precompute_error_replies(variants)
+    finally:
+        await chatbot.llm.close()
+    chatbot.error_replies.save(path)
+    print(f"Generated {generated} replies for {len(chatbot.error_replies.replies)} step/error pairs into {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute friendly replies for validation errors")
+    parser.add_argument("--path", default=ERROR_REPLIES_PATH)
+    parser.add_argument("--variants", type=int, default=ERROR_REPLIES_VARIANTS)
+    args = parser.parse_args()
+    asyncio.run(_main(args.path, args.variants))
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from . import wire
+from .flow import Flow
+from .models import Message, Session, SessionStatus, Vehicle
+from .pagination import Cursor, decode_cursor, encode_cursor, row_cursor
+
+load_dotenv()
+
+# Export settings from environment variables: sessions fetched per
+# round trip from the server-side cursor, and how often the CLI reports progress
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_PROGRESS_EVERY = int(os.getenv("EXPORT_PROGRESS_EVERY", "100000"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+SESSION_FIELDS = ("id", "created_at", "updated_at", "status", "current_step")
+VEHICLE_FIELDS = (
+    "id", "vin", "year", "make", "body_type", "vehicle_use", "blind_spot_warning",
+    "commute_days_per_week", "commute_one_way_miles", "annual_mileage", "created_at"
+)
+MESSAGE_FIELDS = ("id", "sender", "content", "created_at")
+
+
+def flatten(data: Optional[Dict[str, Any]], prefix: str = "data.") -> Dict[str, Any]:
+    """Session data as one ``data.<step>`` field per collected answer"""
+    return {f"{prefix}{key}": value for key, value in (data or {}).items()}
+
+
+def session_columns(flow: Flow) -> List[str]:
+    """Session fields, then one ``data.<step>`` column per answering flow step in flow order"""
+    return list(SESSION_FIELDS) + [f"data.{name}" for name, step in flow.steps.items() if step.validate]
+
+
+def csv_columns(flow: Flow, transcripts: bool) -> List[str]:
+    """CSV header: session columns, vehicle fields, then the transcript and resume cursor"""
+    columns = session_columns(flow) + [f"vehicle.{field}" for field in VEHICLE_FIELDS]
+    if transcripts:
+        columns.append("transcript")
+    return columns + ["cursor"]
+
+
+def _cell(value: Any) -> Any:
+    """CSV cell for a value; nested answers such as vehicle_info are written as JSON"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return wire.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+class ExportQuery:
+    """Which sessions to export: a creation date range, statuses and a resume cursor"""
+
+    def __init__(self,
+                 since: Optional[datetime] = None,
+                 until: Optional[datetime] = None,
+                 statuses: Sequence[str] = (),
+                 cursor: Optional[str] = None):
+        self.since = since
+        self.until = until
+        # Raises ValueError for an unknown status or a malformed cursor
+        self.statuses = [SessionStatus(status) for status in statuses]
+        self.after: Optional[Cursor] = decode_cursor(cursor) if cursor else None
+
+    def where(self) -> list:
+        clauses = []
+        if self.since is not None:
+            clauses.append(Session.created_at >= self.since)
+        if self.until is not None:
+            clauses.append(Session.created_at < self.until)
+        if self.statuses:
+            clauses.append(Session.status.in_(self.statuses))
+        if self.after is not None:
+            created_at, session_id = self.after
+            clauses.append(or_(Session.created_at > created_at,
+                               and_(Session.created_at == created_at, Session.id > session_id)))
+        return clauses
+
+
+async def export_sessions(session_factory: async_sessionmaker,
+                          query: ExportQuery,
+                          fmt: str,
+                          flow: Flow,
+                          transcripts: bool = False,
+                          batch_size: int = EXPORT_BATCH_SIZE,
+                          summary: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """Stream sessions with their answers, vehicles and optionally transcripts as NDJSON or CSV text.
+
+    Sessions come from a server-side cursor in (created_at, id) order,
+    ``batch_size`` at a time, and each batch's vehicles and messages are
+    read with one query each, so memory use does not depend on how many
+    sessions match. Every record carries the cursor to resume after it.
+    NDJSON has one record per session and ends with a summary record; CSV
+    has one row per vehicle (or one row for a session without vehicles).
+    ``summary``, if given, is kept up to date with the counts after each
+    batch and gets the elapsed time and rate at the end.
+    """
+    start = time.perf_counter()
+    summary = summary if summary is not None else {}
+    sessions = rows = 0
+    last_cursor: Optional[str] = encode_cursor(query.after) if query.after else None
+    head = session_columns(flow)
+    if fmt == "csv":
+        yield _csv_text([csv_columns(flow, transcripts)])
+
+    # The streaming connection is busy until the cursor is exhausted, so
+    # child rows are read on a second one
+    async with session_factory() as db, session_factory() as children:
+        result = await db.stream(
+            select(Session.__table__).where(*query.where())
+            .order_by(Session.created_at, Session.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for batch in result.mappings().partitions():
+            ids = [session["id"] for session in batch]
+            vehicles: Dict[str, List[Dict[str, Any]]] = {session_id: [] for session_id in ids}
+            for vehicle in (await children.execute(
+                select(Vehicle.__table__).where(Vehicle.session_id.in_(ids))
+                .order_by(Vehicle.session_id, Vehicle.created_at, Vehicle.id)
+            )).mappings():
+                vehicles[vehicle["session_id"]].append({field: vehicle[field] for field in VEHICLE_FIELDS})
+            messages: Dict[str, List[Dict[str, Any]]] = {session_id: [] for session_id in ids}
+            if transcripts:
+                for message in (await children.execute(
+                    select(Message.__table__).where(Message.session_id.in_(ids))
+                    .order_by(Message.session_id, Message.created_at, Message.id)
+                )).mappings():
+                    messages[message["session_id"]].append({field: message[field] for field in MESSAGE_FIELDS})
+            # Release the children connection's snapshot between batches
+            await children.rollback()
+
+            lines = []
+            for session in batch:
+                last_cursor = encode_cursor(row_cursor(session))
+                record = {field: session[field] for field in SESSION_FIELDS}
+                record.update(flatten(session["data"]))
+                if fmt == "csv":
+                    base = [_cell(record.get(column)) for column in head]
+                    tail = ([wire.dumps(messages[session["id"]])] if transcripts else []) + [last_cursor]
+                    for vehicle in vehicles[session["id"]] or [{}]:
+                        lines.append(base + [_cell(vehicle.get(field)) for field in VEHICLE_FIELDS] + tail)
+                else:
+                    record["vehicles"] = vehicles[session["id"]]
+                    if transcripts:
+                        record["messages"] = messages[session["id"]]
+                    record["cursor"] = last_cursor
+                    lines.append(wire.dumps(dict(type="session", **record)))
+            sessions += len(batch)
+            rows += len(lines)
+            summary.update(sessions=sessions, rows=rows, cursor=last_cursor)
+            yield _csv_text(lines) if fmt == "csv" else "\n".join(lines) + "\n"
+
+    elapsed = time.perf_counter() - start
+    totals = {
+        "type": "summary",
+        "sessions": sessions,
+        "rows": rows,
+        "cursor": last_cursor,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None
+    }
+    summary.update(totals)
+    if fmt == "ndjson":
+        yield wire.dumps(totals) + "\n"
+
+
+def _csv_text(rows: List[List[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+async def _main(out_path: Optional[str], fmt: str, query: ExportQuery, transcripts: bool, batch_size: int):
+    from .chatbot import ChatBot
+    from .database import AsyncSessionLocal, async_engine
+
+    flow = ChatBot().flow
+    out = open(out_path, "w", newline="") if out_path else sys.stdout
+    summary: Dict[str, Any] = {}
+    start = time.perf_counter()
+    reported = 0
+    try:
+        async for chunk in export_sessions(AsyncSessionLocal, query, fmt, flow, transcripts, batch_size, summary):
+            out.write(chunk)
+            sessions = summary.get("sessions", 0)
+            if sessions - reported >= EXPORT_PROGRESS_EVERY:
+                reported = sessions
+                elapsed = time.perf_counter() - start
+                print(f"Exported {sessions} sessions ({sessions / elapsed:.0f}/s), "
+                      f"resume with --cursor {summary['cursor']}", file=sys.stderr)
+    finally:
+        if out_path:
+            out.close()
+        await async_engine.dispose()
+    # NDJSON output already ends with the summary; CSV output cannot hold it
+    print(wire.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export sessions with their answers, vehicles and transcripts")
+    parser.add_argument("--out", help="write here instead of stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="output format (defaults to the --out extension, else ndjson)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="sessions created at or after this time")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="sessions created before this time")
+    parser.add_argument("--status", action="append", default=[], choices=[status.value for status in SessionStatus])
+    parser.add_argument("--cursor", help="resume after this cursor (from the last record or summary)")
+    parser.add_argument("--transcripts", action="store_true", help="include each session's messages")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.out and args.out.endswith(".csv") else "ndjson")
+    try:
+        export_query = ExportQuery(args.since, args.until, args.status, args.cursor)
+    except ValueError as e:
+        parser.error(str(e))
+    asyncio.run(_main(args.out, fmt, export_query, args.transcripts, args.batch_size))
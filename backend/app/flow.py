@@ -0,0 +1,144 @@
+import os
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Flow spec location from environment variable
+FLOW_SPEC_PATH = os.getenv(
+    "FLOW_SPEC_PATH",
+    os.path.join(os.path.dirname(__file__), "flows", "onboarding.yaml")
+)
+
+Validator = Callable[[str], Tuple[bool, Any, Optional[str]]]
+
+
+class FlowSpecError(ValueError):
+    """Raised when a flow spec is malformed, has unreachable steps or dead ends"""
+
+
+class Step:
+    """One compiled flow step"""
+
+    __slots__ = ("name", "prompt", "validate", "next", "branch_on", "cases", "terminal", "categorical")
+
+    def __init__(self,
+                 name: str,
+                 prompt: str,
+                 validate: Optional[Validator] = None,
+                 next: Optional[str] = None,
+                 branch_on: Optional[str] = None,
+                 cases: Optional[Dict[Any, str]] = None,
+                 terminal: bool = False,
+                 categorical: bool = False):
+        self.name = name
+        self.prompt = prompt
+        self.validate = validate
+        self.next = next
+        self.branch_on = branch_on
+        self.cases = cases or {}
+        self.terminal = terminal
+        self.categorical = categorical
+
+    def targets(self) -> Set[str]:
+        """Every step this step can transition to"""
+        targets = set(self.cases.values())
+        if self.next:
+            targets.add(self.next)
+        return targets
+
+
+class Flow:
+    """A validated flow compiled into a transition table"""
+
+    def __init__(self, start: str, steps: Dict[str, Step]):
+        self.start = start
+        self.steps = steps
+        self.categorical_steps = frozenset(name for name, step in steps.items() if step.categorical)
+
+    def next_step(self, step: Step, value: Any, session_data: Dict[str, Any]) -> str:
+        """Return the step after `step`, given its validated value and the session data"""
+        if step.branch_on is None:
+            return step.next or step.name
+        key = value if step.branch_on == "value" else session_data.get(step.branch_on)
+        return step.cases.get(key, step.next)
+
+
+def compile_flow(spec: Dict[str, Any], validators: Any) -> Flow:
+    """Validate a flow spec and compile it against the `_validate_<name>` methods of `validators`"""
+    start = spec.get("start")
+    raw_steps = spec.get("steps") or {}
+    if start not in raw_steps:
+        raise FlowSpecError(f"Start step {start!r} is not defined")
+
+    steps = {}
+    for name, raw in raw_steps.items():
+        validate = None
+        if raw.get("validator"):
+            validate = getattr(validators, f"_validate_{raw['validator']}", None)
+            if validate is None:
+                raise FlowSpecError(f"Step {name!r} uses unknown validator {raw['validator']!r}")
+
+        branch = raw.get("branch")
+        if branch is not None and raw.get("next"):
+            raise FlowSpecError(f"Step {name!r} has both next and branch")
+        if branch is not None and "default" not in branch:
+            raise FlowSpecError(f"Step {name!r} branch has no default")
+        if branch is not None and branch.get("by") != "value" and branch.get("by") not in raw_steps:
+            raise FlowSpecError(f"Step {name!r} branches on unknown step {branch.get('by')!r}")
+
+        steps[name] = Step(
+            name=name,
+            prompt=raw.get("prompt", ""),
+            validate=validate,
+            next=branch["default"] if branch is not None else raw.get("next"),
+            branch_on=branch["by"] if branch is not None else None,
+            cases=dict(branch.get("cases") or {}) if branch is not None else None,
+            terminal=bool(raw.get("terminal")),
+            categorical=bool(raw.get("categorical"))
+        )
+
+    for step in steps.values():
+        for target in step.targets():
+            if target not in steps:
+                raise FlowSpecError(f"Step {step.name!r} leads to undefined step {target!r}")
+        if not step.terminal and not step.targets():
+            raise FlowSpecError(f"Step {step.name!r} is a dead end: no next step and not terminal")
+
+    # Every step must be reachable from the start...
+    reachable = _walk({start}, lambda name: steps[name].targets())
+    unreachable = set(steps) - reachable
+    if unreachable:
+        raise FlowSpecError(f"Unreachable steps: {', '.join(sorted(unreachable))}")
+
+    # ...and every step must be able to reach a terminal step
+    predecessors: Dict[str, Set[str]] = {name: set() for name in steps}
+    for step in steps.values():
+        for target in step.targets():
+            predecessors[target].add(step.name)
+    finishing = _walk({name for name, step in steps.items() if step.terminal}, lambda name: predecessors[name])
+    stuck = set(steps) - finishing
+    if stuck:
+        raise FlowSpecError(f"Steps that can never reach a terminal step: {', '.join(sorted(stuck))}")
+
+    return Flow(start, steps)
+
+
+def load_flow(validators: Any, path: str = FLOW_SPEC_PATH) -> Flow:
+    """Load and compile a YAML flow spec"""
+    with open(path) as f:
+        return compile_flow(yaml.safe_load(f), validators)
+
+
+def _walk(roots: Set[str], neighbours: Callable[[str], Set[str]]) -> Set[str]:
+    seen = set(roots)
+    queue = deque(roots)
+    while queue:
+        for name in neighbours(queue.popleft()):
+            if name not in seen:
+                seen.add(name)
+                queue.append(name)
+    return seen
@@ -0,0 +1,242 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from .llm_providers import LatencyStats, Provider, Usage, create_providers
+from .metrics import METRICS_ENABLED, llm_hedges, llm_provider_seconds, llm_seconds, record_tokens, timed
+
+load_dotenv()
+
+# LLM client settings from environment variables
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "64"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+# Hedging settings: once the primary provider has been slower than its own
+# observed percentile, the same request also goes to the secondary
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Delay used until the primary has enough samples for a percentile
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+
+
+class LLMClient:
+    """Async chat completion client over one or more providers.
+
+    All providers share one pooled HTTP session, and a global semaphore caps
+    how many completions are in flight at once across all chat sessions.
+    Calls go to the first provider; if it has not answered by its observed
+    p95 (or fails), the request is hedged to the second provider and the
+    first answer wins while the other call is cancelled.
+    """
+
+    def __init__(self,
+                 providers: Optional[List[Provider]] = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 pool_size: int = LLM_POOL_SIZE,
+                 timeout: float = LLM_TIMEOUT,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 hedge: bool = LLM_HEDGE,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 hedge_delay: float = LLM_HEDGE_DELAY):
+        self.providers = providers if providers is not None else create_providers()
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.hedge = hedge and len(self.providers) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def hedge_after(self, stats: LatencyStats) -> float:
+        """Seconds to wait on the primary before hedging"""
+        if len(stats.samples) < self.hedge_min_samples:
+            return self.hedge_delay
+        return stats.percentile(self.hedge_percentile)
+
+    async def complete(self,
+                       messages: List[Dict[str, str]],
+                       model: Optional[str] = None,
+                       provider: Optional[str] = None,
+                       timeout: Optional[float] = None,
+                       call_site: str = "other",
+                       **params: Any) -> str:
+        """Run one chat completion and return the stripped reply text.
+
+        ``provider`` (a kind or name) picks the primary provider instead of
+        the first configured one and ``model`` overrides its model.
+        ``timeout`` is the latency budget for the whole call (hedge
+        included), and ``call_site`` labels the call in the latency and
+        token metrics.
+        """
+        budget = timeout or self.timeout
+        async with self._semaphore:
+            with timed(llm_seconds, call_site):
+                text, usage = await asyncio.wait_for(
+                    self._race(self._complete_one, messages, provider, model, budget, params),
+                    timeout=budget
+                )
+        record_tokens(call_site, *usage)
+        return text
+
+    async def stream(self,
+                     messages: List[Dict[str, str]],
+                     model: Optional[str] = None,
+                     provider: Optional[str] = None,
+                     timeout: Optional[float] = None,
+                     call_site: str = "other",
+                     **params: Any) -> AsyncIterator[str]:
+        """Run one streaming chat completion, yielding content deltas as they arrive.
+
+        Hedging races the providers to the first delta; the rest of the
+        reply then comes from whichever provider produced it.
+        """
+        budget = timeout or self.timeout
+        deltas = 0
+        async with self._semaphore:
+            with timed(llm_seconds, call_site):
+                chunks, first = await asyncio.wait_for(
+                    self._race(self._open_stream, messages, provider, model, budget, params),
+                    timeout=budget
+                )
+                try:
+                    if first:
+                        deltas += 1
+                        yield first
+                    async for delta in chunks:
+                        deltas += 1
+                        yield delta
+                finally:
+                    await chunks.aclose()
+        # Streamed responses carry no usage; each delta is about one token
+        record_tokens(call_site, None, deltas)
+
+    def _pick(self, provider: Optional[str]) -> Tuple[Provider, Optional[Provider]]:
+        """Return the primary provider for a call and the one to hedge to"""
+        primary = self.providers[0]
+        if provider is not None:
+            primary = next((p for p in self.providers if p.name == provider), None) or \
+                next((p for p in self.providers if p.kind == provider), primary)
+        secondary = next((p for p in self.providers if p is not primary), None)
+        return primary, secondary
+
+    async def _race(self, call, messages, provider, model, budget, params) -> Any:
+        """Run ``call`` on the primary, hedging to the secondary when it is slow or fails"""
+        primary, secondary = self._pick(provider)
+        tasks = {asyncio.ensure_future(call(primary, messages, model or primary.model, budget, params)): primary}
+        hedged = None
+        error: Optional[BaseException] = None
+        try:
+            if self.hedge:
+                stats = primary.first_token if call == self._open_stream else primary.latency
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after(stats))
+                first = next(iter(tasks))
+                if not done or first.exception() is not None:
+                    hedged = secondary
+                    self.hedges += 1
+                    tasks[asyncio.ensure_future(call(hedged, messages, hedged.model, budget, params))] = hedged
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if hedged is not None:
+                        won = tasks[task] is hedged
+                        self.hedge_wins += won
+                        if METRICS_ENABLED:
+                            llm_hedges.inc(1, hedged.name, "won" if won else "lost")
+                    # A second finished stream that lost the race is closed unread
+                    for other in done - {task}:
+                        if other.exception() is None and call == self._open_stream:
+                            await other.result()[0].aclose()
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _complete_one(self, provider: Provider, messages, model, budget, params) -> Tuple[str, Usage]:
+        """Run one completion on one provider, recording its latency"""
+        start = time.perf_counter()
+        try:
+            result = await provider.complete(self._get_session(), messages, model,
+                                             (self.connect_timeout, budget), **params)
+        except asyncio.CancelledError:
+            self._observe(provider, "complete", "cancelled", start)
+            raise
+        except Exception:
+            provider.latency.error()
+            self._observe(provider, "complete", "error", start)
+            raise
+        provider.latency.record(time.perf_counter() - start)
+        self._observe(provider, "complete", "ok", start)
+        return result
+
+    async def _open_stream(self, provider: Provider, messages, model, budget, params) -> Tuple[AsyncIterator[str], str]:
+        """Start one stream on one provider and wait for its first delta"""
+        start = time.perf_counter()
+        chunks = provider.stream(self._get_session(), messages, model, (self.connect_timeout, budget), **params)
+        try:
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except asyncio.CancelledError:
+            await chunks.aclose()
+            self._observe(provider, "stream", "cancelled", start)
+            raise
+        except Exception:
+            await chunks.aclose()
+            provider.first_token.error()
+            self._observe(provider, "stream", "error", start)
+            raise
+        provider.first_token.record(time.perf_counter() - start)
+        self._observe(provider, "stream", "ok", start)
+        return chunks, first
+
+    def _observe(self, provider: Provider, mode: str, outcome: str, start: float):
+        if METRICS_ENABLED:
+            llm_provider_seconds.observe(time.perf_counter() - start, provider.name, mode, outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-provider latency windows and hedging counts"""
+        return {
+            "providers": [provider.stats() for provider in self.providers],
+            "hedge": {
+                "enabled": self.hedge,
+                "percentile": self.hedge_percentile,
+                "hedged": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "next_delay_ms": {
+                    "complete": round(self.hedge_after(self.providers[0].latency) * 1000, 1),
+                    "stream": round(self.hedge_after(self.providers[0].first_token) * 1000, 1),
+                },
+            },
+        }
+
+    async def close(self):
+        """Close the pooled HTTP session (for shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .llm_client import LLMClient
+from .metrics import METRICS_ENABLED, llm_calls_saved
+
+load_dotenv()
+
+# Coalescing settings from environment variables. Single-flight is on by
+# default; micro-batching (window 0 disables it) rewrites distinct prompts
+# into one combined request, so it is opt-in.
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "true").lower() == "true"
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "0"))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "8"))
+
+WHITESPACE = re.compile(r"\s+")
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+BATCH_PROMPT = (
+    "Answer each of the following {count} requests independently. "
+    "Reply with only a JSON array of {count} strings, where string i is the reply to request i."
+)
+
+
+def normalize(messages: List[Dict[str, str]]) -> Tuple[Tuple[str, str], ...]:
+    """Messages with runs of whitespace collapsed, so formatting differences still match"""
+    return tuple((m["role"], WHITESPACE.sub(" ", m["content"]).strip()) for m in messages)
+
+
+class _Flight:
+    """One upstream stream shared by every caller that asked for the same prompt"""
+
+    __slots__ = ("deltas", "done", "error", "changed", "task")
+
+    def __init__(self):
+        self.deltas: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, delta: Optional[str] = None, error: Optional[BaseException] = None, done: bool = False):
+        if delta is not None:
+            self.deltas.append(delta)
+        self.error = error
+        self.done = done
+        # Wake current readers and arm a fresh event for the next change
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class PromptCoalescer:
+    """Single-flight de-duplication and micro-batching in front of an LLMClient.
+
+    Identical normalized prompts (same messages and parameters) that are in
+    flight at the same moment share one upstream request, plain or
+    streamed. Distinct plain completions can also be held for a short
+    window and sent as one combined request, falling back to separate
+    calls if the combined reply cannot be split.
+    """
+
+    def __init__(self,
+                 llm: LLMClient,
+                 single_flight: bool = LLM_SINGLE_FLIGHT,
+                 batch_window_ms: float = LLM_BATCH_WINDOW_MS,
+                 batch_max: int = LLM_BATCH_MAX):
+        self.llm = llm
+        self.single_flight = single_flight
+        self.batch_window = batch_window_ms / 1000
+        self.batch_max = batch_max
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Flight] = {}
+        # (call site, system prompt, parameters) -> pending [(user prompt, future)]
+        self._batches: Dict[Hashable, List[Tuple[str, asyncio.Future]]] = {}
+        self.requests = 0
+        self.upstream = 0
+        self.coalesced = 0
+        self.batched = 0
+        self.batches = 0
+        self.batch_fallbacks = 0
+
+    def _key(self, mode: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Hashable:
+        return (mode, normalize(messages), json.dumps(params, sort_keys=True))
+
+    def _saved(self, call_site: str, kind: str, count: int = 1):
+        if METRICS_ENABLED and count:
+            llm_calls_saved.inc(count, call_site, kind)
+
+    async def complete(self, messages: List[Dict[str, str]], call_site: str = "other", **params: Any) -> str:
+        """Like ``LLMClient.complete``, sharing the call with identical prompts in flight"""
+        self.requests += 1
+        if not self.single_flight:
+            return await self._dispatch(messages, call_site, params)
+        key = self._key("complete", messages, params)
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            self._saved(call_site, "single_flight")
+        else:
+            future = self._calls[key] = asyncio.ensure_future(self._dispatch(messages, call_site, params))
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded so one caller giving up does not cancel the call for the rest
+        return await asyncio.shield(future)
+
+    async def stream(self, messages: List[Dict[str, str]], call_site: str = "other", **params: Any) -> AsyncIterator[str]:
+        """Like ``LLMClient.stream``; callers of an identical prompt in flight replay and follow its deltas"""
+        self.requests += 1
+        if not self.single_flight:
+            self.upstream += 1
+            async for delta in self.llm.stream(messages, call_site=call_site, **params):
+                yield delta
+            return
+        key = self._key("stream", messages, params)
+        flight = self._streams.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            self._saved(call_site, "single_flight")
+        else:
+            flight = self._streams[key] = _Flight()
+            self.upstream += 1
+            flight.task = asyncio.ensure_future(self._pump(key, flight, messages, call_site, params))
+        position = 0
+        while True:
+            if position < len(flight.deltas):
+                position += 1
+                yield flight.deltas[position - 1]
+            elif flight.done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+            else:
+                await flight.changed.wait()
+
+    async def _pump(self, key: Hashable, flight: _Flight, messages, call_site: str, params: Dict[str, Any]):
+        """Read one upstream stream into its shared flight"""
+        try:
+            async for delta in self.llm.stream(messages, call_site=call_site, **params):
+                flight.publish(delta)
+        except Exception as e:
+            flight.publish(error=e, done=True)
+        else:
+            flight.publish(done=True)
+        finally:
+            self._streams.pop(key, None)
+
+    async def _dispatch(self, messages: List[Dict[str, str]], call_site: str, params: Dict[str, Any]) -> str:
+        """Send one completion upstream, through the micro-batch window if enabled"""
+        batchable = (self.batch_window > 0 and len(messages) == 2
+                     and messages[0]["role"] == "system" and messages[1]["role"] == "user")
+        if not batchable:
+            self.upstream += 1
+            return await self.llm.complete(messages, call_site=call_site, **params)
+        group = (call_site, messages[0]["content"], json.dumps(params, sort_keys=True))
+        future = asyncio.get_running_loop().create_future()
+        pending = self._batches.get(group)
+        if pending is None:
+            pending = self._batches[group] = []
+            asyncio.get_running_loop().call_later(self.batch_window, self._flush, group, pending)
+        pending.append((messages[1]["content"], future))
+        if len(pending) >= self.batch_max:
+            self._flush(group, pending)
+        return await future
+
+    def _flush(self, group: Hashable, pending: List[Tuple[str, asyncio.Future]]):
+        """Close a batch (when its window ends or it is full) and send it"""
+        if self._batches.get(group) is not pending:
+            return
+        del self._batches[group]
+        asyncio.ensure_future(self._send_batch(group, pending))
+
+    async def _send_batch(self, group: Hashable, pending: List[Tuple[str, asyncio.Future]]):
+        call_site, system, params_json = group
+        params = json.loads(params_json)
+        if len(pending) == 1:
+            prompt, future = pending[0]
+            await self._settle(future, self._call(system, prompt, call_site, params))
+            return
+        self.batches += 1
+        self.batched += len(pending)
+        self.upstream += 1
+        prompt = BATCH_PROMPT.format(count=len(pending)) + "".join(
+            f"\n\nRequest {i}:\n{user_prompt.strip()}" for i, (user_prompt, _) in enumerate(pending, 1)
+        )
+        batch_params = dict(params)
+        if "max_tokens" in batch_params:
+            batch_params["max_tokens"] = batch_params["max_tokens"] * len(pending)
+        replies = None
+        try:
+            reply = await self.llm.complete(
+                [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+                call_site=call_site,
+                **batch_params
+            )
+            replies = json.loads(CODE_FENCE.sub("", reply.strip()))
+        except Exception as e:
+            print(f"Batched LLM call failed, sending its {len(pending)} prompts separately: {e}")
+        if isinstance(replies, list) and len(replies) == len(pending) and all(isinstance(r, str) for r in replies):
+            self._saved(call_site, "batched", len(pending) - 1)
+            for (_, future), text in zip(pending, replies):
+                if not future.done():
+                    future.set_result(text.strip())
+            return
+        self.batch_fallbacks += 1
+        await asyncio.gather(*[
+            self._settle(future, self._call(system, user_prompt, call_site, params))
+            for user_prompt, future in pending
+        ])
+
+    async def _call(self, system: str, prompt: str, call_site: str, params: Dict[str, Any]) -> str:
+        self.upstream += 1
+        return await self.llm.complete(
+            [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            call_site=call_site,
+            **params
+        )
+
+    async def _settle(self, future: asyncio.Future, call):
+        try:
+            result = await call
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "single_flight": self.single_flight,
+            "batch_window_ms": self.batch_window * 1000,
+            "requests": self.requests,
+            "upstream_calls": self.upstream,
+            "saved_calls": self.requests - self.upstream,
+            "coalesced": self.coalesced,
+            "batched": self.batched,
+            "batches": self.batches,
+            "batch_fallbacks": self.batch_fallbacks,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Provider settings from environment variables. LLM_PROVIDERS lists the
+# providers in order of preference as ``kind[:model]``; the first is the
+# primary and the second, if any, receives hedged requests.
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "openai")
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
+ANTHROPIC_API_BASE = os.getenv("ANTHROPIC_API_BASE", "https://api.anthropic.com/v1")
+ANTHROPIC_VERSION = "2023-06-01"
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAKE_LLM_TOKEN_LATENCY = float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.01"))
+
+# (connect timeout, total timeout) in seconds
+Timeout = Tuple[float, float]
+# Token usage as (prompt tokens, completion tokens), either may be unknown
+Usage = Tuple[Optional[int], Optional[int]]
+
+
+class LatencyStats:
+    """Rolling window of recent call latencies for one provider"""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.calls += 1
+
+    def error(self):
+        self.calls += 1
+        self.errors += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency at percentile ``p`` of the window, or None before any sample"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95, p99 = (self.percentile(p) for p in (50, 95, 99))
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "samples": len(self.samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        }
+
+
+class Provider:
+    """One upstream chat model; subclasses speak its API.
+
+    ``latency`` tracks full completions and ``first_token`` the time to the
+    first streamed delta, so hedging can compare like with like.
+    """
+
+    kind = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.name = f"{self.kind}:{model}"
+        self.latency = LatencyStats()
+        self.first_token = LatencyStats()
+
+    async def complete(self,
+                       session: aiohttp.ClientSession,
+                       messages: List[Dict[str, str]],
+                       model: str,
+                       timeout: Timeout,
+                       **params: Any) -> Tuple[str, Usage]:
+        """Run one chat completion, returning the reply text and token usage"""
+        raise NotImplementedError
+
+    def stream(self,
+               session: aiohttp.ClientSession,
+               messages: List[Dict[str, str]],
+               model: str,
+               timeout: Timeout,
+               **params: Any) -> AsyncIterator[str]:
+        """Run one streaming chat completion, yielding content deltas"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "latency": self.latency.stats(),
+            "first_token": self.first_token.stats(),
+        }
+
+
+class OpenAIProvider(Provider):
+    """OpenAI or any OpenAI-compatible endpoint, through the ``openai`` module"""
+
+    kind = "openai"
+
+    def __init__(self,
+                 model: str = OPENAI_MODEL,
+                 api_key: Optional[str] = None,
+                 api_base: Optional[str] = OPENAI_API_BASE):
+        super().__init__(model)
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.api_base = api_base
+
+    def _request(self, messages: List[Dict[str, str]], model: str, timeout: Timeout, params: Dict[str, Any]) -> Dict[str, Any]:
+        request = dict(params, model=model, messages=messages, api_key=self.api_key, request_timeout=timeout)
+        if self.api_base:
+            request["api_base"] = self.api_base
+        return request
+
+    async def complete(self, session, messages, model, timeout, **params):
+        # openai reads the HTTP session from a context variable, which is
+        # local to the calling task, so setting it here is safe
+        openai.aiosession.set(session)
+        response = await openai.ChatCompletion.acreate(**self._request(messages, model, timeout, params))
+        usage = response.get("usage") or {}
+        return response.choices[0].message.content.strip(), (usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    async def stream(self, session, messages, model, timeout, **params):
+        openai.aiosession.set(session)
+        chunks = await openai.ChatCompletion.acreate(stream=True, **self._request(messages, model, timeout, params))
+        async for chunk in chunks:
+            delta = chunk.choices[0].delta.get("content")
+            if delta:
+                yield delta
+
+
+class AnthropicProvider(Provider):
+    """Anthropic Messages API, called directly over the shared HTTP session"""
+
+    kind = "anthropic"
+
+    def __init__(self,
+                 model: str = ANTHROPIC_MODEL,
+                 api_key: Optional[str] = None,
+                 api_base: str = ANTHROPIC_API_BASE):
+        super().__init__(model)
+        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        self.api_base = api_base.rstrip("/")
+
+    def _request(self, messages: List[Dict[str, str]], model: str, params: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        # The system prompt is a top-level field rather than a message
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        body = {
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "max_tokens": params.get("max_tokens", 1024),
+        }
+        if system:
+            body["system"] = system
+        for key in ("temperature", "top_p"):
+            if key in params:
+                body[key] = params[key]
+        if "stop" in params:
+            body["stop_sequences"] = params["stop"]
+        if stream:
+            body["stream"] = True
+        return body
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key or "",
+            "anthropic-version": ANTHROPIC_VERSION,
+            "content-type": "application/json",
+        }
+
+    async def complete(self, session, messages, model, timeout, **params):
+        async with session.post(
+            f"{self.api_base}/messages",
+            json=self._request(messages, model, params, stream=False),
+            headers=self._headers(),
+            timeout=aiohttp.ClientTimeout(connect=timeout[0], total=timeout[1])
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        text = "".join(block.get("text", "") for block in data.get("content", []) if block.get("type") == "text")
+        usage = data.get("usage") or {}
+        return text.strip(), (usage.get("input_tokens"), usage.get("output_tokens"))
+
+    async def stream(self, session, messages, model, timeout, **params):
+        async with session.post(
+            f"{self.api_base}/messages",
+            json=self._request(messages, model, params, stream=True),
+            headers=self._headers(),
+            timeout=aiohttp.ClientTimeout(connect=timeout[0], total=timeout[1])
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if not line.startswith(b"data:"):
+                    continue
+                event = json.loads(line[5:])
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
+                elif event.get("type") == "error":
+                    raise RuntimeError(event.get("error", {}).get("message", "Anthropic stream error"))
+
+
+class FakeProvider(Provider):
+    """Local stand-in with fixed latency, for development without API keys"""
+
+    kind = "fake"
+    reply = "Got it, thanks! Let's keep going with the next question."
+
+    def __init__(self,
+                 model: str = "fake",
+                 latency: float = FAKE_LLM_LATENCY,
+                 token_latency: float = FAKE_LLM_TOKEN_LATENCY):
+        super().__init__(model)
+        self.latency_seconds = latency
+        self.token_latency = token_latency
+
+    async def complete(self, session, messages, model, timeout, **params):
+        await asyncio.sleep(self.latency_seconds)
+        return self.reply, (None, None)
+
+    async def stream(self, session, messages, model, timeout, **params):
+        await asyncio.sleep(self.latency_seconds)
+        for i, word in enumerate(self.reply.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield word if i == 0 else f" {word}"
+
+
+PROVIDER_KINDS = {cls.kind: cls for cls in (OpenAIProvider, AnthropicProvider, FakeProvider)}
+
+
+def create_providers(spec: str = LLM_PROVIDERS) -> List[Provider]:
+    """Build providers from a comma-separated ``kind[:model]`` list"""
+    providers = []
+    for entry in spec.split(","):
+        kind, _, model = entry.strip().partition(":")
+        if not kind:
+            continue
+        if kind not in PROVIDER_KINDS:
+            raise ValueError(f"Unknown LLM provider '{kind}' (expected one of {', '.join(PROVIDER_KINDS)})")
+        providers.append(PROVIDER_KINDS[kind](model) if model else PROVIDER_KINDS[kind]())
+    if not providers:
+        raise ValueError("LLM_PROVIDERS must name at least one provider")
+    return providers
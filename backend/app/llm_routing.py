@@ -0,0 +1,195 @@
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import yaml
+from dotenv import load_dotenv
+
+from .llm_providers import Provider
+from .metrics import METRICS_ENABLED, llm_route_choices
+
+load_dotenv()
+
+# Routing settings from environment variables
+LLM_ROUTES_PATH = os.getenv(
+    "LLM_ROUTES_PATH",
+    os.path.join(os.path.dirname(__file__), "flows", "llm_routes.yaml")
+)
+# A model meets a route's SLO when this percentile of its recent latencies is within it
+LLM_ROUTE_PERCENTILE = float(os.getenv("LLM_ROUTE_PERCENTILE", "95"))
+# Only latencies this recent count, so a model over its SLO is tried again once they age out
+LLM_ROUTE_WINDOW_SECONDS = float(os.getenv("LLM_ROUTE_WINDOW_SECONDS", "60"))
+# Below this many recent samples a model is given the benefit of the doubt
+LLM_ROUTE_MIN_SAMPLES = int(os.getenv("LLM_ROUTE_MIN_SAMPLES", "5"))
+
+CALL_KINDS = ("enhance", "error")
+
+
+class RouteSpecError(ValueError):
+    """Raised when the routing policy is malformed or names unknown steps"""
+
+
+class Route:
+    """Routing policy for one (call kind, flow step)"""
+
+    __slots__ = ("kind", "step", "models", "slo", "max_tokens")
+
+    def __init__(self, kind: str, step: Optional[str], models: List[str], slo: float, max_tokens: int):
+        self.kind = kind
+        self.step = step
+        self.models = models
+        self.slo = slo
+        self.max_tokens = max_tokens
+
+
+class RouteChoice:
+    """A model picked for one call, with the parameters to call it with"""
+
+    __slots__ = ("route", "model", "streaming", "start")
+
+    def __init__(self, route: Route, model: str, streaming: bool):
+        self.route = route
+        self.model = model
+        self.streaming = streaming
+        self.start = time.perf_counter()
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        kind, _, model = self.model.partition(":")
+        return {"provider": kind, "model": model or None, "max_tokens": self.route.max_tokens}
+
+
+class RecentLatency:
+    """Latencies observed within the last ``window`` seconds"""
+
+    def __init__(self, window: float = LLM_ROUTE_WINDOW_SECONDS, max_samples: int = 500):
+        self.window = window
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+
+    def record(self, seconds: float):
+        self.samples.append((time.monotonic(), seconds))
+
+    def recent(self) -> List[float]:
+        cutoff = time.monotonic() - self.window
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return [seconds for _, seconds in self.samples]
+
+    def percentile(self, p: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at percentile ``p`` of the recent samples, or None if there are too few"""
+        recent = self.recent()
+        if len(recent) < max(1, min_samples):
+            return None
+        recent.sort()
+        return recent[min(len(recent) - 1, int(len(recent) * p / 100))]
+
+
+class ModelRouter:
+    """Picks a model per LLM call from a policy of routes keyed by call kind and flow step.
+
+    Each route lists candidate models cheapest/fastest first, with a latency
+    SLO and a token budget. The router takes the first candidate whose
+    recent latency percentile is within the SLO; if none is, the caller
+    falls back to its static template. Streamed calls are measured to the
+    first delta, plain calls to the full reply.
+    """
+
+    def __init__(self,
+                 defaults: Dict[str, Route],
+                 routes: Dict[Tuple[str, str], Route],
+                 percentile: float = LLM_ROUTE_PERCENTILE,
+                 window: float = LLM_ROUTE_WINDOW_SECONDS,
+                 min_samples: int = LLM_ROUTE_MIN_SAMPLES):
+        self.defaults = defaults
+        self.routes = routes
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.latency: Dict[Tuple[str, bool], RecentLatency] = {}
+        self.choices: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def load(cls, providers: List[Provider], steps: Iterable[str], path: str = LLM_ROUTES_PATH) -> "ModelRouter":
+        """Load the policy, keeping only models whose provider kind is configured"""
+        spec = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                spec = yaml.safe_load(f) or {}
+        return cls.compile(spec, providers, set(steps))
+
+    @classmethod
+    def compile(cls, spec: Dict[str, Any], providers: List[Provider], steps: set) -> "ModelRouter":
+        kinds = {provider.kind for provider in providers}
+        # With no configured candidate, a route uses the primary provider's own model
+        fallback_models = [providers[0].name]
+        raw_defaults = spec.get("defaults") or {}
+
+        def build(kind: str, step: Optional[str], raw: Dict[str, Any], base: Optional[Route]) -> Route:
+            models = raw.get("models", base.models if base else [])
+            if not isinstance(models, list):
+                raise RouteSpecError(f"Route {kind}/{step or 'default'} models must be a list")
+            available = [model for model in models if model.partition(":")[0] in kinds]
+            slo_ms = raw.get("slo_ms", base.slo * 1000 if base else 2000)
+            return Route(kind, step, available or fallback_models, float(slo_ms) / 1000,
+                         int(raw.get("max_tokens", base.max_tokens if base else 150)))
+
+        defaults = {}
+        for kind in CALL_KINDS:
+            defaults[kind] = build(kind, None, raw_defaults.get(kind) or {}, None)
+
+        routes = {}
+        for step, raw_step in (spec.get("steps") or {}).items():
+            if step not in steps:
+                raise RouteSpecError(f"Route for unknown flow step {step!r}")
+            for kind, raw in (raw_step or {}).items():
+                if kind not in CALL_KINDS:
+                    raise RouteSpecError(f"Step {step!r} has a route for unknown call kind {kind!r}")
+                routes[(kind, step)] = build(kind, step, raw or {}, defaults[kind])
+        return cls(defaults, routes)
+
+    def route(self, kind: str, step: Optional[str]) -> Route:
+        return self.routes.get((kind, step)) or self.defaults[kind]
+
+    def choose(self, kind: str, step: Optional[str], streaming: bool = False) -> Optional[RouteChoice]:
+        """Return the first candidate meeting the route's SLO, or None to use the static template"""
+        route = self.route(kind, step)
+        chosen = None
+        for model in route.models:
+            stats = self.latency.get((model, streaming))
+            observed = stats.percentile(self.percentile, self.min_samples) if stats else None
+            if observed is None or observed <= route.slo:
+                chosen = model
+                break
+        self._count(kind, step, chosen or "template")
+        return RouteChoice(route, chosen, streaming) if chosen else None
+
+    def record(self, choice: RouteChoice, ok: bool = True):
+        """Record how long the chosen model took; failures count as missing the SLO"""
+        elapsed = time.perf_counter() - choice.start
+        if not ok:
+            elapsed = max(elapsed, choice.route.slo * 2)
+        key = (choice.model, choice.streaming)
+        stats = self.latency.get(key)
+        if stats is None:
+            stats = self.latency[key] = RecentLatency(self.window)
+        stats.record(elapsed)
+
+    def _count(self, kind: str, step: Optional[str], model: str):
+        key = (kind, model)
+        self.choices[key] = self.choices.get(key, 0) + 1
+        if METRICS_ENABLED:
+            llm_route_choices.inc(1, kind, step or "none", model)
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for (model, streaming), stats in self.latency.items():
+            recent = stats.percentile(self.percentile)
+            models[f"{model} ({'stream' if streaming else 'complete'})"] = {
+                "recent_samples": len(stats.recent()),
+                f"p{self.percentile:g}_ms": round(recent * 1000, 1) if recent is not None else None,
+            }
+        return {
+            "models": models,
+            "choices": {f"{kind} -> {model}": count for (kind, model), count in self.choices.items()},
+        }
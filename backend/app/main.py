@@ -1,19 +1,46 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
-from typing import Dict
+import asyncio
+from typing import Any, Dict, AsyncIterator, List, Optional, Tuple
+import io
+import json
+import tempfile
+import time
 import uuid
+from datetime import datetime
+from sqlalchemy import select, func, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from .database import engine, Base, get_db
-from .models import Session, Message, Vehicle
+from .database import engine, async_engine, AsyncSessionLocal, Base, get_db
+from .models import Session, Message, Vehicle, ArchivedSession, ArchivedVehicle
 from .schemas import (
     SessionCreate, SessionResponse, MessageCreate, MessageResponse,
-    VehicleCreate, ChatRequest, ChatResponse
+    VehicleCreate, ChatRequest, ChatResponse, ClientFrame, SessionSnapshot
 )
 from .chatbot import ChatBot
+from .error_replies import ERROR_REPLIES_WARM
 from .websocket_manager import ConnectionManager
+from .transcript_writer import TranscriptWriter, TRANSCRIPT_WRITE_BEHIND, message_row
+from .session_store import SessionState, SessionStateStore
+from .admin import require_admin
+from .bulk_import import IMPORT_MAX_BYTES, import_leads
+from .export import EXPORT_FORMATS, ExportQuery, export_sessions
+from .retention import RetentionJob, RETENTION_ENABLED, RETENTION_INTERVAL_SECONDS, load_transcript
+from . import metrics, tracing, wire
+from .tracing import PROFILE_HEADER, TRACE_BUFFER_SIZE, TRACE_ENDPOINT_ENABLED
+from .wire import FastJSONResponse
+from .pagination import (
+    MESSAGES_PAGE_MAX, SNAPSHOT_MESSAGES, Cursor, WindowVersion, decode_cursor, encode_cursor, etag_matches,
+    page_etag, row_cursor, rows_version
+)
 
 
 # loading the environment variable when the server starts
@@ -25,11 +52,25 @@ Base.metadata.create_all(bind=engine)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    await manager.start()
+    if ERROR_REPLIES_WARM:
+        # Fill in any step/error pairs missing from the precomputed table
+        if await chatbot.precompute_error_replies():
+            chatbot.error_replies.save()
+    if transcript_writer:
+        transcript_writer.start()
+    if RETENTION_ENABLED:
+        retention.start(RETENTION_INTERVAL_SECONDS)
     yield
     # Shutdown
+    await retention.stop()
     await manager.disconnect_all()
+    await chatbot.llm.close()
+    if transcript_writer:
+        await transcript_writer.stop()
+    await async_engine.dispose()
 
-app = FastAPI(title="Bind IQ Onboarding Chatbot", lifespan=lifespan)
+app = FastAPI(title="Bind IQ Onboarding Chatbot", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -38,109 +79,313 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
+# Compress larger REST payloads such as long transcripts
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace each request; a PROFILE_HEADER header also asks for a profile dump"""
+    # Scrapes and trace reads would only crowd out the traces worth reading
+    if request.url.path in ("/metrics", "/api/debug/traces"):
+        return await call_next(request)
+    profile = request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true")
+    with tracing.trace(f"{request.method} {request.url.path}", profile=profile) as current:
+        response = await call_next(request)
+        if current is not None:
+            current.attrs["status"] = response.status_code
+    if current is not None:
+        response.headers["X-Trace-Id"] = current.id
+    return response
+
 # WebSocket manager
 manager = ConnectionManager()
 
 # ChatBot instance
 chatbot = ChatBot()
 
+# Hot session state cache in front of the sessions table
+session_store = SessionStateStore()
+
+# Write-behind transcript persistence, if enabled
+transcript_writer = TranscriptWriter(AsyncSessionLocal) if TRANSCRIPT_WRITE_BEHIND else None
+
+def forget_sessions(session_ids: List[str]):
+    """Drop cached state for sessions the retention job archived, purged or marked"""
+    for session_id in session_ids:
+        session_store.invalidate(session_id)
+        if chatbot.prefetcher is not None:
+            chatbot.prefetcher.discard(session_id)
+
+# Background archival of old sessions and expiry of abandoned ones
+retention = RetentionJob(AsyncSessionLocal, on_removed=forget_sessions)
+
+# Gauges are read from the live objects at scrape time
+def cache_stats():
+    caches = {"session_state": session_store.stats()}
+    if chatbot.response_cache is not None:
+        caches["response"] = chatbot.response_cache.stats()
+    return caches
+
+def cache_hit_ratio():
+    ratios = {}
+    for cache, stats in cache_stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(cache,)] = stats["hits"] / lookups if lookups else 0.0
+    return ratios
+
+metrics.register_callback("chatbot_websocket_connections", "Open WebSocket connections on this worker", (),
+                          lambda: {(): manager.stats()["connections"]})
+metrics.register_callback("chatbot_websocket_queued_frames", "Frames waiting in WebSocket outbound queues", (),
+                          lambda: {(): manager.stats()["queued"]})
+metrics.register_callback("chatbot_db_pool_connections", "Database pool connections by state", ("state",),
+                          lambda: {("checked_out",): async_engine.pool.checkedout(),
+                                   ("idle",): async_engine.pool.checkedin()})
+metrics.register_callback("chatbot_cache_lookups_total", "Cache lookups by result", ("cache", "result"),
+                          lambda: {(cache, result): stats[result]
+                                   for cache, stats in cache_stats().items() for result in ("hits", "misses")},
+                          kind="counter")
+metrics.register_callback("chatbot_cache_hit_ratio", "Cache hit ratio since start", ("cache",), cache_hit_ratio)
+
 
 # healthcheck to see if the backend is working fine
 @app.get("/")
 async def root():
     return {"message": "Bind IQ Onboarding Chatbot API"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    """Outbound queue depths, drops and slow-consumer evictions for this worker"""
+    return manager.stats()
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Per-provider LLM latency windows, hedging, coalescing, routing and prefetch for this worker"""
+    return dict(chatbot.llm.stats(),
+                coalescing=chatbot.prompts.stats(),
+                routing=chatbot.router.stats(),
+                prefetch=chatbot.prefetcher.stats() if chatbot.prefetcher is not None else None)
+
+@app.get("/api/retention/stats")
+async def retention_stats():
+    """Retention policy, progress of the current run and the last run's summary"""
+    return retention.stats()
+
+@app.get("/api/archive/sessions/{session_id}")
+async def get_archived_session(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Read back an archived session with its transcript and vehicles"""
+    archived = await db.get(ArchivedSession, session_id)
+    if not archived:
+        raise HTTPException(status_code=404, detail="Archived session not found")
+    vehicles = (await db.execute(
+        select(ArchivedVehicle).where(ArchivedVehicle.session_id == session_id).order_by(ArchivedVehicle.created_at)
+    )).scalars().all()
+    return {
+        "id": archived.id,
+        "created_at": archived.created_at,
+        "updated_at": archived.updated_at,
+        "archived_at": archived.archived_at,
+        "status": archived.status.value,
+        "current_step": archived.current_step,
+        "data": archived.data,
+        "messages": load_transcript(archived.transcript),
+        "vehicles": [
+            {column.name: getattr(vehicle, column.name) for column in ArchivedVehicle.__table__.columns}
+            for vehicle in vehicles
+        ],
+    }
+
 @app.post("/api/sessions", response_model=SessionResponse)
-async def create_session():
+async def create_session(db: AsyncSession = Depends(get_db)):
     """Create a new chat session"""
-    db = next(get_db())
-    try:
-        session = Session(
-            id=str(uuid.uuid4()),
-            status="active",
-            current_step="zip_code",
-            data={}
-        )
-        db.add(session)
-        db.commit()
-        db.refresh(session)
-        
-        # Send initial greeting
-        greeting = await chatbot.get_greeting()
-        message = Message(
-            id=str(uuid.uuid4()),
+    session = Session(
+        id=str(uuid.uuid4()),
+        status="active",
+        current_step=chatbot.flow.start,
+        data={},
+        created_at=datetime.utcnow()
+    )
+    db.add(session)
+    
+    # Send initial greeting, written in the same transaction as the session
+    greeting = await chatbot.get_greeting()
+    message = Message(
+        id=str(uuid.uuid4()),
+        session_id=session.id,
+        sender="bot",
+        content=greeting,
+        created_at=session.created_at
+    )
+    db.add(message)
+    await db.commit()
+    session_store.put(SessionState.from_model(session))
+    chatbot.prefetch(session.id, session.current_step, {})
+    
+    return SessionResponse(
+        id=session.id,
+        status=session.status,
+        current_step=session.current_step,
+        created_at=session.created_at,
+        greeting=MessageResponse(
+            id=message.id,
             session_id=session.id,
-            sender="bot",
-            content=greeting
-        )
-        db.add(message)
-        db.commit()
-        
-        return SessionResponse(
-            id=session.id,
-            status=session.status,
-            current_step=session.current_step,
-            created_at=session.created_at
+            sender=message.sender,
+            content=message.content,
+            created_at=message.created_at
         )
-    finally:
-        db.close()
+    )
 
 @app.get("/api/sessions/{session_id}", response_model=SessionResponse)
-async def get_session(session_id: str):
+async def get_session(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get session details"""
-    db = next(get_db())
-    try:
-        session = db.query(Session).filter(Session.id == session_id).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        return SessionResponse(
-            id=session.id,
-            status=session.status,
-            current_step=session.current_step,
-            created_at=session.created_at,
-            data=session.data
+    session = await session_store.get(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return SessionResponse(
+        id=session.id,
+        status=session.status,
+        current_step=session.current_step,
+        created_at=session.created_at,
+        data=session.data
+    )
+
+@app.get("/api/sessions/{session_id}/snapshot", response_model=SessionSnapshot)
+async def get_session_snapshot(session_id: str,
+                               limit: int = Query(SNAPSHOT_MESSAGES, ge=1, le=MESSAGES_PAGE_MAX),
+                               db: AsyncSession = Depends(get_db)):
+    """Session state, the latest page of messages, vehicles and a resume cursor in one response"""
+    # One round of eager loading through the relationships instead of a
+    # query per collection
+    session = (await db.execute(
+        select(Session).where(
+            Session.id == session_id
+        ).options(
+            selectinload(Session.messages),
+            selectinload(Session.vehicles)
         )
-    finally:
-        db.close()
+    )).scalar_one_or_none()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    messages = [
+        {
+            "id": msg.id,
+            "session_id": msg.session_id,
+            "sender": msg.sender,
+            "content": msg.content,
+            "created_at": msg.created_at
+        }
+        for msg in session.messages
+    ]
+    if transcript_writer:
+        stored_ids = {msg["id"] for msg in messages}
+        messages += [
+            row for row in transcript_writer.pending_messages(session_id)
+            if row["id"] not in stored_ids
+        ]
+    messages.sort(key=row_cursor)
+    has_more = len(messages) > limit
+    messages = messages[-limit:]
+    
+    vehicles = sorted(session.vehicles, key=lambda vehicle: (vehicle.created_at, vehicle.id))
+    vehicle_columns = [column.key for column in Vehicle.__table__.columns]
+    
+    return FastJSONResponse({
+        "session": {
+            "id": session.id,
+            "status": session.status,
+            "current_step": session.current_step,
+            "created_at": session.created_at,
+            "data": session.data
+        },
+        "messages": messages,
+        "vehicles": [{key: getattr(vehicle, key) for key in vehicle_columns} for vehicle in vehicles],
+        "has_more": has_more,
+        "prev_cursor": encode_cursor(row_cursor(messages[0])) if messages else None,
+        "next_cursor": encode_cursor(row_cursor(messages[-1])) if messages else None
+    })
 
-@app.post("/api/debug-messages")
-async def debug_messages(request: Request):
-    """Debug endpoint to see raw request"""
-    body = await request.body()
-    headers = dict(request.headers)
-    return {
-        "headers": headers,
-        "body": body.decode() if body else None,
-        "content_type": request.headers.get("content-type")
-    }
+@app.get("/api/debug/traces")
+async def debug_traces(limit: int = Query(50, ge=1, le=TRACE_BUFFER_SIZE), min_ms: float = 0):
+    """Recent request and turn timing breakdowns, newest first (only with TRACE_ENDPOINT_ENABLED)"""
+    if not TRACE_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    traces = [record for record in reversed(tracing.recent) if record["duration_ms"] >= min_ms]
+    return traces[:limit]
+
+async def stream_reply(session_id: str, message_id: str, chunks: AsyncIterator[str]) -> Tuple[str, Optional[float]]:
+    """Broadcast reply deltas as they arrive, returning the full text and time to first token"""
+    start = time.perf_counter()
+    ttft_ms = None
+    parts = []
+    async for delta in chunks:
+        if ttft_ms is None:
+            ttft_ms = (time.perf_counter() - start) * 1000
+        parts.append(delta)
+        await manager.broadcast(session_id, {
+            "type": "message_delta",
+            "message_id": message_id,
+            "delta": delta
+        })
+    return "".join(parts).strip(), ttft_ms
 
 @app.post("/api/messages", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db)):
     """Process user message and return bot response"""
-    db = next(get_db())
+    return await run_turn(db, request.session_id, request.message, request.stream)
+
+async def run_turn(db: AsyncSession, session_id: str, message: str, stream: bool) -> ChatResponse:
+    """Run one chat turn for the HTTP and WebSocket entry points"""
+    turn_start = time.perf_counter()
+    # Get session state from the hot store (loaded from the DB on a miss)
+    with tracing.span("session_load"):
+        session = await session_store.get(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Label the turn's DB, LLM and broadcast metrics with the step it
+    # answers, and drop the label however the turn ends
+    step_token = metrics.current_step.set(session.current_step)
     try:
-        # Get session
-        session = db.query(Session).filter(Session.id == request.session_id).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Store the current step before processing
-        current_step = session.current_step
-        
-        # Store user message
-        user_message = Message(
-            id=str(uuid.uuid4()),
-            session_id=session.id,
-            sender="user",
-            content=request.message
-        )
-        db.add(user_message)
-        db.commit()
-        
-        # Broadcast user message via WebSocket
+        return await answer_turn(db, session, message, stream, turn_start)
+    finally:
+        metrics.current_step.reset(step_token)
+
+async def answer_turn(db: AsyncSession,
+                      session: SessionState,
+                      message: str,
+                      stream: bool,
+                      turn_start: float) -> ChatResponse:
+    """Validate the answer, reply and write the turn for a loaded session"""
+    tracing.annotate(session_id=session.id, step=session.current_step)
+    
+    # Release the connection while the LLM runs; the whole turn is written
+    # in one transaction below
+    await db.close()
+    
+    # Store the current step before processing
+    current_step = session.current_step
+    
+    # Build the user message with client-side id and timestamp so it can be
+    # broadcast now and written with the rest of the turn
+    user_message = Message(
+        id=str(uuid.uuid4()),
+        session_id=session.id,
+        sender="user",
+        content=message,
+        created_at=datetime.utcnow()
+    )
+    
+    # Broadcast user message via WebSocket
+    with tracing.span("broadcast_user"):
         await manager.broadcast(session.id, {
             "type": "message",
             "message": {
@@ -150,84 +395,115 @@ async def send_message(request: ChatRequest):
                 "created_at": user_message.created_at.isoformat()
             }
         })
-        
-        # Process message with chatbot
+    
+    # Process message with chatbot, streaming the reply if requested
+    bot_message_id = str(uuid.uuid4())
+    ttft_ms = None
+    if stream:
+        chunks, next_step, extracted_data = await chatbot.process_message_stream(
+            message,
+            session.current_step,
+            session.data if session.data else {},
+            session.id
+        )
+        with tracing.span("llm_stream"):
+            response, ttft_ms = await stream_reply(session.id, bot_message_id, chunks)
+    else:
         response, next_step, extracted_data = await chatbot.process_message(
-            request.message,
+            message,
             session.current_step,
-            session.data if session.data else {}
+            session.data if session.data else {},
+            session.id
         )
+    
+    # Write the whole turn in one transaction (transcript rows are queued
+    # separately in write-behind mode)
+    if not transcript_writer:
+        db.add(user_message)
+    
+    # Work out the new session state; it is written through with one UPDATE
+    # and only replaces the cached state once committed
+    session_data = session.data
+    session_changes = {}
+    if extracted_data:
+        session_data = {**session.data, **extracted_data}
+        session_changes["data"] = session_data
         
-        # Update session data if any data was extracted
-        if extracted_data:
-            print(f"DEBUG: Extracted data to save: {extracted_data}")
-            
-            # Initialize data if it's empty or None
-            if not session.data:
-                session.data = {}
-                print("DEBUG: Initialized empty session.data")
-            
-            # Create a new dict to force SQLAlchemy to detect the change
-            print(f"DEBUG: Session data BEFORE update: {session.data}")
-            updated_data = dict(session.data)  # Make a copy
-            updated_data.update(extracted_data)  # Update the copy
-            session.data = updated_data  # Reassign to trigger SQLAlchemy
-            print(f"DEBUG: Session data AFTER update: {session.data}")
-            
-        # Always update the current step if it changed
-        if next_step != session.current_step:
-            print(f"DEBUG: Updating step from {session.current_step} to {next_step}")
-            session.current_step = next_step
-            
-        # Commit the changes
-        db.commit()
-        print(f"DEBUG: Changes committed to database")
-
-        # Create vehicle record when we reach "add_another_vehicle" step
-        if (next_step == "add_another_vehicle" and 
-            current_step in ["commute_miles", "annual_mileage"] and
-            "vehicle_info" in session.data):
-            
-            # Check if vehicle already exists for this session
-            existing_vehicles = db.query(Vehicle).filter_by(session_id=session.id).count()
-            
-            if existing_vehicles == 0:  # Only create if no vehicles exist yet
-                # Extract vehicle data
-                vehicle_data = session.data.get("vehicle_info", {})
-                
-                # Create vehicle record
-                new_vehicle = Vehicle(
-                    id=str(uuid.uuid4()),
-                    session_id=session.id,
-                    vin=vehicle_data.get("vin"),
-                    year=vehicle_data.get("year"),
-                    make=vehicle_data.get("make"),
-                    body_type=vehicle_data.get("body_type"),
-                    vehicle_use=session.data.get("vehicle_use"),
-                    blind_spot_warning=bool(session.data.get("blind_spot", False)),
-                    commute_days_per_week=session.data.get("commute_days"),
-                    commute_one_way_miles=session.data.get("commute_miles"),
-                    annual_mileage=session.data.get("annual_mileage")
-                )
-                db.add(new_vehicle)
-                db.commit()
-                print(f"DEBUG: Created vehicle record {new_vehicle.id} for session {session.id}")
-
-        # Refresh to get latest data
-        db.refresh(session)
-        print(f"DEBUG: Session data after refresh: {session.data}")
+    # Always update the current step if it changed
+    if next_step != session.current_step:
+        session_changes["current_step"] = next_step
+    
+    # Mark the session complete in the same transaction; a session the
+    # retention job marked abandoned becomes active again when answered
+    session_status = "completed" if next_step == "complete" else session.status
+    if session_status == "abandoned":
+        session_status = "active"
+    if session_status != session.status:
+        session_changes["status"] = session_status
+    
+    if session_changes:
+        with tracing.span("update_session"):
+            await db.execute(
+                update(Session).where(Session.id == session.id).values(**session_changes)
+            )
+
+    # Create vehicle record when we reach "add_another_vehicle" step
+    if (next_step == "add_another_vehicle" and 
+        current_step in ["commute_miles", "annual_mileage"] and
+        "vehicle_info" in session_data):
         
-        # Store bot response
-        bot_message = Message(
-            id=str(uuid.uuid4()),
-            session_id=session.id,
-            sender="bot",
-            content=response
-        )
-        db.add(bot_message)
-        db.commit()
+        # Check if vehicle already exists for this session
+        with tracing.span("vehicle_check"):
+            existing_vehicles = await db.scalar(
+                select(func.count()).select_from(Vehicle).where(Vehicle.session_id == session.id)
+            )
         
-        # Broadcast bot message via WebSocket
+        if existing_vehicles == 0:  # Only create if no vehicles exist yet
+            # Extract vehicle data
+            vehicle_data = session_data.get("vehicle_info", {})
+            
+            # Create vehicle record
+            new_vehicle = Vehicle(
+                id=str(uuid.uuid4()),
+                session_id=session.id,
+                vin=vehicle_data.get("vin"),
+                year=vehicle_data.get("year"),
+                make=vehicle_data.get("make"),
+                body_type=vehicle_data.get("body_type"),
+                vehicle_use=session_data.get("vehicle_use"),
+                blind_spot_warning=bool(session_data.get("blind_spot", False)),
+                commute_days_per_week=session_data.get("commute_days"),
+                commute_one_way_miles=session_data.get("commute_miles"),
+                annual_mileage=session_data.get("annual_mileage")
+            )
+            db.add(new_vehicle)
+    
+    # Store bot response
+    bot_message = Message(
+        id=bot_message_id,
+        session_id=session.id,
+        sender="bot",
+        content=response,
+        created_at=datetime.utcnow()
+    )
+    if not transcript_writer:
+        db.add(bot_message)
+    with tracing.span("commit"):
+        await db.commit()
+    
+    # The turn is committed, so the cached state can move forward
+    session.data = session_data
+    session.current_step = next_step
+    session.status = session_status
+    session_store.put(session)
+    
+    if transcript_writer:
+        with tracing.span("enqueue_transcript"):
+            await transcript_writer.enqueue(message_row(user_message))
+            await transcript_writer.enqueue(message_row(bot_message))
+    
+    # Broadcast bot message via WebSocket
+    with tracing.span("broadcast_reply"):
         await manager.broadcast(session.id, {
             "type": "message",
             "message": {
@@ -235,92 +511,373 @@ async def send_message(request: ChatRequest):
                 "sender": "bot",
                 "content": bot_message.content,
                 "created_at": bot_message.created_at.isoformat()
-            }
+            },
+            "ttft_ms": ttft_ms
         })
-        
-        # Check if session is complete
-        if session.current_step == "complete":
-            session.status = "completed"
-            db.commit()
-        
-        return ChatResponse(
-            message=response,
-            current_step=session.current_step,
-            session_status=session.status
-        )
-    finally:
-        db.close()
+    
+    # Start on the reply the next answer will most likely need
+    if chatbot.prefetcher is not None:
+        if session.status == "completed":
+            chatbot.prefetcher.discard(session.id)
+        else:
+            chatbot.prefetch(session.id, session.current_step, session.data or {})
+    
+    if metrics.METRICS_ENABLED:
+        metrics.turn_seconds.observe(time.perf_counter() - turn_start, current_step)
+    
+    return ChatResponse(
+        message=response,
+        current_step=session.current_step,
+        session_status=session.status,
+        ttft_ms=ttft_ms
+    )
 
 @app.get("/api/messages/{session_id}")
-async def get_messages(session_id: str):
-    """Get all messages for a session"""
-    db = next(get_db())
+async def get_messages(session_id: str,
+                       request: Request,
+                       after: Optional[str] = None,
+                       before: Optional[str] = None,
+                       since: Optional[str] = None,
+                       limit: Optional[int] = Query(None, ge=1, le=MESSAGES_PAGE_MAX),
+                       db: AsyncSession = Depends(get_db)):
+    """Get messages for a session, oldest first.
+    
+    Without parameters this returns the whole transcript. ``after`` and
+    ``before`` take the cursors from the ``X-Next-Cursor`` and
+    ``X-Prev-Cursor`` headers to page forwards and backwards, ``since``
+    takes the id of the last message the client has (e.g. after a
+    reconnect) and ``limit`` caps the page size. Responses carry an ETag
+    and honour If-None-Match with 304 Not Modified, which is answered
+    from a COUNT/MAX over the page's index range without reading messages.
+    """
+    if since and after:
+        raise HTTPException(status_code=400, detail="since and after cannot be combined")
     try:
-        messages = db.query(Message).filter(
-            Message.session_id == session_id
-        ).order_by(Message.created_at).all()
-        
-        return [
-            MessageResponse(
-                id=msg.id,
-                session_id=msg.session_id,
-                sender=msg.sender,
-                content=msg.content,
-                created_at=msg.created_at
-            )
-            for msg in messages
+        after_cursor = decode_cursor(after) if after else None
+        before_cursor = decode_cursor(before) if before else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if since:
+        after_cursor = await message_cursor(db, session_id, since)
+        if after_cursor is None:
+            raise HTTPException(status_code=404, detail="Message not found")
+    
+    params = (session_id, after, before, since, limit)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await messages_version(db, session_id, after_cursor, before_cursor, limit)
+        if version is not None:
+            etag = page_etag(version, *params)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    messages = await load_messages(db, session_id, after_cursor, before_cursor, limit)
+    
+    etag = page_etag(rows_version(messages), *params)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if messages:
+        headers["X-Prev-Cursor"] = encode_cursor(row_cursor(messages[0]))
+        headers["X-Next-Cursor"] = encode_cursor(row_cursor(messages[-1]))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(messages, headers=headers)
+
+async def message_cursor(db: AsyncSession, session_id: str, message_id: str) -> Optional[Cursor]:
+    """Find a message's position in the transcript, or None if it is not in the session"""
+    if transcript_writer:
+        for row in transcript_writer.pending_messages(session_id):
+            if row["id"] == message_id:
+                return row_cursor(row)
+    row = (await db.execute(
+        select(Message.created_at, Message.id).where(
+            Message.session_id == session_id,
+            Message.id == message_id
+        )
+    )).first()
+    return (row.created_at, row.id) if row else None
+
+def after_cursor_clause(cursor: Cursor):
+    created_at, message_id = cursor
+    return or_(Message.created_at > created_at,
+               and_(Message.created_at == created_at, Message.id > message_id))
+
+def before_cursor_clause(cursor: Cursor):
+    created_at, message_id = cursor
+    return or_(Message.created_at < created_at,
+               and_(Message.created_at == created_at, Message.id < message_id))
+
+def messages_window(columns: tuple,
+                    session_id: str,
+                    after: Optional[Cursor] = None,
+                    before: Optional[Cursor] = None,
+                    limit: Optional[int] = None):
+    """Select ``columns`` for a page of a session's stored transcript.
+    
+    With only ``before`` set, the page is the ``limit`` messages just
+    before the cursor, newest first.
+    """
+    # Keyset conditions walk the (session_id, created_at, id) index instead
+    # of scanning
+    query = select(*columns).where(Message.session_id == session_id)
+    if after:
+        query = query.where(after_cursor_clause(after))
+    if before:
+        query = query.where(before_cursor_clause(before))
+    if before is not None and after is None:
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    else:
+        query = query.order_by(Message.created_at, Message.id)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+async def messages_version(db: AsyncSession,
+                           session_id: str,
+                           after: Optional[Cursor] = None,
+                           before: Optional[Cursor] = None,
+                           limit: Optional[int] = None) -> Optional[WindowVersion]:
+    """Version of a page (see ``rows_version``) from the index alone, without loading messages.
+    
+    Returns None while some of the session's messages are still queued for
+    write-behind, since the database cannot see those yet.
+    """
+    if transcript_writer and transcript_writer.pending_messages(session_id):
+        return None
+    window = messages_window((Message.created_at, Message.id), session_id, after, before, limit).subquery()
+    row = (await db.execute(
+        select(func.count(), func.max(window.c.created_at), func.max(window.c.id))
+    )).one()
+    return row[0], row[1], row[2]
+
+async def load_messages(db: AsyncSession,
+                        session_id: str,
+                        after: Optional[Cursor] = None,
+                        before: Optional[Cursor] = None,
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Load a page of a session's transcript as plain rows in (created_at, id) order.
+    
+    Rows still queued for write-behind are merged in. With only ``before``
+    set, the page is the ``limit`` messages just before the cursor.
+    """
+    # Plain column rows skip building ORM objects
+    query = messages_window(
+        (Message.id, Message.session_id, Message.sender, Message.content, Message.created_at),
+        session_id, after, before, limit
+    )
+    backwards = before is not None and after is None
+    rows = (await db.execute(query)).mappings().all()
+    messages = [dict(row) for row in rows]
+    if backwards:
+        messages.reverse()
+    
+    # Include messages still waiting in the write-behind queue
+    if transcript_writer:
+        stored_ids = {msg["id"] for msg in messages}
+        pending = [
+            row for row in transcript_writer.pending_messages(session_id)
+            if row["id"] not in stored_ids
+            and (after is None or row_cursor(row) > after)
+            and (before is None or row_cursor(row) < before)
         ]
-    finally:
-        db.close()
+        if pending:
+            messages = sorted(messages + pending, key=row_cursor)
+            if limit:
+                messages = messages[-limit:] if backwards else messages[:limit]
+    
+    return messages
 
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time updates"""
-    await manager.connect(session_id, websocket)
+async def websocket_endpoint(websocket: WebSocket, session_id: str, encoding: str = wire.JSON):
+    """WebSocket endpoint for real-time updates and full-duplex chat.
+    
+    Clients send JSON frames: ``user_message`` runs a turn exactly like
+    ``POST /api/messages``, ``ping`` gets a ``pong`` and ``resync`` returns
+    the session and transcript. Each response frame carries the request's
+    ``id`` as ``reply_to``; turn output is broadcast as usual.
+    
+    Connect with ``?encoding=msgpack`` to receive binary MessagePack frames
+    instead of JSON text; binary client frames are read as MessagePack.
+    Large frames are compressed with permessage-deflate when the client
+    offers it (uvicorn enables it by default).
+    """
+    await manager.connect(session_id, websocket, wire.negotiate(encoding))
+    # Turns run one at a time in the background so pings are answered mid-turn
+    turn_lock = asyncio.Lock()
+    turns = set()
     try:
         while True:
-            # Keep connection alive
-            data = await websocket.receive_text()
-            # Echo back for connection test
-            await websocket.send_text(f"Echo: {data}")
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            data = received.get("text")
+            if data is None:
+                data = received.get("bytes")
+            try:
+                frame = ClientFrame(**wire.loads(data))
+            except (ValueError, TypeError, ValidationError) as e:
+                manager.send_to(websocket, {"type": "error", "reply_to": None, "detail": f"Invalid frame: {e}"})
+                continue
+            
+            if frame.type == "ping":
+                manager.send_to(websocket, {"type": "pong", "reply_to": frame.id})
+            elif frame.type == "resync":
+                await handle_resync(websocket, session_id, frame)
+            elif not (frame.message or "").strip():
+                manager.send_to(websocket, {"type": "error", "reply_to": frame.id, "detail": "message is required"})
+            else:
+                turn = asyncio.create_task(handle_user_message(websocket, session_id, frame, turn_lock))
+                turns.add(turn)
+                turn.add_done_callback(turns.discard)
     except WebSocketDisconnect:
         manager.disconnect(session_id, websocket)
 
+async def handle_user_message(websocket: WebSocket, session_id: str, frame: ClientFrame, turn_lock: asyncio.Lock):
+    """Run a turn sent over the WebSocket and answer with its outcome"""
+    async with turn_lock:
+        try:
+            with tracing.trace("WS user_message", reply_to=frame.id):
+                async with AsyncSessionLocal() as db:
+                    result = await run_turn(db, session_id, frame.message, frame.stream)
+        except HTTPException as e:
+            manager.send_to(websocket, {"type": "error", "reply_to": frame.id, "detail": e.detail})
+            return
+        except Exception as e:
+            print(f"Error handling websocket turn: {e}")
+            manager.send_to(websocket, {"type": "error", "reply_to": frame.id, "detail": "Failed to process message"})
+            return
+    manager.send_to(websocket, {"type": "turn_complete", "reply_to": frame.id, **result.dict()})
+
+async def handle_resync(websocket: WebSocket, session_id: str, frame: ClientFrame):
+    """Send the session state and transcript, e.g. after a reconnect.
+    
+    With ``since`` set to the client's last message id only newer messages
+    are sent; ``since`` is null in the reply when the full transcript is
+    sent instead because that message is unknown.
+    """
+    async with AsyncSessionLocal() as db:
+        session = await session_store.get(db, session_id)
+        if not session:
+            manager.send_to(websocket, {"type": "error", "reply_to": frame.id, "detail": "Session not found"})
+            return
+        after = await message_cursor(db, session_id, frame.since) if frame.since else None
+        messages = await load_messages(db, session_id, after)
+    manager.send_to(websocket, {
+        "type": "resync",
+        "reply_to": frame.id,
+        "since": frame.since if after else None,
+        "session": {
+            "id": session.id,
+            "status": session.status,
+            "current_step": session.current_step,
+            "created_at": session.created_at.isoformat(),
+            "data": session.data
+        },
+        "messages": messages
+    })
+
 @app.post("/api/vehicles")
-async def add_vehicle(vehicle: VehicleCreate):
+async def add_vehicle(vehicle: VehicleCreate, db: AsyncSession = Depends(get_db)):
     """Add a vehicle to a session"""
-    db = next(get_db())
-    try:
-        # Verify session exists
-        session = db.query(Session).filter(Session.id == vehicle.session_id).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Create vehicle
-        db_vehicle = Vehicle(
-            id=str(uuid.uuid4()),
-            **vehicle.dict()
-        )
-        db.add(db_vehicle)
-        db.commit()
-        db.refresh(db_vehicle)
-        
-        return {"id": db_vehicle.id, "message": "Vehicle added successfully"}
-    finally:
-        db.close()
+    # Verify session exists
+    session = await db.get(Session, vehicle.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Create vehicle
+    db_vehicle = Vehicle(
+        id=str(uuid.uuid4()),
+        **vehicle.dict()
+    )
+    db.add(db_vehicle)
+    await db.commit()
+    await db.refresh(db_vehicle)
+    
+    return {"id": db_vehicle.id, "message": "Vehicle added successfully"}
 
 @app.get("/api/vehicles/{session_id}")
-async def get_vehicles(session_id: str):
+async def get_vehicles(session_id: str, db: AsyncSession = Depends(get_db)):
     """Get all vehicles for a session"""
-    db = next(get_db())
-    try:
-        vehicles = db.query(Vehicle).filter(
+    vehicles = (await db.execute(
+        select(Vehicle.__table__).where(
             Vehicle.session_id == session_id
-        ).all()
-        
-        return vehicles
-    finally:
-        db.close()
+        ).order_by(Vehicle.created_at, Vehicle.id)
+    )).mappings().all()
+    
+    return FastJSONResponse([dict(vehicle) for vehicle in vehicles])
+
+@app.post("/api/import", dependencies=[Depends(require_admin)])
+async def import_leads_file(request: Request, format: str = "ndjson"):
+    """Bulk import onboarding leads from an NDJSON or CSV body of at most IMPORT_MAX_BYTES.
+    
+    Streams back one NDJSON record per rejected row and a final summary.
+    Requires the admin token.
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    too_large = HTTPException(status_code=413, detail=f"Upload is larger than {IMPORT_MAX_BYTES} bytes")
+    if int(request.headers.get("content-length") or 0) > IMPORT_MAX_BYTES:
+        raise too_large
+    
+    # Spool the upload first (to disk once it is large) so the response can
+    # stream while memory stays flat. Writes run in a thread, since past the
+    # first MiB they go to disk
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > IMPORT_MAX_BYTES:
+                raise too_large
+            await run_in_threadpool(spool.write, chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    
+    async def records():
+        try:
+            async for record in import_leads(text, format, chatbot.flow, AsyncSessionLocal):
+                yield json.dumps(record) + "\n"
+        finally:
+            spool.close()
+    
+    return StreamingResponse(records(), media_type="application/x-ndjson")
+
+@app.get("/api/export", dependencies=[Depends(require_admin)])
+async def export(format: str = "ndjson",
+                 since: Optional[datetime] = None,
+                 until: Optional[datetime] = None,
+                 status: List[str] = Query(default=[]),
+                 cursor: Optional[str] = None,
+                 transcripts: bool = False):
+    """Stream sessions with their answers, vehicles and optionally transcripts for analytics.
+    
+    Every record carries a cursor; pass the last one received to resume an
+    interrupted export. NDJSON output ends with a summary record. Requires
+    the admin token.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    try:
+        query = ExportQuery(since, until, status, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    summary: Dict[str, Any] = {}
+    
+    async def chunks():
+        async for chunk in export_sessions(AsyncSessionLocal, query, format, chatbot.flow, transcripts,
+                                           summary=summary):
+            yield chunk
+        if metrics.METRICS_ENABLED:
+            metrics.export_sessions_total.inc(summary["sessions"], format)
+            metrics.export_rows_total.inc(summary["rows"], format)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(chunks(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="sessions.{format}"'
+    })
 
 if __name__ == "__main__":
     import uvicorn
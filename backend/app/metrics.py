@@ -0,0 +1,224 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Metrics settings from environment variables
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Flow step of the turn being handled, used as the step label on every
+# histogram observed while it runs (DB hooks and the LLM client included)
+current_step: ContextVar[str] = ContextVar("current_step", default="none")
+
+# Latency buckets in seconds, from sub-millisecond DB queries to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for metrics kept in memory and rendered in Prometheus text format"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, *label_values: str):
+        key = tuple(label_values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; observing is one bisect and three additions"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound) if bound == float("inf") else bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter read from a callback at scrape time, costing nothing in between"""
+
+    def __init__(self,
+                 name: str,
+                 help: str,
+                 labels: Sequence[str],
+                 read: Callable[[], Dict[LabelValues, float]],
+                 kind: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> Iterator[str]:
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self._names = set()
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._names:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._names.add(metric.name)
+        self.metrics.append(metric)
+        return metric
+
+    def unregister(self, name: str):
+        self.metrics = [metric for metric in self.metrics if metric.name != name]
+        self._names.discard(name)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+db_query_seconds = registry.register(Histogram(
+    "chatbot_db_query_seconds", "Database statement time", ("step", "operation")))
+llm_seconds = registry.register(Histogram(
+    "chatbot_llm_seconds", "LLM call time until the full reply arrived", ("step", "call_site")))
+llm_tokens = registry.register(Counter(
+    "chatbot_llm_tokens_total", "LLM tokens used (streamed completions count one token per delta)", ("call_site", "type")))
+llm_provider_seconds = registry.register(Histogram(
+    "chatbot_llm_provider_seconds", "Time for one provider to answer (to the first delta when streaming)",
+    ("provider", "mode", "outcome")))
+llm_hedges = registry.register(Counter(
+    "chatbot_llm_hedges_total", "Hedged LLM requests by the provider they went to and whether they won",
+    ("provider", "result")))
+llm_calls_saved = registry.register(Counter(
+    "chatbot_llm_calls_saved_total", "LLM calls avoided by single-flight de-duplication or micro-batching",
+    ("call_site", "kind")))
+llm_route_choices = registry.register(Counter(
+    "chatbot_llm_route_choices_total", "Models picked by the LLM router (template when every model missed its SLO)",
+    ("call_site", "step", "model")))
+llm_prefetch = registry.register(Counter(
+    "chatbot_llm_prefetch_total", "Speculative reply prefetches by outcome", ("step", "result")))
+llm_prefetch_wasted_tokens = registry.register(Counter(
+    "chatbot_llm_prefetch_wasted_tokens_total",
+    "Estimated completion tokens of prefetched replies that were never used", ("step",)))
+retention_sessions = registry.register(Counter(
+    "chatbot_retention_sessions_total", "Sessions handled by the retention job", ("action",)))
+retention_rows = registry.register(Counter(
+    "chatbot_retention_rows_deleted_total", "Child rows moved out of the hot tables with archived sessions", ("table",)))
+export_sessions_total = registry.register(Counter(
+    "chatbot_export_sessions_total", "Sessions streamed by finished analytics exports", ("format",)))
+export_rows_total = registry.register(Counter(
+    "chatbot_export_rows_total", "Rows streamed by finished analytics exports", ("format",)))
+broadcast_seconds = registry.register(Histogram(
+    "chatbot_broadcast_seconds", "Time to publish one WebSocket broadcast", ("step",)))
+turn_seconds = registry.register(Histogram(
+    "chatbot_turn_seconds", "Total time of one chat turn", ("step",)))
+
+
+def register_callback(name: str,
+                      help: str,
+                      labels: Sequence[str],
+                      read: Callable[[], Dict[LabelValues, float]],
+                      kind: str = "gauge"):
+    """Register (or replace) a metric read from a callback at scrape time"""
+    registry.unregister(name)
+    registry.register(CallbackMetric(name, help, labels, read, kind))
+
+
+def observe_db(seconds: float, statement: str):
+    """Record one database statement, labelled by its SQL verb"""
+    if METRICS_ENABLED:
+        operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+        db_query_seconds.observe(seconds, current_step.get(), operation)
+
+
+@contextmanager
+def timed(histogram: Histogram, *label_values: str):
+    """Time a block into a histogram whose first label is the current step"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, current_step.get(), *label_values)
+
+
+def record_tokens(call_site: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if METRICS_ENABLED:
+        if prompt_tokens:
+            llm_tokens.inc(prompt_tokens, call_site, "prompt")
+        if completion_tokens:
+            llm_tokens.inc(completion_tokens, call_site, "completion")
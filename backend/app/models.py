@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, Float, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, Boolean, Integer, Float, DateTime, Text, ForeignKey, Enum, JSON, Index, LargeBinary
 from .database import Base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -8,6 +8,7 @@ import enum
 class SessionStatus(enum.Enum):
     active = "active"
     completed = "completed"
+    abandoned = "abandoned"  # marked by the retention job after a period of inactivity
 
 class MessageSender(enum.Enum):
     user = "user"
@@ -26,6 +27,13 @@ class Session(Base):
     # Relationships
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
     vehicles = relationship("Vehicle", back_populates="session", cascade="all, delete-orphan")
+    
+    # The retention job finds old completed and idle active sessions by status
+    # and age; the analytics export walks sessions in (created_at, id) order
+    __table_args__ = (
+        Index("ix_sessions_status_updated", "status", "updated_at"),
+        Index("ix_sessions_created", "created_at", "id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -38,6 +46,11 @@ class Message(Base):
     
     # Relationships
     session = relationship("Session", back_populates="messages")
+    
+    # Keyset pagination walks a session's transcript in (created_at, id) order
+    __table_args__ = (
+        Index("ix_messages_session_created", "session_id", "created_at", "id"),
+    )
 
 class Vehicle(Base):
     __tablename__ = "vehicles"
@@ -65,4 +78,48 @@ class Vehicle(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    session = relationship("Session", back_populates="vehicles")
\ No newline at end of file
+    session = relationship("Session", back_populates="vehicles")
+    
+    __table_args__ = (
+        Index("ix_vehicles_session_created", "session_id", "created_at", "id"),
+    )
+
+class ArchivedSession(Base):
+    """A session moved out of the hot tables, with its transcript as one compressed blob"""
+    __tablename__ = "archived_sessions"
+    
+    id = Column(String(36), primary_key=True)  # the original session id
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(Enum(SessionStatus))
+    current_step = Column(String(50))
+    data = Column(JSON)
+    message_count = Column(Integer, nullable=False)
+    # zlib-compressed JSON list of the session's messages, oldest first
+    transcript = Column(LargeBinary(16 * 1024 * 1024), nullable=False)  # MEDIUMBLOB on MySQL
+    
+    __table_args__ = (
+        Index("ix_archived_sessions_created", "created_at"),
+    )
+
+class ArchivedVehicle(Base):
+    """A vehicle of an archived session, kept as rows so it stays queryable"""
+    __tablename__ = "archived_vehicles"
+    
+    id = Column(String(36), primary_key=True)
+    session_id = Column(String(36), ForeignKey("archived_sessions.id"))
+    vin = Column(String(17), nullable=True)
+    year = Column(Integer, nullable=True)
+    make = Column(String(50), nullable=True)
+    body_type = Column(String(50), nullable=True)
+    vehicle_use = Column(String(20), nullable=False)
+    blind_spot_warning = Column(Boolean, nullable=False)
+    commute_days_per_week = Column(Integer, nullable=True)
+    commute_one_way_miles = Column(Float, nullable=True)
+    annual_mileage = Column(Integer, nullable=True)
+    created_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_archived_vehicles_session", "session_id"),
+    )
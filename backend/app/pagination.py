@@ -0,0 +1,70 @@
+import base64
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Largest page a client may ask for from environment variable
+MESSAGES_PAGE_MAX = int(os.getenv("MESSAGES_PAGE_MAX", "500"))
+
+# Messages included in a session snapshot by default
+SNAPSHOT_MESSAGES = int(os.getenv("SNAPSHOT_MESSAGES", "100"))
+
+# Position of a row in (created_at, id) order, matching the composite indexes
+Cursor = Tuple[datetime, str]
+
+# Row count, newest created_at and largest id of a page of append-only rows
+WindowVersion = Tuple[int, Optional[datetime], Optional[str]]
+
+
+def row_cursor(row: Dict[str, Any]) -> Cursor:
+    return row["created_at"], row["id"]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Encode a row position as an opaque URL-safe cursor"""
+    created_at, row_id = cursor
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor from encode_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def rows_version(rows: List[Dict[str, Any]]) -> WindowVersion:
+    """The version of a loaded page, as a COUNT/MAX query over the same window returns it"""
+    if not rows:
+        return 0, None, None
+    return len(rows), max(row["created_at"] for row in rows), max(row["id"] for row in rows)
+
+
+def page_etag(version: WindowVersion, *params: Any) -> str:
+    """Weak ETag for a page of append-only rows and the query that produced it.
+
+    Rows are only ever added, so the count and the newest created_at and
+    id change whenever the rows in the window do.
+    """
+    count, created_at, row_id = version
+    parts = [str(count), created_at.isoformat() if created_at else "", row_id or ""]
+    parts += [str(param) for param in params]
+    return f'W/"{hashlib.sha1("|".join(parts).encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the given ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return "*" in candidates or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in candidates]
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .metrics import METRICS_ENABLED, llm_prefetch, llm_prefetch_wasted_tokens
+
+load_dotenv()
+
+# Speculative prefetch settings from environment variables (off by default,
+# since every miss spends tokens on a reply nobody reads)
+LLM_PREFETCH = os.getenv("LLM_PREFETCH", "false").lower() == "true"
+LLM_PREFETCH_TTL = float(os.getenv("LLM_PREFETCH_TTL", "120"))
+LLM_PREFETCH_MAX_INFLIGHT = int(os.getenv("LLM_PREFETCH_MAX_INFLIGHT", "32"))
+# Stop prefetching a step once this many of its prefetches have been
+# settled with a hit rate below LLM_PREFETCH_MIN_HIT_RATE
+LLM_PREFETCH_MIN_ATTEMPTS = int(os.getenv("LLM_PREFETCH_MIN_ATTEMPTS", "20"))
+LLM_PREFETCH_MIN_HIT_RATE = float(os.getenv("LLM_PREFETCH_MIN_HIT_RATE", "0.5"))
+
+# Rough completion size of a wasted reply, at about four characters per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(reply: Any) -> int:
+    return max(1, len(str(reply)) // CHARS_PER_TOKEN)
+
+
+class _Prefetch:
+    __slots__ = ("step", "key", "task", "expires", "expected_tokens")
+
+    def __init__(self, step: str, key: Hashable, task: asyncio.Task, expires: float, expected_tokens: int):
+        self.step = step
+        self.key = key
+        self.task = task
+        self.expires = expires
+        self.expected_tokens = expected_tokens
+
+
+class Prefetcher:
+    """Speculatively generated replies, keyed by (session, step) with a short TTL.
+
+    When a turn completes, the reply the next answer will most likely need
+    is generated in the background. The next turn takes it if its key
+    matches what the answer actually requires; otherwise it is cancelled
+    (or dropped, if already finished) and counted as wasted. A call
+    cancelled in flight is counted at the step's average reply size, since
+    the provider may already have spent the tokens.
+    """
+
+    def __init__(self,
+                 ttl: float = LLM_PREFETCH_TTL,
+                 max_inflight: int = LLM_PREFETCH_MAX_INFLIGHT,
+                 min_attempts: int = LLM_PREFETCH_MIN_ATTEMPTS,
+                 min_hit_rate: float = LLM_PREFETCH_MIN_HIT_RATE):
+        self.ttl = ttl
+        self.max_inflight = max_inflight
+        self.min_attempts = min_attempts
+        self.min_hit_rate = min_hit_rate
+        self._entries: Dict[Tuple[str, str], _Prefetch] = {}
+        # step -> [hits, settled prefetches]
+        self._step_results: Dict[str, list] = {}
+        # step -> [estimated tokens, replies] of finished prefetches
+        self._reply_tokens: Dict[str, list] = {}
+        self.counts: Dict[str, int] = {}
+        self.wasted_tokens = 0
+
+    def _count(self, result: str, step: str):
+        self.counts[result] = self.counts.get(result, 0) + 1
+        if METRICS_ENABLED:
+            llm_prefetch.inc(1, step, result)
+        if result in ("hit", "miss", "expired"):
+            results = self._step_results.setdefault(step, [0, 0])
+            results[0] += result == "hit"
+            results[1] += 1
+
+    def worthwhile(self, step: str) -> bool:
+        """Whether prefetching ``step`` has paid off often enough to keep doing it"""
+        hits, settled = self._step_results.get(step, (0, 0))
+        return settled < self.min_attempts or hits / settled >= self.min_hit_rate
+
+    def start(self,
+              session_id: str,
+              step: str,
+              key: Hashable,
+              generate: Callable[[], Awaitable[str]],
+              expected_tokens: int = 0) -> bool:
+        """Start generating the reply for ``key``, returning whether a prefetch was started.
+
+        ``generate`` must not share its LLM call with other callers, so that
+        cancelling the prefetch cancels the call. ``expected_tokens`` sizes a
+        cancelled call until replies for the step have been seen.
+        """
+        self.sweep()
+        existing = self._entries.get((session_id, step))
+        if existing is not None:
+            if existing.key == key:
+                # Still the best guess (e.g. after an invalid answer); keep it
+                existing.expires = time.monotonic() + self.ttl
+                return False
+            self._discard(self._entries.pop((session_id, step)), "cancelled")
+        if not self.worthwhile(step):
+            self._count("skipped", step)
+            return False
+        if sum(1 for entry in self._entries.values() if not entry.task.done()) >= self.max_inflight:
+            self._count("skipped", step)
+            return False
+        task = asyncio.ensure_future(generate())
+        task.add_done_callback(lambda t: self._finished(step, t))
+        self._entries[(session_id, step)] = _Prefetch(step, key, task, time.monotonic() + self.ttl, expected_tokens)
+        self._count("started", step)
+        return True
+
+    def _finished(self, step: str, task: asyncio.Task):
+        # Failures are reported when the prefetch is taken or discarded
+        if task.cancelled() or task.exception() is not None:
+            return
+        sizes = self._reply_tokens.setdefault(step, [0, 0])
+        sizes[0] += estimate_tokens(task.result())
+        sizes[1] += 1
+
+    def expected_tokens(self, entry: _Prefetch) -> int:
+        """Estimated completion tokens of a prefetch that has not finished"""
+        total, replies = self._reply_tokens.get(entry.step, (0, 0))
+        return round(total / replies) if replies else entry.expected_tokens
+
+    async def take(self, session_id: Optional[str], step: str, key: Hashable) -> Optional[Any]:
+        """Return the prefetched reply if it matches ``key``, waiting for it if still in flight"""
+        entry = self._entries.pop((session_id, step), None) if session_id else None
+        if entry is None:
+            return None
+        if time.monotonic() > entry.expires:
+            self._discard(entry, "expired")
+            return None
+        if entry.key != key:
+            self._discard(entry, "miss")
+            return None
+        try:
+            reply = await asyncio.shield(entry.task)
+        except Exception:
+            self._count("failed", step)
+            return None
+        self._count("hit", step)
+        return reply
+
+    def drop(self, session_id: str, step: str):
+        """Drop the prefetch for a turn that was answered without it (e.g. from the response cache)"""
+        entry = self._entries.pop((session_id, step), None)
+        if entry is not None:
+            self._discard(entry, "unused")
+
+    def discard(self, session_id: str):
+        """Drop every prefetch for a session (e.g. once it is complete)"""
+        for key in [key for key in self._entries if key[0] == session_id]:
+            self._discard(self._entries.pop(key), "cancelled")
+
+    def sweep(self):
+        """Drop expired prefetches, whose sessions went quiet"""
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if now > entry.expires]:
+            self._discard(self._entries.pop(key), "expired")
+
+    def _discard(self, entry: _Prefetch, result: str):
+        """Cancel or drop a prefetch nobody will use, counting its tokens as wasted"""
+        self._count(result, entry.step)
+        if not entry.task.done():
+            entry.task.cancel()
+            tokens = self.expected_tokens(entry)
+        elif entry.task.cancelled() or entry.task.exception() is not None:
+            return
+        else:
+            tokens = estimate_tokens(entry.task.result())
+        if not tokens:
+            return
+        self.wasted_tokens += tokens
+        if METRICS_ENABLED:
+            llm_prefetch_wasted_tokens.inc(tokens, entry.step)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.counts.get("hit", 0)
+        settled = hits + self.counts.get("miss", 0) + self.counts.get("expired", 0)
+        return {
+            "pending": len(self._entries),
+            "counts": dict(self.counts),
+            "hit_rate": round(hits / settled, 3) if settled else None,
+            "wasted_tokens_estimate": self.wasted_tokens,
+            "disabled_steps": sorted(step for step in self._step_results if not self.worthwhile(step)),
+        }
@@ -0,0 +1,109 @@
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Response cache settings from environment variables (size 0 disables it)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+RESPONSE_CACHE_VARIANTS = int(os.getenv("RESPONSE_CACHE_VARIANTS", "3"))
+
+
+class ResponseCache:
+    """Interface for caches of LLM reply templates.
+
+    Each key holds a small pool of variants. ``get`` only returns a variant
+    once the pool for that key is full, so the first few requests per key
+    still reach the LLM and fill it.
+    """
+
+    def get(self, key: Hashable) -> Optional[str]:
+        raise NotImplementedError
+
+    def add(self, key: Hashable, value: str):
+        raise NotImplementedError
+
+    def ready(self, key: Hashable) -> bool:
+        """Whether get would return a variant for key, without counting a lookup"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class LRUResponseCache(ResponseCache):
+    """In-process response cache with LRU eviction and a TTL per key"""
+
+    def __init__(self,
+                 max_entries: int = RESPONSE_CACHE_SIZE,
+                 ttl: float = RESPONSE_CACHE_TTL,
+                 variants: int = RESPONSE_CACHE_VARIANTS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = variants
+        # key -> (created_at, variants)
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _live_entry(self, key: Hashable) -> Optional[Tuple[float, List[str]]]:
+        """Return the entry for key, dropping it if it has expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return a random variant for key once its pool is full"""
+        entry = self._live_entry(key)
+        if entry is None or len(entry[1]) < self.variants:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return random.choice(entry[1])
+
+    def ready(self, key: Hashable) -> bool:
+        entry = self._live_entry(key)
+        return entry is not None and len(entry[1]) >= self.variants
+
+    def add(self, key: Hashable, value: str):
+        """Add a variant for key, evicting the least recently used keys if full"""
+        entry = self._live_entry(key)
+        if entry is None:
+            entry = (time.monotonic(), [])
+            self._entries[key] = entry
+        if len(entry[1]) < self.variants and value not in entry[1]:
+            entry[1].append(value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the configured response cache, or None when caching is disabled"""
+    if RESPONSE_CACHE_SIZE <= 0:
+        return None
+    return LRUResponseCache()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from . import wire
+from .metrics import METRICS_ENABLED, retention_rows, retention_sessions
+from .models import ArchivedSession, ArchivedVehicle, Message, Session, SessionStatus, Vehicle
+
+load_dotenv()
+
+# Retention settings from environment variables. The background job is off
+# by default; with several workers, enable it on one of them or run
+# ``python -m app.retention`` from cron instead.
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+# Completed (and marked abandoned) sessions untouched this long are archived
+RETENTION_ARCHIVE_DAYS = float(os.getenv("RETENTION_ARCHIVE_DAYS", "30"))
+RETENTION_ARCHIVE_STATUSES = os.getenv("RETENTION_ARCHIVE_STATUSES", "completed,abandoned")
+# Active sessions with no activity for this long are abandoned: "mark" sets
+# their status, "purge" deletes them with their messages and vehicles
+RETENTION_ABANDON_HOURS = float(os.getenv("RETENTION_ABANDON_HOURS", "72"))
+RETENTION_ABANDON_ACTION = os.getenv("RETENTION_ABANDON_ACTION", "mark")
+# Sessions handled per transaction, and the pause between transactions,
+# so the job never holds locks for long or starves request handlers
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+RETENTION_PAUSE_MS = float(os.getenv("RETENTION_PAUSE_MS", "50"))
+RETENTION_COMPRESSION_LEVEL = int(os.getenv("RETENTION_COMPRESSION_LEVEL", "6"))
+
+ABANDON_ACTIONS = ("mark", "purge")
+
+MESSAGE_FIELDS = ("id", "sender", "content", "created_at")
+VEHICLE_FIELDS = (
+    "id", "session_id", "vin", "year", "make", "body_type", "vehicle_use", "blind_spot_warning",
+    "commute_days_per_week", "commute_one_way_miles", "annual_mileage", "created_at"
+)
+
+
+def compress_transcript(messages: List[Dict[str, Any]], level: int = RETENTION_COMPRESSION_LEVEL) -> bytes:
+    """Pack a session's messages into one compressed blob"""
+    return zlib.compress(wire.dumps_bytes(messages), level)
+
+
+def load_transcript(blob: bytes) -> List[Dict[str, Any]]:
+    """Unpack a blob written by compress_transcript"""
+    return json.loads(zlib.decompress(blob))
+
+
+class RetentionPolicy:
+    """What the retention job archives and abandons, and how fast it goes"""
+
+    def __init__(self,
+                 archive_days: float = RETENTION_ARCHIVE_DAYS,
+                 archive_statuses: str = RETENTION_ARCHIVE_STATUSES,
+                 abandon_hours: float = RETENTION_ABANDON_HOURS,
+                 abandon_action: str = RETENTION_ABANDON_ACTION,
+                 batch_size: int = RETENTION_BATCH_SIZE,
+                 pause_ms: float = RETENTION_PAUSE_MS):
+        if abandon_action not in ABANDON_ACTIONS:
+            raise ValueError(f"Unknown abandon action {abandon_action!r} (expected one of {', '.join(ABANDON_ACTIONS)})")
+        self.archive_days = archive_days
+        self.archive_statuses = [SessionStatus(status.strip()) for status in archive_statuses.split(",") if status.strip()]
+        self.abandon_hours = abandon_hours
+        self.abandon_action = abandon_action
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "archive_days": self.archive_days,
+            "archive_statuses": [status.value for status in self.archive_statuses],
+            "abandon_hours": self.abandon_hours,
+            "abandon_action": self.abandon_action,
+            "batch_size": self.batch_size,
+        }
+
+
+class RetentionJob:
+    """Archives old finished sessions and abandons idle ones, in small batches.
+
+    Each batch is one short transaction over at most ``batch_size``
+    sessions, so row locks are held briefly and a failure loses at most
+    one batch, which the next run picks up again. Archived sessions keep
+    their row (with the transcript as one compressed blob) and their
+    vehicles in the archive tables; their hot rows are deleted. In dry-run
+    mode nothing is written and the run reports what it would do.
+    """
+
+    def __init__(self,
+                 session_factory: async_sessionmaker,
+                 policy: Optional[RetentionPolicy] = None,
+                 on_removed: Optional[Callable[[List[str]], None]] = None):
+        self.session_factory = session_factory
+        self.policy = policy or RetentionPolicy()
+        # Told which sessions left (or changed in) the hot tables, e.g. to drop cached state
+        self.on_removed = on_removed
+        self.running = False
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.progress: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _abandoned_filter(self, cutoff: datetime) -> list:
+        # Invalid answers do not touch the session row, so recent messages count as activity too
+        recent_message = exists().where(Message.session_id == Session.id, Message.created_at >= cutoff)
+        return [Session.status == SessionStatus.active, Session.updated_at < cutoff, ~recent_message]
+
+    def _archive_filter(self, cutoff: datetime) -> list:
+        return [Session.status.in_(self.policy.archive_statuses), Session.updated_at < cutoff]
+
+    async def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Run one full pass: abandon idle sessions, then archive old ones"""
+        if self.running:
+            raise RuntimeError("A retention run is already in progress")
+        self.running = True
+        self.progress = {"abandoned": 0, "archived": 0, "messages": 0, "vehicles": 0}
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        try:
+            abandon_cutoff = now - timedelta(hours=self.policy.abandon_hours)
+            archive_cutoff = now - timedelta(days=self.policy.archive_days)
+            if dry_run:
+                summary = await self._dry_run(abandon_cutoff, archive_cutoff)
+            else:
+                await self._in_batches(self._abandoned_filter(abandon_cutoff), self._abandon_batch)
+                await self._in_batches(self._archive_filter(archive_cutoff), self._archive_batch)
+                summary = dict(self.progress)
+        finally:
+            self.running = False
+        summary.update({
+            "dry_run": dry_run,
+            "abandon_action": self.policy.abandon_action,
+            "started_at": now.isoformat(),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+        self.runs += 1
+        self.last_run = summary
+        return summary
+
+    async def _dry_run(self, abandon_cutoff: datetime, archive_cutoff: datetime) -> Dict[str, Any]:
+        async with self.session_factory() as db:
+            abandoned = await db.scalar(
+                select(func.count()).select_from(Session).where(*self._abandoned_filter(abandon_cutoff))
+            )
+            archive_ids = select(Session.id).where(*self._archive_filter(archive_cutoff))
+            archived = await db.scalar(select(func.count()).select_from(Session).where(*self._archive_filter(archive_cutoff)))
+            messages = await db.scalar(select(func.count()).select_from(Message).where(Message.session_id.in_(archive_ids)))
+            vehicles = await db.scalar(select(func.count()).select_from(Vehicle).where(Vehicle.session_id.in_(archive_ids)))
+        return {"abandoned": abandoned, "archived": archived, "messages": messages, "vehicles": vehicles}
+
+    async def _in_batches(self, where: list, handle: Callable):
+        """Apply ``handle`` to matching sessions, one short transaction per batch"""
+        while True:
+            async with self.session_factory() as db:
+                ids = list(await db.scalars(
+                    select(Session.id).where(*where).order_by(Session.updated_at).limit(self.policy.batch_size)
+                ))
+                if not ids:
+                    return
+                await handle(db, ids)
+                await db.commit()
+            if self.on_removed:
+                self.on_removed(ids)
+            if len(ids) < self.policy.batch_size:
+                return
+            await asyncio.sleep(self.policy.pause)
+
+    async def _abandon_batch(self, db, ids: List[str]):
+        if self.policy.abandon_action == "mark":
+            await db.execute(update(Session).where(Session.id.in_(ids)).values(status=SessionStatus.abandoned))
+        else:
+            await self._delete_sessions(db, ids)
+        self._count("abandoned", "marked" if self.policy.abandon_action == "mark" else "purged", len(ids))
+
+    async def _archive_batch(self, db, ids: List[str]):
+        sessions = (await db.execute(select(Session.__table__).where(Session.id.in_(ids)))).mappings().all()
+        messages = (await db.execute(
+            select(Message.__table__).where(Message.session_id.in_(ids))
+            .order_by(Message.session_id, Message.created_at, Message.id)
+        )).mappings().all()
+        vehicles = (await db.execute(select(Vehicle.__table__).where(Vehicle.session_id.in_(ids)))).mappings().all()
+
+        transcripts: Dict[str, List[Dict[str, Any]]] = {session_id: [] for session_id in ids}
+        for message in messages:
+            transcripts[message["session_id"]].append({field: message[field] for field in MESSAGE_FIELDS})
+        await db.execute(insert(ArchivedSession), [
+            {
+                "id": session["id"],
+                "created_at": session["created_at"],
+                "updated_at": session["updated_at"],
+                "archived_at": datetime.utcnow(),
+                "status": session["status"],
+                "current_step": session["current_step"],
+                "data": session["data"],
+                "message_count": len(transcripts[session["id"]]),
+                "transcript": compress_transcript(transcripts[session["id"]]),
+            }
+            for session in sessions
+        ])
+        if vehicles:
+            await db.execute(insert(ArchivedVehicle), [{field: vehicle[field] for field in VEHICLE_FIELDS} for vehicle in vehicles])
+        await self._delete_sessions(db, ids)
+        self._count("archived", "archived", len(sessions))
+        self._rows("messages", len(messages))
+        self._rows("vehicles", len(vehicles))
+
+    async def _delete_sessions(self, db, ids: List[str]):
+        await db.execute(delete(Message).where(Message.session_id.in_(ids)))
+        await db.execute(delete(Vehicle).where(Vehicle.session_id.in_(ids)))
+        await db.execute(delete(Session).where(Session.id.in_(ids)))
+
+    def _count(self, progress_key: str, action: str, count: int):
+        self.progress[progress_key] += count
+        if METRICS_ENABLED:
+            retention_sessions.inc(count, action)
+
+    def _rows(self, table: str, count: int):
+        self.progress[table] += count
+        if METRICS_ENABLED and count:
+            retention_rows.inc(count, table)
+
+    def start(self, interval: float = RETENTION_INTERVAL_SECONDS):
+        """Start running the job in the background every ``interval`` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self, interval: float):
+        while True:
+            try:
+                summary = await self.run()
+                if summary["abandoned"] or summary["archived"]:
+                    print(f"Retention run: {json.dumps(summary)}")
+            except Exception as e:
+                print(f"Error in retention run: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "running": self.running,
+            "runs": self.runs,
+            "policy": self.policy.describe(),
+            "progress": self.progress,
+            "last_run": self.last_run,
+        }
+
+
+async def _main(dry_run: bool, policy: RetentionPolicy):
+    from .database import AsyncSessionLocal, async_engine
+
+    try:
+        summary = await RetentionJob(AsyncSessionLocal, policy).run(dry_run=dry_run)
+        print(json.dumps(summary))
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old sessions and abandon idle ones")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be done without writing")
+    parser.add_argument("--archive-days", type=float, default=RETENTION_ARCHIVE_DAYS)
+    parser.add_argument("--archive-statuses", default=RETENTION_ARCHIVE_STATUSES)
+    parser.add_argument("--abandon-hours", type=float, default=RETENTION_ABANDON_HOURS)
+    parser.add_argument("--abandon-action", choices=ABANDON_ACTIONS, default=RETENTION_ABANDON_ACTION)
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=float, default=RETENTION_PAUSE_MS)
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run, RetentionPolicy(
+        args.archive_days, args.archive_statuses, args.abandon_hours, args.abandon_action,
+        args.batch_size, args.pause_ms
+    )))
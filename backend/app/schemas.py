@@ -1,11 +1,13 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
 class SessionStatus(str, Enum):
     active = "active"
     completed = "completed"
+    # Set by the retention job on idle sessions; the next turn reactivates them
+    abandoned = "abandoned"
 
 class MessageSender(str, Enum):
     user = "user"
@@ -50,24 +52,42 @@ class VehicleCreate(BaseModel):
 class ChatRequest(BaseModel):
     session_id: str
     message: str
+    stream: bool = False
+
+class ClientFrameType(str, Enum):
+    user_message = "user_message"
+    ping = "ping"
+    resync = "resync"
+
+class ClientFrame(BaseModel):
+    """A frame sent by the client over the session WebSocket"""
+    type: ClientFrameType
+    # Correlation id echoed back as reply_to on the response frame
+    id: Optional[str] = None
+    message: Optional[str] = None
+    stream: bool = True
+    # For resync: the id of the last message the client has
+    since: Optional[str] = None
 
 # Response models
-class SessionResponse(BaseModel):
+class MessageResponse(BaseModel):
     id: str
-    status: SessionStatus
-    current_step: str
+    session_id: str
+    sender: MessageSender
+    content: str
     created_at: datetime
-    data: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
 
-class MessageResponse(BaseModel):
+class SessionResponse(BaseModel):
     id: str
-    session_id: str
-    sender: MessageSender
-    content: str
+    status: SessionStatus
+    current_step: str
     created_at: datetime
+    data: Optional[Dict[str, Any]] = None
+    # Set when the session is created, so the first paint needs no other request
+    greeting: Optional[MessageResponse] = None
 
     class Config:
         from_attributes = True
@@ -92,4 +112,16 @@ class VehicleResponse(BaseModel):
 class ChatResponse(BaseModel):
     message: str
     current_step: str
-    session_status: SessionStatus
\ No newline at end of file
+    session_status: SessionStatus
+    ttft_ms: Optional[float] = None
+
+class SessionSnapshot(BaseModel):
+    session: SessionResponse
+    # Latest page of the transcript, oldest first
+    messages: List[MessageResponse]
+    vehicles: List[VehicleResponse]
+    # Whether older messages exist; fetch them with ?before=prev_cursor
+    has_more: bool
+    prev_cursor: Optional[str] = None
+    # Resume point for ?after= once the socket reconnects
+    next_cursor: Optional[str] = None
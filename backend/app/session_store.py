@@ -0,0 +1,104 @@
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .broker import WS_BROKER
+from .models import Session
+
+load_dotenv()
+
+# Session state cache size from environment variable. Off by default: the
+# cache is per process, so with several workers one of them could serve a
+# stale step and its turn would overwrite newer state. Enable it only for a
+# single worker (or with sticky sessions).
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "0"))
+# Worker count as uvicorn and gunicorn read it
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def cache_size(requested: int) -> int:
+    """The cache size to use, refusing to cache when several workers share sessions"""
+    if requested > 0 and (WS_BROKER == "unix" or WEB_CONCURRENCY > 1):
+        print("SESSION_CACHE_SIZE ignored: the session state cache is per process and "
+              "several workers are configured (WS_BROKER=unix or WEB_CONCURRENCY > 1)")
+        return 0
+    return requested
+
+
+class SessionState:
+    """Flow state of one chat session, as kept in the hot store"""
+
+    __slots__ = ("id", "status", "current_step", "data", "created_at")
+
+    def __init__(self, id: str, status: str, current_step: str, data: Dict[str, Any], created_at: datetime):
+        self.id = id
+        self.status = status
+        self.current_step = current_step
+        self.data = data
+        self.created_at = created_at
+
+    @classmethod
+    def from_model(cls, session: Session) -> "SessionState":
+        status = session.status.value if hasattr(session.status, "value") else session.status
+        return cls(session.id, status, session.current_step, dict(session.data or {}), session.created_at)
+
+
+class SessionStateStore:
+    """Bounded LRU cache of active session state in front of the sessions table.
+
+    Reads load from the database on a miss. Writers update the database
+    first and then call ``put``, so the cache never holds state that was
+    not committed. State is per process, so the cache stays off when
+    several workers are configured.
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_SIZE):
+        self.max_entries = cache_size(max_entries)
+        self._entries: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, db: AsyncSession, session_id: str) -> Optional[SessionState]:
+        """Return the session state, loading it from the database on a miss"""
+        state = self._entries.get(session_id)
+        if state is not None:
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return state
+
+        self.misses += 1
+        session = await db.get(Session, session_id)
+        if session is None:
+            return None
+        state = SessionState.from_model(session)
+        self.put(state)
+        return state
+
+    def put(self, state: SessionState):
+        """Store committed session state, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        self._entries[state.id] = state
+        self._entries.move_to_end(state.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        """Drop a session so the next read reloads it from the database"""
+        self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tracing settings from environment variables
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_LOG_MIN_MS = float(os.getenv("TRACE_LOG_MIN_MS", "250"))  # log traces at least this slow
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+# Traces carry session ids and timings, so /api/debug/traces is off unless asked for
+TRACE_ENDPOINT_ENABLED = os.getenv("TRACE_ENDPOINT_ENABLED", "false").lower() == "true"
+
+# Sampling profiler settings (off unless PROFILE_SLOW_MS is set or a request sends PROFILE_HEADER)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_MAX_PER_MINUTE = int(os.getenv("PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/chatbot-profiles")
+
+logger = logging.getLogger("app.trace")
+if not logger.handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("TRACE %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Trace:
+    """Timing breakdown of one request or WebSocket turn"""
+
+    __slots__ = ("id", "name", "start", "spans", "attrs", "profiler", "force_profile")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.start = time.perf_counter()
+        # (name, start offset, duration) in seconds
+        self.spans: List[tuple] = []
+        self.attrs = attrs
+        self.profiler: Optional["SamplingProfiler"] = None
+        self.force_profile = False
+
+    def record(self, duration: float) -> Dict[str, Any]:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "duration_ms": round(duration * 1000, 3),
+            "spans": [
+                {"name": name, "start_ms": round(offset * 1000, 3), "duration_ms": round(span_duration * 1000, 3)}
+                for name, offset, span_duration in self.spans
+            ],
+            **self.attrs
+        }
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+# Most recent trace records, newest last, for the debug endpoint
+recent: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage of the current trace; free when no trace is active"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace.spans.append((name, start - trace.start, end - start))
+
+
+def annotate(**attrs: Any):
+    """Attach attributes (e.g. the flow step) to the current trace"""
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+@contextmanager
+def trace(name: str, profile: bool = False, **attrs: Any) -> Iterator[Optional[Trace]]:
+    """Trace a request or turn, logging its breakdown if it is slow.
+    
+    ``profile`` forces a profile dump (rate limited); with PROFILE_SLOW_MS
+    set, sampled requests that turn out slower than it are dumped too.
+    """
+    if not TRACE_ENABLED:
+        yield None
+        return
+    current = Trace(name, **attrs)
+    if (profile or PROFILE_SLOW_MS > 0) and profile_gate.acquire():
+        current.force_profile = profile
+        current.profiler = SamplingProfiler(threading.get_ident())
+        current.profiler.start()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        _finish(current, time.perf_counter() - current.start)
+
+
+def _finish(current: Trace, duration: float):
+    if current.profiler is not None:
+        path = None
+        if current.force_profile or duration * 1000 >= PROFILE_SLOW_MS:
+            path = current.attrs["profile"] = profile_path(current)
+        _flush_profile(current.profiler, path)
+    record = current.record(duration)
+    recent.append(record)
+    if record["duration_ms"] >= TRACE_LOG_MIN_MS:
+        logger.info(json.dumps(record, default=str))
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack on a timer into collapsed stacks.
+    
+    The event loop thread is shared, so samples include whatever else the
+    loop was running, not only the traced request.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and wait for the sampler thread (blocks; keep it off the event loop)"""
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+
+class ProfileGate:
+    """Lets one profile run at a time and at most `per_minute` start each minute"""
+
+    def __init__(self, per_minute: int = PROFILE_MAX_PER_MINUTE):
+        self.per_minute = per_minute
+        self.active = False
+        self._starts: deque = deque()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        while self._starts and now - self._starts[0] > 60:
+            self._starts.popleft()
+        if self.active or len(self._starts) >= self.per_minute:
+            return False
+        self.active = True
+        self._starts.append(now)
+        return True
+
+    def release(self):
+        self.active = False
+
+
+profile_gate = ProfileGate()
+
+
+def profile_path(current: Trace) -> str:
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{current.id}.folded")
+
+
+def write_profile(path: str, stacks: Counter):
+    """Write collapsed stacks (flamegraph.pl / speedscope input) to ``path``"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def _flush_profile(profiler: SamplingProfiler, path: Optional[str]):
+    """Stop a profiler and write its profile to ``path`` (if set) without blocking the event loop.
+    
+    The gate is released once the sampler thread has exited, so the next
+    profile cannot start while this one is still being written.
+    """
+    def flush():
+        stacks = profiler.stop()
+        if path:
+            write_profile(path, stacks)
+
+    def done(future: asyncio.Future):
+        profile_gate.release()
+        if future.exception() is not None:
+            print(f"Error writing profile {path}: {future.exception()}")
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Not on an event loop, so there is nothing to stall
+        try:
+            flush()
+        except OSError as e:
+            print(f"Error writing profile {path}: {e}")
+        finally:
+            profile_gate.release()
+        return
+    loop.run_in_executor(None, flush).add_done_callback(done)
@@ -0,0 +1,181 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from . import wire
+from .models import Message
+
+load_dotenv()
+
+# Write-behind settings from environment variables
+TRANSCRIPT_WRITE_BEHIND = os.getenv("TRANSCRIPT_WRITE_BEHIND", "false").lower() == "true"
+TRANSCRIPT_FLUSH_INTERVAL_MS = int(os.getenv("TRANSCRIPT_FLUSH_INTERVAL_MS", "200"))
+TRANSCRIPT_BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "500"))
+TRANSCRIPT_MAX_PENDING = int(os.getenv("TRANSCRIPT_MAX_PENDING", "10000"))
+# A failing batch is retried this many times with exponential backoff, then
+# written row by row; rows that still fail are appended to the dead-letter
+# file (as NDJSON) so one bad row cannot stall every later write
+TRANSCRIPT_MAX_RETRIES = int(os.getenv("TRANSCRIPT_MAX_RETRIES", "5"))
+TRANSCRIPT_RETRY_MAX_SECONDS = float(os.getenv("TRANSCRIPT_RETRY_MAX_SECONDS", "5"))
+TRANSCRIPT_DEAD_LETTER_PATH = os.getenv("TRANSCRIPT_DEAD_LETTER_PATH", "transcript_dead_letter.ndjson")
+
+
+def message_row(message: Message) -> Dict[str, Any]:
+    """Convert a Message into the row dict queued for insert"""
+    return {
+        "id": message.id,
+        "session_id": message.session_id,
+        "sender": message.sender,
+        "content": message.content,
+        "created_at": message.created_at
+    }
+
+
+class TranscriptWriter:
+    """Write-behind persistence for transcript messages.
+
+    Messages are queued in memory and a background task writes them with
+    multi-row inserts every flush interval or batch size, whichever comes
+    first. The queue is bounded, so ``enqueue`` waits when the database
+    falls behind. Unflushed messages stay readable per session. A batch
+    that keeps failing is written row by row after a bounded number of
+    retries, and rows that still fail go to a dead-letter file.
+    """
+
+    def __init__(self,
+                 session_factory: async_sessionmaker,
+                 flush_interval_ms: int = TRANSCRIPT_FLUSH_INTERVAL_MS,
+                 batch_size: int = TRANSCRIPT_BATCH_SIZE,
+                 max_pending: int = TRANSCRIPT_MAX_PENDING,
+                 max_retries: int = TRANSCRIPT_MAX_RETRIES,
+                 retry_max_seconds: float = TRANSCRIPT_RETRY_MAX_SECONDS,
+                 dead_letter_path: str = TRANSCRIPT_DEAD_LETTER_PATH):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_max_seconds = retry_max_seconds
+        self.dead_letter_path = dead_letter_path
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        # session_id -> {message_id: row} for messages not yet in the database
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Batch taken off the queue but not yet written
+        self._batch: List[Dict[str, Any]] = []
+        self.flushed = 0
+        self.flush_errors = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write everything still queued (for shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._batch:
+            await self._write(self._batch)
+            self._batch = []
+        while not self._queue.empty():
+            await self._write(self._drain([]))
+
+    async def enqueue(self, message: Dict[str, Any]):
+        """Queue a message row, waiting if too many are pending"""
+        self._pending.setdefault(message["session_id"], {})[message["id"]] = message
+        await self._queue.put(message)
+
+    def pending_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return the session's messages that have not been written yet"""
+        return list(self._pending.get(session_id, {}).values())
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _drain(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                self._drain(batch)
+                remaining = deadline - loop.time()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+            self._batch = []
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        """Write a batch, retrying with backoff, then row by row with failures dead-lettered"""
+        delay = self.flush_interval
+        for attempt in range(self.max_retries + 1):
+            if await self._flush(batch):
+                return
+            if attempt < self.max_retries:
+                # Producers wait on the bounded queue meanwhile
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_seconds)
+        # The batch keeps failing, most likely because of one bad row
+        failed = [message for message in batch if not await self._flush([message])]
+        if failed:
+            await self._dead_letter(failed)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> bool:
+        """Write one batch with a multi-row insert, returning whether it succeeded"""
+        if not batch:
+            return True
+        try:
+            async with self.session_factory() as db:
+                await db.execute(insert(Message), batch)
+                await db.commit()
+        except Exception as e:
+            print(f"Error flushing transcript batch: {e}")
+            self.flush_errors += 1
+            return False
+
+        self.flushed += len(batch)
+        self._forget(batch)
+        return True
+
+    async def _dead_letter(self, rows: List[Dict[str, Any]]):
+        """Append rows that cannot be written to the dead-letter file and stop tracking them"""
+        print(f"Dead-lettering {len(rows)} transcript messages to {self.dead_letter_path}")
+        lines = "".join(wire.dumps(row) + "\n" for row in rows)
+
+        def append():
+            with open(self.dead_letter_path, "a") as f:
+                f.write(lines)
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, append)
+        except OSError as e:
+            print(f"Error writing transcript dead-letter file: {e}")
+        self.dead_lettered += len(rows)
+        self._forget(rows)
+
+    def _forget(self, batch: List[Dict[str, Any]]):
+        for message in batch:
+            session_pending = self._pending.get(message["session_id"])
+            if session_pending is not None:
+                session_pending.pop(message["id"], None)
+                if not session_pending:
+                    del self._pending[message["session_id"]]
@@ -1,13 +1,101 @@
-from typing import Dict, Set
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Set, Optional, Union
 from fastapi import WebSocket
-import json
+from dotenv import load_dotenv
+
+from . import wire
+from .metrics import broadcast_seconds, timed
+from .broker import Broker, create_broker
+
+load_dotenv()
+
+# Outbound queue settings from environment variables
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "coalesce")  # drop_oldest | coalesce | disconnect
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_SLOW_CONSUMER_SECONDS = float(os.getenv("WS_SLOW_CONSUMER_SECONDS", "5"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Close code sent to evicted slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Encoded prefix of streamed delta frames, which the coalesce policy may merge.
+# MessagePack frames start with a one-byte map header, so theirs is checked
+# from the second byte
+DELTA_PREFIX = wire.dumps({"type": "message_delta"})[:-1]
+PACKED_DELTA_PREFIX = wire.pack({"type": "message_delta"})[1:] if wire.msgpack is not None else None
+
+
+def _is_delta(frame: Union[str, bytes]) -> bool:
+    if isinstance(frame, str):
+        return frame.startswith(DELTA_PREFIX)
+    return PACKED_DELTA_PREFIX is not None and frame[1:].startswith(PACKED_DELTA_PREFIX)
+
+
+class Outbox:
+    """Bounded outbound queue and sender task for one WebSocket connection"""
+
+    __slots__ = ("session_id", "websocket", "encoding", "queue", "ready", "task", "overflowing_since", "sent")
+
+    def __init__(self, session_id: str, websocket: WebSocket, encoding: str = wire.JSON):
+        self.session_id = session_id
+        self.websocket = websocket
+        # JSON outboxes queue text frames, MessagePack outboxes binary frames
+        self.encoding = encoding
+        self.queue: deque = deque()
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        # When the queue last filled up; cleared once the sender catches up
+        self.overflowing_since: Optional[float] = None
+        self.sent = 0
+
 
 class ConnectionManager:
-    def __init__(self):
+    """Tracks WebSocket connections and delivers broadcasts to them.
+
+    Each connection has a bounded outbound queue drained by its own sender
+    task, so broadcasting never waits on a client. When a queue is full the
+    overflow policy decides what gives: ``drop_oldest`` drops the oldest
+    queued frame, ``coalesce`` merges streamed deltas for the same message
+    (dropping the oldest frame when they cannot be merged) and
+    ``disconnect`` evicts the connection. A connection whose queue stays
+    full longer than the slow-consumer threshold, or whose send times
+    out, is evicted too.
+    """
+
+    def __init__(self,
+                 broker: Optional[Broker] = None,
+                 queue_size: int = WS_QUEUE_SIZE,
+                 overflow_policy: str = WS_OVERFLOW_POLICY,
+                 send_timeout: float = WS_SEND_TIMEOUT,
+                 slow_consumer_seconds: float = WS_SLOW_CONSUMER_SECONDS):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}, expected one of {', '.join(OVERFLOW_POLICIES)}")
         # Dictionary mapping session_id to set of WebSocket connections
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self._outboxes: Dict[WebSocket, Outbox] = {}
+        # Broadcasts go through the broker so every worker delivers to its own sockets
+        self.broker = broker or create_broker()
+        self._started = False
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.slow_consumer_seconds = slow_consumer_seconds
+        self.dropped = 0
+        self.coalesced = 0
+        self.evictions = 0
 
-    async def connect(self, session_id: str, websocket: WebSocket):
+    async def start(self):
+        """Subscribe this worker to the broker (for startup)"""
+        if not self._started:
+            self._started = True
+            await self.broker.start(self.deliver_local)
+
+    async def connect(self, session_id: str, websocket: WebSocket, encoding: str = wire.JSON):
         """Accept WebSocket connection and add to active connections"""
         await websocket.accept()
         
@@ -15,6 +103,9 @@ class ConnectionManager:
             self.active_connections[session_id] = set()
         
         self.active_connections[session_id].add(websocket)
+        outbox = Outbox(session_id, websocket, encoding)
+        outbox.task = asyncio.create_task(self._send_loop(outbox))
+        self._outboxes[websocket] = outbox
 
     def disconnect(self, session_id: str, websocket: WebSocket):
         """Remove WebSocket from active connections"""
@@ -25,36 +116,132 @@ class ConnectionManager:
             if not self.active_connections[session_id]:
                 del self.active_connections[session_id]
 
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox is not None and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send message to specific WebSocket connection"""
-        await websocket.send_text(message)
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            # Queue behind pending broadcasts so frames keep their order
+            if outbox.encoding == wire.MSGPACK:
+                message = wire.json_to_msgpack(message)
+            self._enqueue(outbox, message)
+
+    def send_to(self, websocket: WebSocket, message: dict):
+        """Queue a reply frame for one connection without waiting"""
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            self._enqueue(outbox, wire.pack(message) if outbox.encoding == wire.MSGPACK else wire.dumps(message))
 
     async def broadcast(self, session_id: str, message: dict):
-        """Broadcast message to all connections for a session"""
-        if session_id in self.active_connections:
-            message_text = json.dumps(message)
-            
-            # Create a list to track connections to remove
-            dead_connections = []
-            
-            for connection in self.active_connections[session_id]:
+        """Broadcast message to all connections for a session, across workers"""
+        if not self._started:
+            await self.start()
+        with timed(broadcast_seconds):
+            await self.broker.publish(session_id, wire.dumps(message))
+
+    async def deliver_local(self, session_id: str, message_text: str):
+        """Queue a published message for this worker's connections for the session"""
+        # Each encoding is produced at most once per broadcast, however many sockets share it
+        packed = None
+        for connection in list(self.active_connections.get(session_id, ())):
+            outbox = self._outboxes.get(connection)
+            if outbox is None:
+                continue
+            if outbox.encoding == wire.MSGPACK:
+                if packed is None:
+                    packed = wire.json_to_msgpack(message_text)
+                self._enqueue(outbox, packed)
+            else:
+                self._enqueue(outbox, message_text)
+
+    def _enqueue(self, outbox: Outbox, message_text: Union[str, bytes]):
+        """Queue one frame without waiting, applying the overflow policy when full"""
+        if len(outbox.queue) >= self.queue_size:
+            now = time.monotonic()
+            if outbox.overflowing_since is None:
+                outbox.overflowing_since = now
+            if self.overflow_policy == "disconnect" or now - outbox.overflowing_since > self.slow_consumer_seconds:
+                self._evict(outbox, "outbound queue full")
+                return
+            if self.overflow_policy == "coalesce" and self._coalesce(outbox, message_text):
+                return
+            outbox.queue.popleft()
+            self.dropped += 1
+
+        outbox.queue.append(message_text)
+        outbox.ready.set()
+
+    def _coalesce(self, outbox: Outbox, message_text: Union[str, bytes]) -> bool:
+        """Merge a streamed delta into the last queued delta for the same message, in either encoding"""
+        last_text = outbox.queue[-1]
+        if not (type(message_text) is type(last_text) and _is_delta(message_text) and _is_delta(last_text)):
+            return False
+        last = wire.loads(last_text)
+        frame = wire.loads(message_text)
+        if last.get("message_id") != frame.get("message_id"):
+            return False
+        last["delta"] += frame["delta"]
+        outbox.queue[-1] = wire.pack(last) if isinstance(last_text, bytes) else wire.dumps(last)
+        self.coalesced += 1
+        return True
+
+    async def _send_loop(self, outbox: Outbox):
+        """Drain one connection's queue, evicting it if a send fails or stalls"""
+        while True:
+            await outbox.ready.wait()
+            outbox.ready.clear()
+            while outbox.queue:
+                message_text = outbox.queue.popleft()
+                if isinstance(message_text, bytes):
+                    send = outbox.websocket.send_bytes(message_text)
+                else:
+                    send = outbox.websocket.send_text(message_text)
                 try:
-                    await connection.send_text(message_text)
+                    await asyncio.wait_for(send, self.send_timeout)
+                except asyncio.TimeoutError:
+                    self._evict(outbox, f"send stalled for {self.send_timeout}s")
+                    return
                 except Exception as e:
-                    # Connection is dead, mark for removal
+                    # Connection is dead
                     print(f"Error sending to websocket: {e}")
-                    dead_connections.append(connection)
-            
-            # Remove dead connections
-            for connection in dead_connections:
-                self.disconnect(session_id, connection)
+                    self.disconnect(outbox.session_id, outbox.websocket)
+                    return
+                outbox.sent += 1
+            outbox.overflowing_since = None
+
+    def _evict(self, outbox: Outbox, reason: str):
+        """Drop a slow consumer and close its socket in the background"""
+        print(f"Evicting slow websocket consumer for session {outbox.session_id}: {reason}")
+        self.evictions += 1
+        self.disconnect(outbox.session_id, outbox.websocket)
+        asyncio.ensure_future(self._close(outbox.websocket, SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _close(self, websocket: WebSocket, code: int = 1000):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [len(outbox.queue) for outbox in self._outboxes.values()]
+        return {
+            "connections": len(self._outboxes),
+            "sessions": len(self.active_connections),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "overflow_policy": self.overflow_policy,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions
+        }
 
     async def disconnect_all(self):
         """Disconnect all active connections (for shutdown)"""
         for session_id in list(self.active_connections.keys()):
             for connection in list(self.active_connections[session_id]):
-                try:
-                    await connection.close()
-                except:
-                    pass
-            del self.active_connections[session_id]
\ No newline at end of file
+                self.disconnect(session_id, connection)
+                await self._close(connection)
+        await self.broker.close()
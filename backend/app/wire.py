@@ -0,0 +1,80 @@
+import enum
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Union
+
+from fastapi.responses import JSONResponse
+
+# orjson and msgpack are optional; without them everything falls back to JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+
+def _default(obj: Any) -> Any:
+    """Encode the types payloads carry beyond plain JSON"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps(obj: Any) -> str:
+    """Encode as compact JSON text"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, default=_default, separators=(",", ":"))
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return dumps(obj).encode()
+
+
+def pack(obj: Any) -> bytes:
+    """Encode as MessagePack"""
+    return msgpack.packb(obj, default=_default)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a frame: text frames are JSON, binary frames are MessagePack"""
+    if isinstance(data, bytes):
+        if msgpack is None:
+            raise ValueError("MessagePack frames are not supported")
+        return msgpack.unpackb(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_to_msgpack(text: str) -> bytes:
+    """Re-encode a JSON broadcast as MessagePack"""
+    return pack(loads(text))
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """Pick the encoding for a connection from the one the client asked for"""
+    if requested == MSGPACK and msgpack is not None:
+        return MSGPACK
+    return JSON
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
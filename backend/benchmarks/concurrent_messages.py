@@ -0,0 +1,68 @@
+"""Benchmark N concurrent POST /api/messages calls against a fake LLM.
+
+Every call answers the ZIP code step with its own ZIP code, and the
+response cache is off, so each one triggers exactly one enhance
+completion and none of them can be coalesced into another. With a
+non-blocking LLM client the whole batch should finish in roughly one LLM
+latency rather than N of them. Exits non-zero if a call fails or the LLM
+did not see one request per user.
+
+    cd backend && python -m benchmarks.concurrent_messages --users 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+# Cached templates would answer every user after the first without an LLM call
+os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+
+import httpx  # noqa: E402
+import openai  # noqa: E402
+
+from app.main import app, chatbot  # noqa: E402
+from benchmarks.fake_llm import start_fake_llm  # noqa: E402
+
+
+async def run(users: int, latency: float):
+    runner, fake, base_url = await start_fake_llm(latency=latency)
+    openai.api_base = base_url
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sessions = [
+            (await client.post("/api/sessions")).json()["id"]
+            for _ in range(users)
+        ]
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            # Distinct answers give distinct prompts, so each user costs one upstream call
+            client.post("/api/messages", json={"session_id": sid, "message": f"{10000 + i:05d}"})
+            for i, sid in enumerate(sessions)
+        ])
+        elapsed = time.perf_counter() - start
+
+    await chatbot.llm.close()
+    await runner.cleanup()
+
+    failures = sum(1 for r in responses if r.status_code != 200)
+    print(f"users:            {users}")
+    print(f"llm latency:      {latency * 1000:.0f} ms")
+    print(f"llm requests:     {fake['requests']}")
+    print(f"wall time:        {elapsed * 1000:.0f} ms")
+    print(f"wall / latency:   {elapsed / latency:.2f}x (serialized would be ~{users}x)")
+    print(f"failures:         {failures}")
+    return failures == 0 and fake["requests"] == users
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.users, args.latency)) else 1)
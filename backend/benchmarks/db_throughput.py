@@ -0,0 +1,93 @@
+"""Compare DB throughput of the old sync-on-event-loop path with the async path.
+
+Each simulated turn loads a session, inserts a message and updates the
+session, like the DB work in POST /api/messages. The sync path runs these
+calls directly on the event loop the way the handlers used to; the async
+path goes through AsyncSessionLocal. While the turns run, a probe task
+measures how long the event loop is stalled.
+
+    cd backend && DATABASE_URL=mysql+pymysql://... python -m benchmarks.db_throughput --concurrency 32 --turns 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.models import Message, Session  # noqa: E402
+
+
+async def sync_turn(session_id: str):
+    db = SessionLocal()
+    try:
+        session = db.get(Session, session_id)
+        db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user", content="94105"))
+        session.current_step = "full_name"
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_turn(session_id: str):
+    async with AsyncSessionLocal() as db:
+        session = await db.get(Session, session_id)
+        db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user", content="94105"))
+        session.current_step = "full_name"
+        await db.commit()
+
+
+async def probe_loop(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Return the worst event loop stall seen while the benchmark runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_path(name: str, turn, session_ids, concurrency: int, turns: int):
+    queue = asyncio.Queue()
+    for i in range(turns):
+        queue.put_nowait(session_ids[i % len(session_ids)])
+
+    async def worker():
+        while not queue.empty():
+            await turn(queue.get_nowait())
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await probe
+
+    print(f"{name:<6} {turns / elapsed:>10.0f} turns/s   worst loop stall {worst_stall * 1000:>8.1f} ms")
+
+
+async def run(concurrency: int, turns: int):
+    Base.metadata.create_all(bind=engine)
+    session_ids = [str(uuid.uuid4()) for _ in range(concurrency)]
+    db = SessionLocal()
+    db.add_all([Session(id=sid, status="active", current_step="zip_code", data={}) for sid in session_ids])
+    db.commit()
+    db.close()
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"concurrency: {concurrency}, turns: {turns}")
+    await run_path("sync", sync_turn, session_ids, concurrency, turns)
+    await run_path("async", async_turn, session_ids, concurrency, turns)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.turns))
@@ -0,0 +1,157 @@
+"""Check and time the streaming analytics export on a seeded database.
+
+Seeds completed sessions with vehicles and transcripts plus some active
+ones, then checks that:
+
+- NDJSON and CSV exports cover every matching session exactly once;
+- status and date filters apply;
+- an export cut off part way and resumed from its last cursor yields
+  every session exactly once;
+- peak Python memory stays flat as the number of sessions grows.
+
+Reports sessions and rows per second for each format. Exits non-zero if
+any check fails.
+
+    cd backend && python -m benchmarks.export --sessions 100000 --transcripts
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.chatbot import ChatBot  # noqa: E402
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.export import ExportQuery, export_sessions  # noqa: E402
+from app.models import Message, Session, Vehicle  # noqa: E402
+
+DATA = {
+    "zip_code": "94105", "full_name": "Jane Doe", "email": "jane@example.com",
+    "vehicle_info": {"year": 2022, "make": "Toyota", "body_type": "Camry Sedan"},
+    "vehicle_use": "commuting", "blind_spot": True, "commute_days": 5, "commute_miles": 12.5,
+    "add_another_vehicle": False, "license_type": "personal", "license_status": "valid",
+}
+MESSAGES_PER_SESSION = 6
+
+
+def seed(count: int, start: datetime) -> datetime:
+    """Insert ``count`` sessions a second apart from ``start``; one in ten stays active"""
+    db = SessionLocal()
+    for offset in range(0, count, 5000):
+        sessions, vehicles, messages = [], [], []
+        for i in range(offset, min(count, offset + 5000)):
+            session_id = str(uuid.uuid4())
+            created_at = start + timedelta(seconds=i)
+            sessions.append({"id": session_id, "status": "active" if i % 10 == 0 else "completed",
+                             "current_step": "email" if i % 10 == 0 else "complete", "data": DATA,
+                             "created_at": created_at, "updated_at": created_at})
+            vehicles.append({"id": str(uuid.uuid4()), "session_id": session_id, "year": 2022, "make": "Toyota",
+                             "body_type": "Camry Sedan", "vehicle_use": "commuting", "blind_spot_warning": True,
+                             "commute_days_per_week": 5, "commute_one_way_miles": 12.5, "created_at": created_at})
+            messages += [{"id": str(uuid.uuid4()), "session_id": session_id, "sender": "user" if j % 2 else "bot",
+                          "content": f"Message {j}", "created_at": created_at + timedelta(milliseconds=j)}
+                         for j in range(MESSAGES_PER_SESSION)]
+        db.execute(insert(Session), sessions)
+        db.execute(insert(Vehicle), vehicles)
+        db.execute(insert(Message), messages)
+        db.commit()
+    db.close()
+    return start + timedelta(seconds=count)
+
+
+async def export(flow, fmt: str, query: ExportQuery, transcripts: bool,
+                 limit_chunks: int = 0, trace: bool = False) -> tuple:
+    """Run one export and return (output text, summary, seconds, peak traced bytes)"""
+    summary = {}
+    chunks = 0
+    # Output goes to disk so only the export's own memory is traced
+    with tempfile.TemporaryFile("w+") as out:
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        async for chunk in export_sessions(AsyncSessionLocal, query, fmt, flow, transcripts, summary=summary):
+            out.write(chunk)
+            chunks += 1
+            if limit_chunks and chunks >= limit_chunks:
+                break
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        out.seek(0)
+        return out.read(), summary, elapsed, peak
+
+
+def ndjson_ids(text: str) -> list:
+    return [record["id"] for record in map(json.loads, text.splitlines()) if record["type"] == "session"]
+
+
+async def run(sessions: int, transcripts: bool) -> bool:
+    Base.metadata.create_all(bind=engine)
+    flow = ChatBot().flow
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    start = datetime(2026, 1, 1)
+    small = max(1, sessions // 10)
+    middle = seed(small, start)
+    seed(sessions - small, middle)
+    completed = sum(1 for i in range(small) if i % 10) + sum(1 for i in range(sessions - small) if i % 10)
+
+    _, _, _, peak_small = await export(flow, "ndjson", ExportQuery(until=middle), transcripts, trace=True)
+    _, _, _, peak_large = await export(flow, "ndjson", ExportQuery(), transcripts, trace=True)
+    for fmt in ("ndjson", "csv"):
+        text, summary, elapsed, _ = await export(flow, fmt, ExportQuery(statuses=["completed"]), transcripts)
+        if fmt == "ndjson":
+            ids = ndjson_ids(text)
+            check(json.loads(text.splitlines()[-1])["type"] == "summary", "NDJSON ends with a summary record")
+        else:
+            rows = list(csv.DictReader(io.StringIO(text)))
+            ids = [row["id"] for row in rows]
+            check(all(row["data.vehicle_use"] == "commuting" and row["vehicle.make"] == "Toyota" for row in rows),
+                  "CSV rows carry flattened answers and vehicle columns")
+            if transcripts:
+                check(len(json.loads(rows[0]["transcript"])) == MESSAGES_PER_SESSION, "CSV rows carry transcripts")
+        check(len(ids) == len(set(ids)) == completed == summary["sessions"],
+              f"{fmt}: {len(ids)} completed sessions exported once each (expected {completed})")
+        print(f"     {fmt}: {summary['sessions'] / elapsed:,.0f} sessions/s, {summary['rows_per_sec']:,.0f} rows/s")
+
+    text, summary, _, _ = await export(flow, "ndjson", ExportQuery(since=start, until=middle), transcripts)
+    check(summary["sessions"] == small, f"date filter selects {summary['sessions']} sessions (expected {small})")
+
+    # Stop after a few batches, then resume from the last cursor received
+    first, partial, _, _ = await export(flow, "ndjson", ExportQuery(), transcripts, limit_chunks=3)
+    second, _, _, _ = await export(flow, "ndjson", ExportQuery(cursor=partial["cursor"]), transcripts)
+    resumed = ndjson_ids(first) + ndjson_ids(second)
+    check(len(resumed) == len(set(resumed)) == sessions,
+          f"interrupted export resumed from its cursor covers {len(set(resumed))} of {sessions} sessions once each")
+    check(peak_large < 1.5 * peak_small,
+          f"peak memory stays flat ({peak_small / 1024 / 1024:.1f} MiB for {small} sessions, "
+          f"{peak_large / 1024 / 1024:.1f} MiB for {sessions})")
+
+    await async_engine.dispose()
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--transcripts", action="store_true", help="include transcripts in the export")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.sessions, args.transcripts)) else 1)
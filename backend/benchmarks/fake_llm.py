@@ -0,0 +1,145 @@
+"""Local stand-in for the OpenAI chat completions and Anthropic messages APIs
+with configurable latency.
+
+Latency is applied before the first token; streamed replies then emit one
+word every ``token_latency`` seconds.
+
+Run standalone with ``python -m benchmarks.fake_llm --port 8001 --latency 0.5``
+or start it in-process with ``start_fake_llm``.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+
+from aiohttp import web
+
+REPLY = "Got it, thanks! Let's keep going with the next question."
+# Combined prompts sent by the micro-batcher ask for a JSON array of replies
+BATCH_REQUEST = re.compile(r"JSON array of (\d+) strings")
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 60, "completion_tokens": 12, "total_tokens": 72}
+    }
+
+
+def _chunk(model: str, delta: dict, finish_reason=None) -> bytes:
+    payload = {
+        "id": "chatcmpl-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+async def _stream(request: web.Request, model: str, content: str,
+                  first_token_latency: float, token_latency: float) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await asyncio.sleep(first_token_latency)
+    await response.write(_chunk(model, {"role": "assistant"}))
+    for i, word in enumerate(content.split(" ")):
+        if i:
+            await asyncio.sleep(token_latency)
+        await response.write(_chunk(model, {"content": word if i == 0 else f" {word}"}))
+    await response.write(_chunk(model, {}, "stop"))
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+def _anthropic_event(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+async def _anthropic_stream(request: web.Request, model: str, content: str,
+                            first_token_latency: float, token_latency: float) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await asyncio.sleep(first_token_latency)
+    await response.write(_anthropic_event({"type": "message_start", "message": {"model": model, "content": []}}))
+    for i, word in enumerate(content.split(" ")):
+        if i:
+            await asyncio.sleep(token_latency)
+        await response.write(_anthropic_event({
+            "type": "content_block_delta", "index": 0,
+            "delta": {"type": "text_delta", "text": word if i == 0 else f" {word}"}
+        }))
+    await response.write(_anthropic_event({"type": "message_stop"}))
+    await response.write_eof()
+    return response
+
+
+def create_app(latency: float = 0.5, token_latency: float = 0.02) -> web.Application:
+    app = web.Application()
+    app["latency"] = latency
+    app["token_latency"] = token_latency
+    app["requests"] = 0
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        app["requests"] += 1
+        model = body.get("model", "fake")
+        if body.get("stream"):
+            return await _stream(request, model, REPLY, app["latency"], app["token_latency"])
+        await asyncio.sleep(app["latency"])
+        batch = BATCH_REQUEST.search(body["messages"][-1]["content"])
+        if batch:
+            return web.json_response(_completion(model, json.dumps([REPLY] * int(batch.group(1)))))
+        return web.json_response(_completion(model, REPLY))
+
+    async def messages(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        app["requests"] += 1
+        model = body.get("model", "fake")
+        if body.get("stream"):
+            return await _anthropic_stream(request, model, REPLY, app["latency"], app["token_latency"])
+        await asyncio.sleep(app["latency"])
+        return web.json_response({
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": REPLY}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": 60, "output_tokens": 12}
+        })
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/messages", messages)
+    return app
+
+
+async def start_fake_llm(port: int = 0, latency: float = 0.5, token_latency: float = 0.02):
+    """Start the fake server on localhost, returning (runner, app, base_url)"""
+    app = create_app(latency, token_latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, app, f"http://127.0.0.1:{bound_port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency, args.token_latency), host="127.0.0.1", port=args.port)
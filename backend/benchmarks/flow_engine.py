@@ -0,0 +1,71 @@
+"""Micro-benchmark of ChatBot.process_message with the LLM stubbed out.
+
+Walks the full onboarding flow (including a second vehicle) and reports
+the per-turn cost of routing alone and of process_message end to end.
+
+    cd backend && python -m benchmarks.flow_engine --rounds 2000
+"""
+import argparse
+import asyncio
+import time
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_providers import FakeProvider
+from app.response_cache import LRUResponseCache
+
+# (step, answer) pairs for a complete onboarding, including invalid input
+TURNS = [
+    ("zip_code", "941"), ("zip_code", "94105"), ("full_name", "Jane Doe"),
+    ("email", "jane@example.com"), ("vehicle_start", "ok"),
+    ("vehicle_info", "2022 Toyota Camry Sedan"), ("vehicle_use", "commuting"),
+    ("blind_spot", "yes"), ("commute_days", "5"), ("commute_miles", "12"),
+    ("add_another_vehicle", "yes"), ("vehicle_info", "1HGCM82633A004352"),
+    ("vehicle_use", "farming"), ("blind_spot", "no"), ("annual_mileage", "15000"),
+    ("add_another_vehicle", "no"), ("license_type", "personal"), ("license_status", "valid"),
+]
+
+
+class StubLLM:
+    providers = [FakeProvider(latency=0)]
+
+    async def complete(self, **params):
+        return "Thanks! Next question."
+
+    async def close(self):
+        pass
+
+
+def session_data_for(turn_index: int) -> dict:
+    data = {}
+    for step, answer in TURNS[:turn_index]:
+        data[step] = answer
+    return data
+
+
+async def run(rounds: int):
+    chatbot = ChatBot(llm=StubLLM(), response_cache=LRUResponseCache(), error_replies=ErrorReplyTable())
+    turns = [(step, answer, session_data_for(i)) for i, (step, answer) in enumerate(TURNS)]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for step, answer, data in turns:
+            chatbot._route_message(answer, step, data)
+    route_us = (time.perf_counter() - start) / (rounds * len(turns)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for step, answer, data in turns:
+            await chatbot.process_message(answer, step, data)
+    process_us = (time.perf_counter() - start) / (rounds * len(turns)) * 1e6
+
+    print(f"turns per round:          {len(turns)}")
+    print(f"route only:               {route_us:8.2f} us/turn")
+    print(f"process_message (no LLM): {process_us:8.2f} us/turn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds))
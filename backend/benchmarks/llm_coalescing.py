@@ -0,0 +1,89 @@
+"""Check that concurrent identical prompts share one upstream LLM call.
+
+Fires K simultaneous identical enhance prompts through ChatBot (plain and
+streamed) against the fake LLM server and counts the requests it receives:
+single-flight must turn K calls into exactly one. Then sends K distinct
+prompts with a micro-batch window and checks they arrive as
+ceil(K / batch size) combined requests. The response cache and error reply
+table are disabled so every prompt would otherwise reach the LLM.
+
+Exits non-zero if any check fails.
+
+    cd backend && python -m benchmarks.llm_coalescing --k 50
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_client import LLMClient
+from app.llm_coalescer import PromptCoalescer
+from app.llm_providers import OpenAIProvider
+from benchmarks.fake_llm import REPLY, start_fake_llm
+
+
+async def count_requests(fake_app, run) -> int:
+    before = fake_app["requests"]
+    await run()
+    return fake_app["requests"] - before
+
+
+async def main(k: int, batch_max: int) -> int:
+    runner, fake_app, base_url = await start_fake_llm(latency=0.2, token_latency=0.005)
+    llm = LLMClient(providers=[OpenAIProvider("gpt-4", api_key="sk-fake", api_base=base_url)])
+    bot = ChatBot(llm=llm, error_replies=ErrorReplyTable())
+    bot.response_cache = None
+    prompt = bot.flow.steps["full_name"].prompt
+    failed = False
+
+    def check(name: str, upstream: int, expected: int, replies):
+        nonlocal failed
+        ok = upstream == expected and all(reply == REPLY for reply in replies)
+        failed = failed or not ok
+        print(f"{name:<40}{k:>6} calls -> {upstream:>3} upstream (expected {expected})  {'ok' if ok else 'FAILED'}")
+
+    try:
+        replies = []
+
+        async def plain():
+            replies.extend(await asyncio.gather(*[
+                bot._enhance_response(prompt, {"zip_code": "94105"}) for _ in range(k)
+            ]))
+        check("single-flight complete", await count_requests(fake_app, plain), 1, replies)
+
+        streamed = []
+
+        async def streaming():
+            async def one():
+                return "".join([d async for d in bot._enhance_response_stream(prompt, {"zip_code": "94105"})])
+            streamed.extend(await asyncio.gather(*[one() for _ in range(k)]))
+        check("single-flight stream", await count_requests(fake_app, streaming), 1, streamed)
+
+        batched = []
+        bot.prompts = PromptCoalescer(llm, batch_window_ms=20, batch_max=batch_max)
+
+        async def distinct():
+            batched.extend(await asyncio.gather(*[
+                bot._enhance_response(prompt, {"zip_code": f"{94100 + i}"}) for i in range(k)
+            ]))
+        check(f"micro-batch (max {batch_max})", await count_requests(fake_app, distinct),
+              math.ceil(k / batch_max), batched)
+        print(bot.prompts.stats())
+    finally:
+        await llm.close()
+        await runner.cleanup()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--batch-max", type=int, default=8)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.k, args.batch_max)))
@@ -0,0 +1,122 @@
+"""Tail latency of LLM calls with and without hedged requests.
+
+The primary provider answers most calls quickly but a share of them very
+slowly; the secondary is steadier but slower on average. The same load is
+run through LLMClient with hedging off and on, for plain and streamed
+completions, and p50/p95/p99 are compared. The OpenAI-compatible and
+Anthropic adapters are also exercised against the fake server.
+
+Exits non-zero if hedging does not cut p99, or an adapter call fails.
+
+    cd backend && python -m benchmarks.llm_hedging --calls 400
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.llm_client import LLMClient
+from app.llm_providers import AnthropicProvider, FakeProvider, OpenAIProvider
+from benchmarks.fake_llm import start_fake_llm
+from benchmarks.ws_fanout import percentile
+
+MESSAGES = [{"role": "system", "content": "You are a friendly onboarding assistant."},
+            {"role": "user", "content": "Say hello."}]
+
+
+class TailProvider(FakeProvider):
+    """Fake provider whose latency is usually ``fast`` but ``slow`` for a share of calls"""
+
+    def __init__(self, model: str, fast: float, slow: float, slow_share: float, seed: int):
+        super().__init__(model, latency=fast, token_latency=0.001)
+        self.fast, self.slow, self.slow_share = fast, slow, slow_share
+        self.rng = random.Random(seed)
+
+    async def complete(self, session, messages, model, timeout, **params):
+        self.latency_seconds = self.slow if self.rng.random() < self.slow_share else self.fast
+        return await super().complete(session, messages, model, timeout, **params)
+
+    async def stream(self, session, messages, model, timeout, **params):
+        self.latency_seconds = self.slow if self.rng.random() < self.slow_share else self.fast
+        async for delta in super().stream(session, messages, model, timeout, **params):
+            yield delta
+
+
+async def run_load(hedge: bool, streaming: bool, calls: int, concurrency: int) -> dict:
+    client = LLMClient(
+        providers=[TailProvider("primary", 0.02, 0.5, 0.08, seed=1),
+                   TailProvider("secondary", 0.05, 0.06, 0.0, seed=2)],
+        hedge=hedge,
+        hedge_min_samples=20,
+        hedge_delay=0.1
+    )
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            if streaming:
+                reply = "".join([delta async for delta in client.stream(MESSAGES)])
+            else:
+                reply = await client.complete(MESSAGES)
+            assert reply == FakeProvider.reply, reply
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[one() for _ in range(calls)])
+    await client.close()
+    stats = client.stats()["hedge"]
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "hedged": stats["hedged"],
+        "hedge_wins": stats["hedge_wins"],
+    }
+
+
+async def check_adapters() -> bool:
+    runner, fake_app, base_url = await start_fake_llm(latency=0.01, token_latency=0.001)
+    ok = True
+    try:
+        for provider in (OpenAIProvider("gpt-4", api_key="sk-fake", api_base=base_url),
+                         AnthropicProvider("claude-3-haiku-20240307", api_key="fake", api_base=base_url)):
+            client = LLMClient(providers=[provider])
+            text = await client.complete(MESSAGES, max_tokens=50)
+            streamed = "".join([delta async for delta in client.stream(MESSAGES, max_tokens=50)])
+            await client.close()
+            passed = text == streamed == "Got it, thanks! Let's keep going with the next question."
+            ok = ok and passed
+            print(f"{provider.name:<36} complete + stream {'ok' if passed else 'FAILED'}")
+    finally:
+        await runner.cleanup()
+    return ok
+
+
+async def main(calls: int, concurrency: int) -> int:
+    failed = not await check_adapters()
+    print(f"\n{calls} calls, concurrency {concurrency}; primary 20 ms with 8% at 500 ms, secondary 50-60 ms")
+    print(f"{'mode':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'hedged':>8}{'won':>6}")
+    for streaming in (False, True):
+        results = {}
+        for hedge in (False, True):
+            r = results[hedge] = await run_load(hedge, streaming, calls, concurrency)
+            label = f"{'stream' if streaming else 'complete'} {'hedged' if hedge else 'primary only'}"
+            print(f"{label:<22}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['hedged']:>8}{r['hedge_wins']:>6}")
+        if results[True]["p99"] >= results[False]["p99"]:
+            print("FAILED: hedging did not reduce p99")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.calls, args.concurrency)))
@@ -0,0 +1,79 @@
+"""Turn latency with and without speculative prefetch of the next reply.
+
+Virtual users walk the onboarding flow through ChatBot with a fake LLM and
+a pause between turns (the user typing). With prefetch on, the reply the
+next answer will most likely need is generated during that pause. The
+response cache is disabled so every reply would otherwise need the LLM.
+Only free-text steps are predicted, so latency is reported separately for
+turns answering those steps and for all turns, with the prefetch hit rate
+and wasted tokens. Exits non-zero if prefetch does not cut the median of
+the predicted turns.
+
+    cd backend && python -m benchmarks.llm_prefetch --users 20 --latency 0.3 --think 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_client import LLMClient
+from app.llm_providers import FakeProvider
+from app.prefetch import Prefetcher
+from benchmarks.flow_engine import TURNS
+
+
+async def run(users: int, latency: float, think: float, prefetch: bool) -> dict:
+    llm = LLMClient(providers=[FakeProvider(latency=latency, token_latency=0)])
+    bot = ChatBot(llm=llm, error_replies=ErrorReplyTable(), prefetcher=Prefetcher() if prefetch else None)
+    bot.response_cache = None
+    latencies = []
+    predicted = []
+
+    async def user(index: int):
+        session_id, data, step = f"session-{index}", {}, bot.flow.start
+        bot.prefetch(session_id, step, data)
+        for expected_step, answer in TURNS:
+            assert step == expected_step, (step, expected_step)
+            await asyncio.sleep(think)
+            start = time.perf_counter()
+            _, step, extracted = await bot.process_message(answer, step, data, session_id)
+            elapsed = (time.perf_counter() - start) * 1000
+            latencies.append(elapsed)
+            if not bot.flow.steps[expected_step].categorical and bot.flow.steps[expected_step].validate:
+                predicted.append(elapsed)
+            data = {**data, **extracted}
+            bot.prefetch(session_id, step, data)
+
+    await asyncio.gather(*[user(i) for i in range(users)])
+    await llm.close()
+    stats = bot.prefetcher.stats() if prefetch else {}
+    return {"mean": statistics.mean(latencies), "predicted": statistics.median(predicted), **stats}
+
+
+async def main(users: int, latency: float, think: float) -> int:
+    off = await run(users, latency, think, prefetch=False)
+    on = await run(users, latency, think, prefetch=True)
+    print(f"{users} users x {len(TURNS)} turns, LLM {latency * 1000:.0f} ms, think time {think * 1000:.0f} ms")
+    print(f"{'':<14}{'free-text turns median':>24}{'all turns mean':>18}")
+    for name, r in (("prefetch off", off), ("prefetch on", on)):
+        print(f"{name:<14}{r['predicted']:>21.1f} ms{r['mean']:>15.1f} ms")
+    print(f"hit rate {on['hit_rate']}, wasted tokens ~{on['wasted_tokens_estimate']}, outcomes {on['counts']}")
+    if on["disabled_steps"]:
+        print(f"stopped prefetching (hit rate too low): {', '.join(on['disabled_steps'])}")
+    return 0 if on["predicted"] < off["predicted"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--think", type=float, default=0.5)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.latency, args.think)))
@@ -0,0 +1,116 @@
+"""Per-step model routing against latency SLOs.
+
+Runs enhance calls through ChatBot with two fake models, a small fast one
+and a large slow one, and checks the router's decisions:
+
+1. Routing to the small model first roughly halves median call latency
+   compared with sending everything to the large model.
+2. When the small model misses the SLO, calls move to the large one.
+3. When both miss it, replies fall back to the static prompt text.
+4. Once the slow samples age out of the window, the small model is tried again.
+
+Exits non-zero if any check fails.
+
+    cd backend && python -m benchmarks.llm_routing
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_client import LLMClient
+from app.llm_providers import FakeProvider
+from app.llm_routing import ModelRouter
+
+WINDOW = 5.0
+
+
+class ModelLatencyProvider(FakeProvider):
+    """Fake provider whose latency depends on the requested model"""
+
+    def __init__(self, latencies):
+        super().__init__("small", latency=0)
+        self.latencies = latencies
+
+    async def complete(self, session, messages, model, timeout, **params):
+        await asyncio.sleep(self.latencies[model])
+        return f"[{model}] {self.reply}", (None, None)
+
+
+def make_bot(provider, models):
+    spec = {"defaults": {"enhance": {"models": models, "slo_ms": 300, "max_tokens": 80}}}
+    llm = LLMClient(providers=[provider])
+    bot = ChatBot(llm=llm, error_replies=ErrorReplyTable(),
+                  router=ModelRouter.compile(spec, [provider], set()))
+    bot.response_cache = None
+    bot.router.window = WINDOW
+    bot.router.min_samples = 3
+    return bot
+
+
+async def run_calls(bot, count):
+    prompt = bot.flow.steps["full_name"].prompt
+    latencies, replies = [], []
+    for i in range(count):
+        start = time.perf_counter()
+        replies.append(await bot._enhance_response(prompt, {"zip_code": f"{94100 + i}"}))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), replies, prompt
+
+
+def served_by(replies, prompt):
+    counts = {}
+    for reply in replies:
+        model = reply[1:reply.index("]")] if reply.startswith("[") else "template" if reply == prompt else "?"
+        counts[model] = counts.get(model, 0) + 1
+    return counts
+
+
+async def main() -> int:
+    failed = False
+
+    def check(name, ok, detail):
+        nonlocal failed
+        failed = failed or not ok
+        print(f"{name:<46}{detail}  {'ok' if ok else 'FAILED'}")
+
+    latencies = {"small": 0.08, "large": 0.25}
+    provider = ModelLatencyProvider(latencies)
+
+    baseline_bot = make_bot(provider, ["fake:large"])
+    baseline, _, _ = await run_calls(baseline_bot, 10)
+    await baseline_bot.llm.close()
+    bot = make_bot(provider, ["fake:small", "fake:large"])
+    routed, replies, prompt = await run_calls(bot, 10)
+    check("small model first halves median latency", routed <= baseline / 2,
+          f"{baseline:.0f} ms -> {routed:.0f} ms")
+
+    latencies["small"] = 0.4
+    _, replies, _ = await run_calls(bot, 10)
+    counts = served_by(replies, prompt)
+    check("small over SLO moves calls to large", counts.get("large", 0) >= 6, str(counts))
+
+    latencies["large"] = 0.5
+    _, replies, _ = await run_calls(bot, 10)
+    counts = served_by(replies, prompt)
+    check("both over SLO falls back to the template", counts.get("template", 0) >= 5, str(counts))
+
+    latencies["small"], latencies["large"] = 0.08, 0.25
+    await asyncio.sleep(WINDOW)
+    _, replies, _ = await run_calls(bot, 5)
+    counts = served_by(replies, prompt)
+    check("small tried again after the window", counts == {"small": 5}, str(counts))
+
+    print(bot.router.stats())
+    await bot.llm.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
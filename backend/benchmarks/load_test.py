@@ -0,0 +1,280 @@
+"""End-to-end load test: N virtual users through the whole onboarding flow.
+
+Starts the real app under uvicorn against SQLite and the fake
+OpenAI-compatible server (both as subprocesses). Each virtual user
+creates a session, opens its WebSocket, answers every step (two
+vehicles, so the add-another-vehicle loop runs once) until the session
+is complete, then loads the session snapshot. Turns go over the
+WebSocket or through POST /api/messages (--transport), and a share of
+answers can be made invalid (--invalid-rate) to exercise error replies.
+--think-time pauses before each answer, as a user typing would.
+
+Reports throughput, p50/p95/p99 per flow step and per endpoint, and error
+rates, and writes them as JSON (--out) so runs can be compared in CI.
+Exits non-zero if the error rate exceeds --max-error-rate.
+
+    cd backend && python -m benchmarks.load_test --users 50 --latency 0.3 --out load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks.ws_fanout import free_port, percentile, wait_ready
+
+# A valid answer for each step; vehicle steps depend on which vehicle is being added
+ANSWERS = {
+    "zip_code": "94105",
+    "full_name": "Jane Doe",
+    "email": "jane.doe@example.com",
+    "vehicle_start": "Year, make and body type",
+    "license_type": "Personal",
+    "license_status": "Valid",
+    "commute_days": "5",
+    "commute_miles": "12.5",
+    "annual_mileage": "15000",
+    "blind_spot": "yes",
+}
+VEHICLES = [
+    {"vehicle_info": "2022 Toyota Camry Sedan", "vehicle_use": "commuting"},
+    {"vehicle_info": "1HGCM82633A004352", "vehicle_use": "business"},
+]
+# Garbage every validated step rejects
+INVALID_ANSWER = "???"
+# Guard against a user looping forever if the flow misbehaves
+MAX_TURNS = 60
+
+
+class Results:
+    def __init__(self):
+        self.step_latencies: Dict[str, List[float]] = defaultdict(list)
+        self.endpoint_latencies: Dict[str, List[float]] = defaultdict(list)
+        self.endpoint_errors: Dict[str, int] = defaultdict(int)
+        self.errors: List[str] = []
+        self.turns = 0
+        self.completed = 0
+        self.frames = 0
+
+    def timing(self, endpoint: str, seconds: float):
+        self.endpoint_latencies[endpoint].append(seconds * 1000)
+
+    def error(self, endpoint: str, detail: str):
+        self.endpoint_errors[endpoint] += 1
+        if len(self.errors) < 20:
+            self.errors.append(f"{endpoint}: {detail}")
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def answer_for(step: str, vehicle: int, add_another_seen: int) -> str:
+    if step in ("vehicle_info", "vehicle_use"):
+        return VEHICLES[min(vehicle, len(VEHICLES) - 1)][step]
+    if step == "add_another_vehicle":
+        return "yes" if add_another_seen < len(VEHICLES) - 1 else "no"
+    return ANSWERS.get(step, "ok")
+
+
+async def count_frames(ws, results: Results, replies: Dict[str, asyncio.Future]):
+    """Read every frame on the user's socket, resolving turn replies by correlation id"""
+    try:
+        async for raw in ws:
+            frame = json.loads(raw)
+            results.frames += 1
+            future = replies.pop(frame.get("reply_to") or "", None)
+            if future is not None and not future.done():
+                future.set_result(frame)
+    except websockets.ConnectionClosed:
+        pass
+    for future in replies.values():
+        if not future.done():
+            future.set_exception(ConnectionError("socket closed"))
+
+
+async def virtual_user(user: int, client: httpx.AsyncClient, ws_url: str, transport: str,
+                       invalid_rate: float, think_time: float, results: Results, rng: random.Random):
+    start = time.perf_counter()
+    try:
+        response = await client.post("/api/sessions")
+        response.raise_for_status()
+    except Exception as e:
+        results.error("POST /api/sessions", repr(e))
+        return
+    results.timing("POST /api/sessions", time.perf_counter() - start)
+    session = response.json()
+    session_id, step = session["id"], session["current_step"]
+
+    start = time.perf_counter()
+    try:
+        ws = await websockets.connect(f"{ws_url}/ws/{session_id}")
+    except Exception as e:
+        results.error("WS connect", repr(e))
+        return
+    results.timing("WS connect", time.perf_counter() - start)
+    replies: Dict[str, asyncio.Future] = {}
+    reader = asyncio.create_task(count_frames(ws, results, replies))
+
+    vehicle = add_another_seen = 0
+    try:
+        for turn in range(MAX_TURNS):
+            if step == "complete":
+                break
+            valid = rng.random() >= invalid_rate or step == "vehicle_start"
+            message = answer_for(step, vehicle, add_another_seen) if valid else INVALID_ANSWER
+            if think_time:
+                await asyncio.sleep(think_time)
+            start = time.perf_counter()
+            if transport == "ws":
+                endpoint = "WS user_message"
+                reply_id = f"{user}-{turn}"
+                replies[reply_id] = asyncio.get_running_loop().create_future()
+                await ws.send(json.dumps({"type": "user_message", "id": reply_id, "message": message}))
+                frame = await asyncio.wait_for(replies[reply_id], timeout=60)
+                if frame["type"] != "turn_complete":
+                    results.error(endpoint, frame.get("detail", frame["type"]))
+                    return
+                result = frame
+            else:
+                endpoint = "POST /api/messages"
+                response = await client.post("/api/messages", json={
+                    "session_id": session_id, "message": message, "stream": True
+                })
+                if response.status_code != 200:
+                    results.error(endpoint, f"HTTP {response.status_code}")
+                    return
+                result = response.json()
+            elapsed = time.perf_counter() - start
+            results.timing(endpoint, elapsed)
+            results.step_latencies[step].append(elapsed * 1000)
+            results.turns += 1
+
+            if valid and step == "add_another_vehicle":
+                add_another_seen += 1
+                vehicle += 1
+            step = result["current_step"]
+        else:
+            results.error("flow", f"session {session_id} did not complete in {MAX_TURNS} turns")
+            return
+        if step != "complete":
+            return
+
+        start = time.perf_counter()
+        response = await client.get(f"/api/sessions/{session_id}/snapshot")
+        if response.status_code != 200 or response.json()["session"]["status"] != "completed":
+            results.error("GET /api/sessions/{id}/snapshot", f"HTTP {response.status_code}")
+            return
+        results.timing("GET /api/sessions/{id}/snapshot", time.perf_counter() - start)
+        results.completed += 1
+    except Exception as e:
+        results.error("flow", repr(e))
+    finally:
+        await ws.close()
+        await reader
+
+
+async def run(args) -> dict:
+    tmp = tempfile.mkdtemp()
+    llm_port, app_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/load.db",
+        OPENAI_API_KEY="sk-fake",
+        OPENAI_API_BASE=f"http://127.0.0.1:{llm_port}/v1",
+        TRACE_LOG_MIN_MS="1e9",
+    )
+    if args.no_cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port),
+         "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )]
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    ))
+    results = Results()
+    try:
+        await wait_ready(f"http://127.0.0.1:{app_port}/")
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=60) as client:
+            rng = random.Random(args.seed)
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                virtual_user(user, client, f"ws://127.0.0.1:{app_port}", args.transport,
+                             args.invalid_rate, args.think_time, results, random.Random(rng.random()))
+                for user in range(args.users)
+            ])
+            elapsed = time.perf_counter() - start
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    requests = sum(len(v) for v in results.endpoint_latencies.values()) + sum(results.endpoint_errors.values())
+    errors = sum(results.endpoint_errors.values())
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "out"},
+        "seconds": round(elapsed, 3),
+        "users": args.users,
+        "completed_users": results.completed,
+        "turns": results.turns,
+        "turns_per_sec": round(results.turns / elapsed, 1),
+        "sessions_per_sec": round(results.completed / elapsed, 2),
+        "ws_frames": results.frames,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "errors": dict(results.endpoint_errors),
+        "error_samples": results.errors,
+        "steps": {step: summarize(values) for step, values in results.step_latencies.items()},
+        "endpoints": {name: summarize(values) for name, values in results.endpoint_latencies.items()},
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['completed_users']}/{report['users']} users completed in {report['seconds']} s  "
+          f"({report['turns']} turns, {report['turns_per_sec']} turns/s, error rate {report['error_rate']:.2%})")
+    for title, rows in (("step", report["steps"]), ("endpoint", report["endpoints"])):
+        print(f"\n{title:<34}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, row in rows.items():
+            print(f"{name:<34}{row['count']:>7}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    for sample in report["error_samples"]:
+        print(f"error: {sample}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transport", choices=["ws", "http"], default="ws")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--invalid-rate", type=float, default=0.1, help="share of answers made invalid")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pause before each answer in seconds")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--out", help="write the results as JSON here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["error_rate"] <= args.max_error_rate and report["completed_users"] == args.users else 1)
@@ -0,0 +1,188 @@
+"""Check and time the retention job on a seeded database.
+
+Seeds old completed sessions, idle active sessions and recent sessions of
+each kind, each with a transcript and a vehicle. Runs the job in dry-run
+mode, then for real while foreground turns keep writing to recent
+sessions, and checks that:
+
+- the dry run counts what the real run then does, and writes nothing;
+- old sessions end up in the archive with the same transcript and vehicles,
+  and their hot rows are gone;
+- idle active sessions are marked abandoned (or purged with
+  --abandon-action purge), and sessions that are recent or still have
+  recent messages are left alone;
+- foreground turns keep going while the job runs.
+
+Exits non-zero if any check fails.
+
+    cd backend && python -m benchmarks.retention --sessions 2000 --batch-size 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import func, select, update  # noqa: E402
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.models import ArchivedSession, ArchivedVehicle, Message, Session, SessionStatus, Vehicle  # noqa: E402
+from app.retention import RetentionJob, RetentionPolicy, load_transcript  # noqa: E402
+
+MESSAGES_PER_SESSION = 12
+
+
+def seed(count: int) -> dict:
+    """Create ``count`` sessions of each kind and return their ids by kind"""
+    now = datetime.utcnow()
+    kinds = {
+        "old_completed": (SessionStatus.completed, now - timedelta(days=45), None),
+        "new_completed": (SessionStatus.completed, now - timedelta(days=2), None),
+        "idle_active": (SessionStatus.active, now - timedelta(days=5), None),
+        # The session row is old but an invalid answer was given recently
+        "chatting_active": (SessionStatus.active, now - timedelta(days=5), now - timedelta(minutes=5)),
+        "new_active": (SessionStatus.active, now - timedelta(hours=1), None),
+    }
+    ids = {}
+    db = SessionLocal()
+    for kind, (status, updated_at, last_message_at) in kinds.items():
+        ids[kind] = []
+        for _ in range(count):
+            session_id = str(uuid.uuid4())
+            ids[kind].append(session_id)
+            created_at = updated_at - timedelta(minutes=30)
+            db.add(Session(id=session_id, status=status, current_step="zip_code", data={"zip_code": "94105"},
+                           created_at=created_at, updated_at=updated_at))
+            for i in range(MESSAGES_PER_SESSION):
+                created = created_at + timedelta(minutes=i)
+                if last_message_at and i == MESSAGES_PER_SESSION - 1:
+                    created = last_message_at
+                db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user" if i % 2 else "bot",
+                               content=f"Message {i} of {session_id}", created_at=created))
+            db.add(Vehicle(id=str(uuid.uuid4()), session_id=session_id, vin="1HGCM82633A004352", year=2003,
+                           make="Honda", body_type="Sedan", vehicle_use="commuting", blind_spot_warning=False,
+                           created_at=created_at))
+        db.commit()
+    # Seeding sets updated_at explicitly; make sure onupdate did not move it
+    for kind, (_, updated_at, _) in kinds.items():
+        db.execute(update(Session).where(Session.id.in_(ids[kind])).values(updated_at=updated_at))
+    db.commit()
+    db.close()
+    return ids
+
+
+async def count(model, *where) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(*where))
+
+
+async def foreground(session_ids: list, stop: asyncio.Event) -> list:
+    """Keep writing turns to recent sessions, returning each turn's latency"""
+    latencies = []
+    i = 0
+    while not stop.is_set():
+        session_id = session_ids[i % len(session_ids)]
+        i += 1
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user", content="94105"))
+            await db.execute(update(Session).where(Session.id == session_id).values(current_step="full_name"))
+            await db.commit()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.002)
+    return latencies
+
+
+async def run(sessions: int, batch_size: int, abandon_action: str) -> bool:
+    Base.metadata.create_all(bind=engine)
+    ids = seed(sessions)
+    policy = RetentionPolicy(archive_days=30, abandon_hours=72, abandon_action=abandon_action,
+                             batch_size=batch_size, pause_ms=5)
+    removed = []
+    job = RetentionJob(AsyncSessionLocal, policy, on_removed=removed.extend)
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    old_transcript = []
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Message.id, Message.sender, Message.content)
+            .where(Message.session_id == ids["old_completed"][0]).order_by(Message.created_at)
+        )
+        old_transcript = [(row.id, row.sender.value, row.content) for row in rows]
+
+    planned = await job.run(dry_run=True)
+    check(planned["archived"] == sessions and planned["abandoned"] == sessions,
+          f"dry run plans {planned['archived']} archives and {planned['abandoned']} abandons (expected {sessions} each)")
+    check(await count(ArchivedSession) == 0 and await count(Session) == 5 * sessions and not removed,
+          "dry run wrote nothing")
+
+    recent = ids["new_active"] + ids["new_completed"]
+    stop = asyncio.Event()
+    writer = asyncio.create_task(foreground(recent, stop))
+    start = time.perf_counter()
+    summary = await job.run()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    latencies = await writer
+
+    # When marking, the second pass finds the newly abandoned sessions too young to archive
+    check(summary["archived"] == planned["archived"] and summary["abandoned"] == planned["abandoned"],
+          f"run matches the dry run ({summary['archived']} archived, {summary['abandoned']} abandoned)")
+    check(summary["messages"] == sessions * MESSAGES_PER_SESSION and summary["vehicles"] == sessions,
+          f"moved {summary['messages']} messages and {summary['vehicles']} vehicles")
+    check(await count(Session, Session.id.in_(ids["old_completed"])) == 0
+          and await count(Message, Message.session_id.in_(ids["old_completed"])) == 0
+          and await count(Vehicle, Vehicle.session_id.in_(ids["old_completed"])) == 0,
+          "archived sessions are gone from the hot tables")
+    check(await count(ArchivedSession) == sessions and await count(ArchivedVehicle) == sessions,
+          "archive holds every archived session and vehicle")
+
+    async with AsyncSessionLocal() as db:
+        archived = await db.get(ArchivedSession, ids["old_completed"][0])
+    transcript = [(m["id"], m["sender"], m["content"]) for m in load_transcript(archived.transcript)]
+    check(transcript == old_transcript and archived.message_count == MESSAGES_PER_SESSION,
+          f"archived transcript round-trips ({len(archived.transcript)} compressed bytes)")
+
+    if abandon_action == "mark":
+        check(await count(Session, Session.id.in_(ids["idle_active"]), Session.status == SessionStatus.abandoned)
+              == sessions, "idle active sessions are marked abandoned")
+    else:
+        check(await count(Session, Session.id.in_(ids["idle_active"])) == 0
+              and await count(Message, Message.session_id.in_(ids["idle_active"])) == 0,
+              "idle active sessions are purged")
+    check(await count(Session, Session.id.in_(ids["chatting_active"] + ids["new_active"]),
+                      Session.status == SessionStatus.active) == 2 * sessions,
+          "recent sessions and sessions with recent messages stay active")
+    check(await count(Session, Session.id.in_(ids["new_completed"])) == sessions, "recent completed sessions stay")
+    check(len(removed) == 2 * sessions, f"on_removed was told about {len(removed)} sessions")
+    check(len(latencies) > 0, f"{len(latencies)} foreground turns ran during the job")
+
+    handled = summary["archived"] + summary["abandoned"]
+    print(f"\n{handled} sessions in {elapsed:.2f}s ({handled / elapsed:.0f} sessions/s, "
+          f"{(summary['messages'] + summary['vehicles']) / elapsed:.0f} child rows/s)")
+    if latencies:
+        latencies.sort()
+        print(f"foreground turns during the job: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+    await async_engine.dispose()
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500, help="sessions seeded of each kind")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--abandon-action", choices=("mark", "purge"), default="mark")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.sessions, args.batch_size, args.abandon_action)) else 1)
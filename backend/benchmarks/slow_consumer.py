@@ -0,0 +1,128 @@
+"""Slow WebSocket consumer check.
+
+Broadcasts a burst of frames to one session with a fast client and a
+client that stops reading. Broadcasting must not wait on the stalled
+client, the fast client must receive every frame, and the stalled client
+must be evicted once it has been slow for longer than the threshold. The
+script exits non-zero if any of these fail.
+
+The fast client is drained to a known frame count every half queue and
+the stalled client blocks until released, so the outcome does not depend
+on how the event loop happens to schedule the sender tasks.
+
+    cd backend && python -m benchmarks.slow_consumer --frames 2000
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.broker import InProcessBroker
+from app.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; `stall` makes every send hang until released"""
+
+    def __init__(self, stall: bool = False):
+        self.release = asyncio.Event()
+        if not stall:
+            self.release.set()
+        self.received = []
+        self.arrived = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.release.wait()
+        await asyncio.sleep(0)
+        self.received.append(text)
+        self.arrived.set()
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        self.closed.set()
+
+    async def drain(self, count: int, timeout: float = 5) -> bool:
+        """Wait until ``count`` frames have arrived; False if they do not within ``timeout``"""
+        async def arrived():
+            while len(self.received) < count:
+                self.arrived.clear()
+                await self.arrived.wait()
+
+        try:
+            await asyncio.wait_for(arrived(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+async def run(frames: int, policy: str, queue_size: int, slow_seconds: float) -> bool:
+    manager = ConnectionManager(InProcessBroker(), queue_size=queue_size, overflow_policy=policy,
+                                send_timeout=60, slow_consumer_seconds=slow_seconds)
+    fast, slow = FakeWebSocket(), FakeWebSocket(stall=True)
+    await manager.connect("s", fast)
+    await manager.connect("s", slow)
+
+    drain_every = max(1, queue_size // 2)
+    drained = True
+    start = time.perf_counter()
+    worst = 0.0
+    for i in range(frames):
+        if i == frames - 1:
+            # The stalled client's queue has been full since early on; the
+            # last frame arrives after the threshold and must evict it
+            await asyncio.sleep(slow_seconds * 1.1)
+        t = time.perf_counter()
+        await manager.broadcast("s", {"type": "message_delta", "message_id": "m", "delta": f"{i} "})
+        worst = max(worst, time.perf_counter() - t)
+        if (i + 1) % drain_every == 0:
+            # Let the fast client catch up before its queue can fill
+            drained = await fast.drain(i + 1) and drained
+    drained = await fast.drain(frames) and drained
+    elapsed = time.perf_counter() - start
+    evicted = await _closed(slow)
+    stats = manager.stats()
+
+    print(f"{policy}: {frames} broadcasts in {elapsed * 1000:.0f} ms, worst {worst * 1000:.2f} ms")
+    print(f"  fast client received {len(fast.received)} frames, stats {stats}")
+    ok = True
+    if worst > 0.05:
+        print("  FAIL: a broadcast waited on the stalled client")
+        ok = False
+    if not drained or len(fast.received) != frames:
+        print("  FAIL: the fast client missed frames")
+        ok = False
+    if not evicted or slow.closed_with is None or stats["evictions"] != 1:
+        print("  FAIL: the stalled client was not evicted")
+        ok = False
+    slow.release.set()
+    await manager.disconnect_all()
+    return ok
+
+
+async def _closed(websocket: FakeWebSocket, timeout: float = 5) -> bool:
+    try:
+        await asyncio.wait_for(websocket.closed.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def main(frames: int, queue_size: int, slow_seconds: float):
+    results = [await run(frames, policy, queue_size, slow_seconds)
+               for policy in ("drop_oldest", "coalesce", "disconnect")]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--slow-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.frames, args.queue_size, args.slow_seconds))
@@ -0,0 +1,84 @@
+"""Count the DB round trips of one chat turn and fail if they regress.
+
+Runs turns through the real FastAPI app on SQLite with a stub LLM and
+counts SQL statements and commits per turn. Exits non-zero when a turn
+goes over the budget, so it can run as a CI check.
+
+    cd backend && python -m benchmarks.turn_round_trips
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# One process, so the session state cache is safe to turn on
+os.environ.setdefault("SESSION_CACHE_SIZE", "5000")
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import async_engine  # noqa: E402
+from app.llm_providers import FakeProvider  # noqa: E402
+from app.main import app, chatbot  # noqa: E402
+
+# Per turn: INSERT messages, UPDATE session (session state comes from the
+# in-process store, so there is no SELECT)
+MAX_STATEMENTS_PER_TURN = 2
+MAX_COMMITS_PER_TURN = 1
+
+
+class StubLLM:
+    providers = [FakeProvider(latency=0)]
+
+    async def complete(self, **params):
+        return "Thanks! Next question."
+
+    async def stream(self, **params):
+        yield "Thanks! Next question."
+
+    async def close(self):
+        pass
+
+
+class RoundTripCounter:
+    def __init__(self, engine):
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split()[0].upper())
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = []
+        self.commits = 0
+
+
+async def run() -> bool:
+    chatbot.llm = chatbot.prompts.llm = StubLLM()
+    counter = RoundTripCounter(async_engine.sync_engine)
+    turns = [("94105", False), ("x", False), ("Jane Doe", True), ("jane@example.com", False)]
+
+    ok = True
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        session_id = (await client.post("/api/sessions")).json()["id"]
+        for message, stream in turns:
+            counter.reset()
+            response = await client.post("/api/messages", json={
+                "session_id": session_id, "message": message, "stream": stream
+            })
+            response.raise_for_status()
+            passed = (len(counter.statements) <= MAX_STATEMENTS_PER_TURN
+                      and counter.commits <= MAX_COMMITS_PER_TURN)
+            ok = ok and passed
+            print(f"{'ok ' if passed else 'FAIL'} {message!r:<22} statements={counter.statements} commits={counter.commits}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
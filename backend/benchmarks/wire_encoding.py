@@ -0,0 +1,99 @@
+"""Wire encoding benchmark: bytes and CPU per turn.
+
+Encodes the frames one streamed turn broadcasts (user message, reply
+deltas, final message) and a transcript response the way the previous
+code did (``json.dumps`` per socket, ``jsonable_encoder`` over ORM
+objects) and the way it does now (orjson or MessagePack, encoded once
+per broadcast, rows without ORM objects). Sizes after permessage-deflate
+are estimated with raw zlib deflate.
+
+    cd backend && python -m benchmarks.wire_encoding --sockets 3 --deltas 40
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app import wire
+from app.models import Message, MessageSender
+
+
+def turn_frames(deltas: int):
+    session_id = str(uuid.uuid4())
+    reply_id = str(uuid.uuid4())
+    words = ("Thanks! Now, could you tell me what the vehicle is primarily used for: "
+             "commuting, commercial, farming or business? ").split()
+    frames = [{"type": "message", "message": {
+        "id": str(uuid.uuid4()), "sender": "user", "content": "1HGCM82633A004352",
+        "created_at": datetime.utcnow().isoformat()}}]
+    frames += [{"type": "message_delta", "message_id": reply_id, "delta": words[i % len(words)] + " "}
+               for i in range(deltas)]
+    frames.append({"type": "message", "message": {
+        "id": reply_id, "sender": "bot", "content": " ".join(words * (deltas // len(words) + 1))[:400],
+        "created_at": datetime.utcnow().isoformat()}, "ttft_ms": 412.5})
+    return session_id, frames
+
+
+def transcript(session_id: str, count: int):
+    return [
+        Message(id=str(uuid.uuid4()), session_id=session_id,
+                sender=MessageSender.bot if i % 2 else MessageSender.user,
+                content="Could you tell me the year, make and body type of the vehicle? " * 2,
+                created_at=datetime.utcnow())
+        for i in range(count)
+    ]
+
+
+def timed(fn, repeat: int):
+    start = time.process_time()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.process_time() - start) / repeat * 1e6
+
+
+def deflated(payloads):
+    return sum(len(zlib.compress(p if isinstance(p, bytes) else p.encode(), 6)) - 6 for p in payloads)
+
+
+def main(sockets: int, deltas: int, messages: int, repeat: int):
+    session_id, frames = turn_frames(deltas)
+
+    # Broadcast: the old path encoded each frame per socket with json.dumps
+    old, old_us = timed(lambda: [json.dumps(f) for f in frames for _ in range(sockets)], repeat)
+    new, new_us = timed(lambda: [wire.dumps(f) for f in frames], repeat)
+    packed, pack_us = timed(lambda: [wire.pack(f) for f in frames], repeat)
+    old_bytes = sum(len(p) for p in old) // sockets
+    print(f"Turn broadcast: {len(frames)} frames to {sockets} sockets")
+    print(f"  {'encoding':<28}{'bytes/socket':>14}{'deflated':>10}{'CPU us/turn':>14}")
+    print(f"  {'json.dumps per socket':<28}{old_bytes:>14}{deflated(json.dumps(f) for f in frames):>10}{old_us:>14.1f}")
+    print(f"  {'wire.dumps once':<28}{sum(len(p) for p in new):>14}{deflated(new):>10}{new_us:>14.1f}")
+    if wire.msgpack is not None:
+        print(f"  {'msgpack once':<28}{sum(len(p) for p in packed):>14}{deflated(packed):>10}{pack_us:>14.1f}")
+
+    # Transcript responses: ORM objects through jsonable_encoder vs plain rows
+    orm = transcript(session_id, messages)
+    rows = [{"id": m.id, "session_id": m.session_id, "sender": m.sender, "content": m.content,
+             "created_at": m.created_at} for m in orm]
+    old_body, old_us = timed(lambda: json.dumps(jsonable_encoder(orm)).encode(), max(repeat // 10, 1))
+    new_body, new_us = timed(lambda: wire.dumps_bytes(rows), repeat)
+    print(f"Transcript of {messages} messages")
+    print(f"  {'jsonable_encoder + json':<28}{len(old_body):>14}{deflated([old_body]):>10}{old_us:>14.1f}")
+    print(f"  {'rows + wire.dumps_bytes':<28}{len(new_body):>14}{deflated([new_body]):>10}{new_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=3)
+    parser.add_argument("--deltas", type=int, default=40)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    main(args.sockets, args.deltas, args.messages, args.repeat)
@@ -0,0 +1,130 @@
+"""Multi-worker WebSocket fan-out check and broadcast latency benchmark.
+
+Starts two uvicorn workers sharing a SQLite database and the Unix socket
+broker, opens a WebSocket to each, and posts messages to worker A only.
+Every broadcast must reach the socket held by worker B; the script exits
+non-zero otherwise. It reports how long after the POST each worker's
+socket saw the user message frame.
+
+    cd backend && python -m benchmarks.ws_fanout --messages 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+from benchmarks.fake_llm import start_fake_llm
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"worker at {url} did not start")
+
+
+async def receive_user_frames(ws, received: dict, expected: int):
+    """Record when each user message frame arrives, keyed by content"""
+    while len(received) < expected:
+        frame = json.loads(await ws.recv())
+        if frame.get("type") == "message" and frame["message"]["sender"] == "user":
+            received[frame["message"]["content"]] = time.perf_counter()
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+async def run(messages: int):
+    tmp = tempfile.mkdtemp()
+    runner, _, llm_url = await start_fake_llm(latency=0.01)
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/fanout.db",
+        OPENAI_API_KEY="sk-fake",
+        OPENAI_API_BASE=llm_url,
+        WS_BROKER="unix",
+        WS_BROKER_DIR=f"{tmp}/broker",
+        # Session state is per worker, so keep it off when sharing sessions
+        SESSION_CACHE_SIZE="0",
+    )
+    # Create the schema once up front so the workers don't race on it
+    subprocess.run([sys.executable, "-c", "import app.main"], env=env, check=True, stdout=subprocess.DEVNULL)
+    ports = [free_port(), free_port()]
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL
+        )
+        for port in ports
+    ]
+    ok = False
+    try:
+        for port in ports:
+            await wait_ready(f"http://127.0.0.1:{port}/")
+
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{ports[0]}") as client:
+            session_id = (await client.post("/api/sessions")).json()["id"]
+            sockets = [await websockets.connect(f"ws://127.0.0.1:{port}/ws/{session_id}") for port in ports]
+            # Give worker B's broker time to notice worker A's socket
+            await asyncio.sleep(1.2)
+
+            received = [{}, {}]
+            listeners = [
+                asyncio.create_task(receive_user_frames(ws, received[i], messages))
+                for i, ws in enumerate(sockets)
+            ]
+            sent = {}
+            for i in range(messages):
+                content = f"msg-{i}"
+                sent[content] = time.perf_counter()
+                await client.post("/api/messages", json={"session_id": session_id, "message": content})
+
+            try:
+                await asyncio.wait_for(asyncio.gather(*listeners), timeout=10)
+            except asyncio.TimeoutError:
+                pass
+            for ws in sockets:
+                await ws.close()
+
+        for name, frames in zip(["worker A (local)", "worker B (remote)"], received):
+            latencies = [(frames[c] - sent[c]) * 1000 for c in sent if c in frames]
+            if latencies:
+                print(f"{name:<18} delivered {len(latencies)}/{messages}  "
+                      f"p50 {percentile(latencies, 50):6.2f} ms  p95 {percentile(latencies, 95):6.2f} ms")
+            else:
+                print(f"{name:<18} delivered 0/{messages}")
+        ok = all(len(frames) == messages for frames in received)
+        print("fan-out ok" if ok else "FAIL: some broadcasts did not reach every worker")
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+        await runner.cleanup()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.messages)) else 1)
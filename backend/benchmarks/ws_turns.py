@@ -0,0 +1,124 @@
+"""WebSocket turn check and HTTP vs WebSocket turn latency benchmark.
+
+Starts one uvicorn worker against the fake LLM and runs the same number
+of turns through ``POST /api/messages`` and through ``user_message``
+frames on the session WebSocket. Every frame must be answered with a
+reply carrying its correlation id, pings must be answered while a turn
+is running, and resync must return the transcript; the script exits
+non-zero otherwise.
+
+    cd backend && python -m benchmarks.ws_turns --turns 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import msgpack
+import websockets
+
+from benchmarks.fake_llm import start_fake_llm
+from benchmarks.ws_fanout import free_port, percentile, wait_ready
+
+
+async def reply(ws, reply_to: str) -> dict:
+    """Read frames until the one answering `reply_to`"""
+    while True:
+        frame = json.loads(await ws.recv())
+        if frame.get("reply_to") == reply_to:
+            return frame
+
+
+async def run(turns: int, latency: float) -> bool:
+    tmp = tempfile.mkdtemp()
+    runner, _, llm_url = await start_fake_llm(latency=latency)
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/turns.db",
+        OPENAI_API_KEY="sk-fake",
+        OPENAI_API_BASE=llm_url,
+    )
+    port = free_port()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    ok = True
+    try:
+        await wait_ready(f"http://127.0.0.1:{port}/")
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            http_session = (await client.post("/api/sessions")).json()["id"]
+            ws_session = (await client.post("/api/sessions")).json()["id"]
+
+            http_times = []
+            for i in range(turns):
+                start = time.perf_counter()
+                await client.post("/api/messages", json={"session_id": http_session, "message": f"turn {i}"})
+                http_times.append((time.perf_counter() - start) * 1000)
+
+        ws_times = []
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{ws_session}") as ws:
+            for i in range(turns):
+                start = time.perf_counter()
+                await ws.send(json.dumps({"type": "user_message", "id": f"t{i}", "message": f"turn {i}"}))
+                frame = await reply(ws, f"t{i}")
+                ws_times.append((time.perf_counter() - start) * 1000)
+                if frame["type"] != "turn_complete":
+                    print(f"FAIL: turn {i} answered with {frame}")
+                    ok = False
+
+            # A ping sent during a turn is answered before the turn finishes
+            await ws.send(json.dumps({"type": "user_message", "id": "slow", "message": "one more"}))
+            await ws.send(json.dumps({"type": "ping", "id": "p"}))
+            first = None
+            while first not in ("p", "slow"):
+                first = json.loads(await ws.recv()).get("reply_to")
+            if first != "p":
+                print("FAIL: ping waited for the running turn")
+                ok = False
+            await reply(ws, "slow")
+
+            await ws.send(json.dumps({"type": "resync", "id": "r"}))
+            frame = await reply(ws, "r")
+            # Greeting plus a user and a bot message per turn
+            expected = 1 + 2 * (turns + 1)
+            if frame["type"] != "resync" or len(frame["messages"]) != expected:
+                print(f"FAIL: resync returned {len(frame.get('messages', []))} messages, expected {expected}")
+                ok = False
+
+            await ws.send("not json")
+            if json.loads(await ws.recv())["type"] != "error":
+                print("FAIL: malformed frame was not rejected")
+                ok = False
+
+        # MessagePack clients get binary frames and may send them
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{ws_session}?encoding=msgpack") as ws:
+            await ws.send(msgpack.packb({"type": "ping", "id": "mp"}))
+            frame = await ws.recv()
+            if not isinstance(frame, bytes) or msgpack.unpackb(frame).get("reply_to") != "mp":
+                print("FAIL: msgpack ping was not answered with a binary pong")
+                ok = False
+
+        for name, times in (("HTTP POST", http_times), ("WebSocket", ws_times)):
+            print(f"{name:<10} {turns} turns  p50 {percentile(times, 50):7.2f} ms  "
+                  f"p95 {percentile(times, 95):7.2f} ms  mean {statistics.mean(times):7.2f} ms")
+        print("websocket turns ok" if ok else "FAIL")
+    finally:
+        worker.terminate()
+        worker.wait()
+        await runner.cleanup()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.01, help="fake LLM latency in seconds")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.turns, args.latency)) else 1)
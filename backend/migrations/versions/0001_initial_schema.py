@@ -0,0 +1,69 @@
+"""Initial schema: sessions, messages and vehicles
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created by the app's create_all at startup already have these
+tables; they are left as they are, so upgrading such a database to head
+works without stamping it first.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    existing = _existing_tables()
+    if "sessions" not in existing:
+        op.create_table(
+            "sessions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("status", sa.Enum("active", "completed", name="sessionstatus")),
+            sa.Column("current_step", sa.String(50)),
+            sa.Column("data", sa.JSON()),
+        )
+    if "messages" not in existing:
+        op.create_table(
+            "messages",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("session_id", sa.String(36), sa.ForeignKey("sessions.id")),
+            sa.Column("sender", sa.Enum("user", "bot", name="messagesender"), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if "vehicles" not in existing:
+        op.create_table(
+            "vehicles",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("session_id", sa.String(36), sa.ForeignKey("sessions.id")),
+            sa.Column("vin", sa.String(17)),
+            sa.Column("year", sa.Integer()),
+            sa.Column("make", sa.String(50)),
+            sa.Column("body_type", sa.String(50)),
+            sa.Column("vehicle_use", sa.String(20), nullable=False),
+            sa.Column("blind_spot_warning", sa.Boolean(), nullable=False),
+            sa.Column("commute_days_per_week", sa.Integer()),
+            sa.Column("commute_one_way_miles", sa.Float()),
+            sa.Column("annual_mileage", sa.Integer()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+
+def downgrade():
+    op.drop_table("vehicles")
+    op.drop_table("messages")
+    op.drop_table("sessions")
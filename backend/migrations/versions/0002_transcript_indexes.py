@@ -0,0 +1,40 @@
+"""Composite (session_id, created_at, id) indexes on messages and vehicles
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Backs keyset pagination of transcripts and per-session vehicle reads,
+which otherwise scan the whole table. Indexes that create_all already
+made are skipped.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_messages_session_created": "messages",
+    "ix_vehicles_session_created": "vehicles",
+}
+
+
+def _existing_indexes(table):
+    if context.is_offline_mode():
+        return set()
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for name, table in INDEXES.items():
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, ["session_id", "created_at", "id"])
+
+
+def downgrade():
+    for name, table in INDEXES.items():
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,90 @@
+"""Archive tables, abandoned session status and the retention index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Adds archived_sessions (one compressed transcript blob per session) and
+archived_vehicles, the `abandoned` session status and a (status,
+updated_at) index on sessions for the retention job. Tables and indexes
+that create_all already made are skipped.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+OLD_STATUSES = ("active", "completed")
+NEW_STATUSES = ("active", "completed", "abandoned")
+
+
+def _existing_tables():
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _existing_indexes(table):
+    if context.is_offline_mode():
+        return set()
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _set_statuses(old, new):
+    # Only MySQL stores the enum natively; elsewhere it is a string column
+    if op.get_context().dialect.name == "mysql":
+        op.alter_column(
+            "sessions", "status",
+            existing_type=sa.Enum(*old, name="sessionstatus"),
+            type_=sa.Enum(*new, name="sessionstatus"),
+        )
+
+
+def upgrade():
+    _set_statuses(OLD_STATUSES, NEW_STATUSES)
+    if "ix_sessions_status_updated" not in _existing_indexes("sessions"):
+        op.create_index("ix_sessions_status_updated", "sessions", ["status", "updated_at"])
+
+    existing = _existing_tables()
+    if "archived_sessions" not in existing:
+        op.create_table(
+            "archived_sessions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("archived_at", sa.DateTime()),
+            sa.Column("status", sa.Enum(*NEW_STATUSES, name="sessionstatus")),
+            sa.Column("current_step", sa.String(50)),
+            sa.Column("data", sa.JSON()),
+            sa.Column("message_count", sa.Integer(), nullable=False),
+            sa.Column("transcript", sa.LargeBinary(16 * 1024 * 1024), nullable=False),
+        )
+        op.create_index("ix_archived_sessions_created", "archived_sessions", ["created_at"])
+    if "archived_vehicles" not in existing:
+        op.create_table(
+            "archived_vehicles",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("session_id", sa.String(36), sa.ForeignKey("archived_sessions.id")),
+            sa.Column("vin", sa.String(17)),
+            sa.Column("year", sa.Integer()),
+            sa.Column("make", sa.String(50)),
+            sa.Column("body_type", sa.String(50)),
+            sa.Column("vehicle_use", sa.String(20), nullable=False),
+            sa.Column("blind_spot_warning", sa.Boolean(), nullable=False),
+            sa.Column("commute_days_per_week", sa.Integer()),
+            sa.Column("commute_one_way_miles", sa.Float()),
+            sa.Column("annual_mileage", sa.Integer()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_archived_vehicles_session", "archived_vehicles", ["session_id"])
+
+
+def downgrade():
+    op.drop_table("archived_vehicles")
+    op.drop_table("archived_sessions")
+    op.drop_index("ix_sessions_status_updated", table_name="sessions")
+    _set_statuses(NEW_STATUSES, OLD_STATUSES)
@@ -0,0 +1,30 @@
+"""Composite (created_at, id) index on sessions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Backs the analytics export, which streams sessions in (created_at, id)
+order from a resume cursor and filters them by creation date. Skipped if
+create_all already made it.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set()
+    if not context.is_offline_mode():
+        existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("sessions")}
+    if "ix_sessions_created" not in existing:
+        op.create_index("ix_sessions_created", "sessions", ["created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_sessions_created", table_name="sessions")
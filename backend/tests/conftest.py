@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before anything imports it
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+
+from app import models  # noqa: E402,F401  (registers the tables with Base)
+from app.database import Base, async_engine, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def fresh_connections():
+    """Each test runs on its own event loop, so pooled connections must not outlive it"""
+    yield
+    await async_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def flow():
+    from app.chatbot import ChatBot
+
+    return ChatBot().flow
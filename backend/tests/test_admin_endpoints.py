@@ -0,0 +1,69 @@
+import json
+
+import httpx
+import pytest
+
+from app import admin, metrics
+from app.main import app
+
+TOKEN = "s3cret"
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_API_TOKEN", TOKEN)
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.mark.asyncio
+async def test_export_is_off_without_an_admin_token():
+    async with client() as c:
+        assert (await c.get("/api/export")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_export_requires_the_admin_token(admin_token):
+    async with client() as c:
+        assert (await c.get("/api/export")).status_code == 401
+        assert (await c.get("/api/export", headers={"Authorization": "Bearer wrong"})).status_code == 401
+        response = await c.get("/api/export", headers=admin_token)
+    assert response.status_code == 200
+    summary = json.loads(response.text.splitlines()[-1])
+    assert summary["type"] == "summary"
+    assert metrics.export_sessions_total._values.get(("ndjson",), 0) >= summary["sessions"]
+
+
+@pytest.mark.asyncio
+async def test_import_is_off_without_an_admin_token():
+    async with client() as c:
+        assert (await c.post("/api/import", content=b"{}\n")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_import_with_the_admin_token(admin_token):
+    lead = {"zip_code": "94105", "full_name": "Jane Doe", "email": "jane@example.com"}
+    async with client() as c:
+        assert (await c.post("/api/import", content=b"{}\n")).status_code == 401
+        response = await c.post("/api/import", content=json.dumps(lead).encode() + b"\n", headers=admin_token)
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[-1])["type"] == "summary"
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_oversized_uploads(admin_token, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "IMPORT_MAX_BYTES", 64)
+    body = b'{"zip_code": "94105"}\n' * 10
+
+    async def chunks():
+        yield body
+
+    async with client() as c:
+        # Declared too large up front, and too large once streamed without a length
+        assert (await c.post("/api/import", content=body, headers=admin_token)).status_code == 413
+        assert (await c.post("/api/import", content=chunks(), headers=admin_token)).status_code == 413
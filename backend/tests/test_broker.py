@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from app.broker import UnixSocketBroker
+from app.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+        self.arrived = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.received.append(text)
+        self.arrived.set()
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def wait_for(self, count: int):
+        while len(self.received) < count:
+            self.arrived.clear()
+            await self.arrived.wait()
+
+
+def worker(directory: str, name: str) -> ConnectionManager:
+    """A manager standing in for one worker process on the shared broker directory"""
+    broker = UnixSocketBroker(directory)
+    # Both workers live in this process, so they cannot be told apart by pid
+    broker.path = os.path.join(directory, f"{name}.sock")
+    return ConnectionManager(broker)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_sockets_on_every_worker(tmp_path):
+    workers = [worker(str(tmp_path), "a"), worker(str(tmp_path), "b")]
+    sockets = [FakeWebSocket(), FakeWebSocket()]
+    for manager, websocket in zip(workers, sockets):
+        await manager.start()
+        await manager.connect("s", websocket)
+    try:
+        for i in range(100):
+            await workers[0].broadcast("s", {"type": "message", "n": i})
+        await asyncio.wait_for(asyncio.gather(*[websocket.wait_for(100) for websocket in sockets]), 5)
+        # Every frame arrives once, in publish order, on both workers
+        for websocket in sockets:
+            assert [json.loads(frame)["n"] for frame in websocket.received] == list(range(100))
+        assert workers[0].broker.dropped == 0
+    finally:
+        for manager in workers:
+            await manager.disconnect_all()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_skips_sessions_without_sockets(tmp_path):
+    workers = [worker(str(tmp_path), "a"), worker(str(tmp_path), "b")]
+    websocket = FakeWebSocket()
+    for manager in workers:
+        await manager.start()
+    await workers[1].connect("s", websocket)
+    try:
+        await workers[0].broadcast("other", {"type": "message"})
+        await workers[0].broadcast("s", {"type": "message"})
+        await asyncio.wait_for(websocket.wait_for(1), 5)
+        await asyncio.sleep(0.05)
+        assert len(websocket.received) == 1
+    finally:
+        for manager in workers:
+            await manager.disconnect_all()
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_on_a_peer_that_stopped_reading(tmp_path):
+    # A peer worker that is alive but never reads its socket
+    stuck = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    stuck.bind(str(tmp_path / "stuck.sock"))
+    broker = UnixSocketBroker(str(tmp_path), backlog=20, send_timeout_ms=100)
+    delivered = []
+
+    async def deliver(session_id: str, message_text: str):
+        delivered.append(message_text)
+
+    await broker.start(deliver)
+    try:
+        start = time.perf_counter()
+        for i in range(100):
+            await broker.publish("s", str(i))
+        assert time.perf_counter() - start < 0.05
+        assert len(delivered) == 100
+
+        await asyncio.sleep(0.3)
+        stuck.setblocking(False)
+        received = []
+        while True:
+            try:
+                received.append(int(stuck.recv(1024).decode().partition("\n")[2]))
+            except BlockingIOError:
+                break
+        # Whatever the peer did not get was dropped and counted, and what it did get is in order
+        assert received == sorted(received)
+        assert len(received) + broker.dropped == 100
+        assert not broker._backlogs
+    finally:
+        await broker.close()
+        stuck.close()
@@ -0,0 +1,67 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.bulk_import import import_leads, parse_lines
+from app.database import AsyncSessionLocal
+from app.models import Session
+
+LEAD = {
+    "zip_code": "94105",
+    "full_name": "Jane Doe",
+    "email": "jane@example.com",
+    "vehicle_info": "2022 Toyota Camry Sedan",
+    "vehicle_use": "commuting",
+    "blind_spot": "yes",
+    "commute_days": "5",
+    "commute_miles": "12.5",
+    "add_another_vehicle": "no",
+    "license_type": "personal",
+    "license_status": "valid",
+}
+
+
+async def run_import(text: str, fmt: str, flow) -> list:
+    return [record async for record in import_leads(io.StringIO(text), fmt, flow, AsyncSessionLocal)]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_typed_values_are_imported(flow):
+    lead = dict(LEAD, email="typed@example.com", blind_spot=True, add_another_vehicle=False, commute_days=5, commute_miles=12.5)
+    commercial = dict(LEAD, email="bob@example.com", vehicle_use="commercial", blind_spot=False,
+                      annual_mileage=12000.0)
+    del commercial["commute_days"], commercial["commute_miles"]
+    records = await run_import("\n".join(json.dumps(row) for row in (lead, commercial)), "ndjson", flow)
+    assert records[-1]["imported"] == 2, records
+    async with AsyncSessionLocal() as db:
+        data = {s.data["email"]: s.data for s in await db.scalars(
+            select(Session).where(Session.status == "completed"))}
+    assert data["typed@example.com"]["blind_spot"] is True
+    assert data["typed@example.com"]["commute_days"] == 5
+    assert data["typed@example.com"]["commute_miles"] == 12.5
+    assert data["bob@example.com"]["blind_spot"] is False
+    assert data["bob@example.com"]["annual_mileage"] == 12000
+
+
+@pytest.mark.asyncio
+async def test_ndjson_nested_values_are_rejected(flow):
+    records = await run_import(json.dumps(dict(LEAD, zip_code=["94105"])), "ndjson", flow)
+    assert records[0] == {"type": "rejected", "line": 1, "reason": "zip_code: expected a single value"}
+
+
+@pytest.mark.asyncio
+async def test_csv_quoted_field_may_span_lines(flow):
+    header = ",".join(LEAD)
+    row = dict(LEAD, full_name='Jane "JD"\nDoe Smith')
+    body = ",".join('"' + value.replace('"', '""') + '"' for value in row.values())
+    text = f"{header}\n{body}\n{','.join(LEAD.values())}\n"
+
+    rows = [parsed async for parsed in parse_lines(io.StringIO(text, newline=""), "csv")]
+    assert [(line, parsed["zip_code"], parsed["full_name"]) for line, parsed, _ in rows] == [
+        (2, "94105", 'Jane "JD"\nDoe Smith'),
+        (4, "94105", "Jane Doe"),
+    ]
+    records = await run_import(text, "csv", flow)
+    assert records == [dict(records[-1], rows=2, imported=2, rejected=0)]
@@ -0,0 +1,65 @@
+import pytest
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_client import LLMClient
+from app.llm_providers import FakeProvider
+
+
+class CountingProvider(FakeProvider):
+    """Fake provider that counts completions"""
+
+    def __init__(self):
+        super().__init__(latency=0, token_latency=0)
+        self.calls = 0
+
+    async def complete(self, session, messages, model, timeout, **params):
+        self.calls += 1
+        return await super().complete(session, messages, model, timeout, **params)
+
+    async def stream(self, session, messages, model, timeout, **params):
+        self.calls += 1
+        async for delta in super().stream(session, messages, model, timeout, **params):
+            yield delta
+
+
+def make_bot(provider: CountingProvider) -> ChatBot:
+    bot = ChatBot(llm=LLMClient(providers=[provider]))
+    bot.response_cache = None
+    return bot
+
+
+def test_shipped_table_covers_every_validation_error():
+    bot = ChatBot(error_replies=ErrorReplyTable())
+    assert ErrorReplyTable.load().missing(bot.error_pairs()) == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_answer_is_served_from_the_shipped_table():
+    provider = CountingProvider()
+    bot = make_bot(provider)
+    variants = bot.error_replies.replies[("zip_code", "Please provide a valid 5-digit ZIP code")]
+
+    response, next_step, _ = await bot.process_message("not a zip", "zip_code", {})
+    assert response in variants
+    assert next_step == "zip_code"
+
+    stream, _, _ = await bot.process_message_stream("not a zip", "zip_code", {})
+    assert "".join([delta async for delta in stream]) in variants
+    assert provider.calls == 0
+    await bot.llm.close()
+
+
+@pytest.mark.asyncio
+async def test_warming_fills_only_missing_pairs():
+    provider = CountingProvider()
+    bot = make_bot(provider)
+    bot.error_replies = ErrorReplyTable()
+    assert await bot.precompute_error_replies(variants=1) == len(bot.error_pairs())
+    calls = provider.calls
+
+    assert await bot.precompute_error_replies(variants=1) == 0
+    response, _, _ = await bot.process_message("", "email", {})
+    assert response == bot.error_replies.get("email", "Please provide a valid email address")
+    assert provider.calls == calls
+    await bot.llm.close()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import math
+import re
+
+import pytest
+
+from app.llm_coalescer import PromptCoalescer
+
+K = 50
+
+
+class CountingLLM:
+    """Stands in for LLMClient: echoes the user prompt after a delay and counts upstream calls"""
+
+    def __init__(self, latency: float = 0.05, split_batches: bool = True):
+        self.latency = latency
+        self.split_batches = split_batches
+        self.calls = 0
+
+    async def complete(self, messages, call_site: str = "other", **params) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        requests = re.findall(r"Request \d+:\n(.*?)(?=\n\nRequest \d+:|$)", prompt, re.S)
+        if not requests:
+            return f"reply to {prompt}"
+        if not self.split_batches:
+            return "not a JSON array"
+        return json.dumps([f"reply to {request}" for request in requests])
+
+    async def stream(self, messages, call_site: str = "other", **params):
+        self.calls += 1
+        for word in f"reply to {messages[-1]['content']}".split(" "):
+            await asyncio.sleep(self.latency / 5)
+            yield word + " "
+
+
+def chat(prompt: str):
+    return [{"role": "system", "content": "You are helpful."}, {"role": "user", "content": prompt}]
+
+
+@pytest.mark.asyncio
+async def test_identical_completions_share_one_call():
+    llm = CountingLLM()
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=0)
+    # Whitespace differences still count as the same prompt
+    replies = await asyncio.gather(*[
+        coalescer.complete(chat("Hello  there" if i % 2 else "Hello there"), max_tokens=50) for i in range(K)
+    ])
+    assert llm.calls == 1
+    assert set(replies) == {"reply to Hello there"}
+    assert coalescer.stats()["saved_calls"] == K - 1
+
+
+@pytest.mark.asyncio
+async def test_identical_streams_share_one_call():
+    llm = CountingLLM()
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=0)
+
+    async def read():
+        return "".join([delta async for delta in coalescer.stream(chat("Hello there"))])
+
+    replies = await asyncio.gather(*[read() for _ in range(K)])
+    assert llm.calls == 1
+    assert set(replies) == {"reply to Hello there "}
+
+
+@pytest.mark.asyncio
+async def test_different_parameters_are_not_shared():
+    llm = CountingLLM()
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=0)
+    await asyncio.gather(coalescer.complete(chat("Hi"), max_tokens=50), coalescer.complete(chat("Hi"), max_tokens=60))
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_one_caller_giving_up_does_not_cancel_the_rest():
+    llm = CountingLLM()
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=0)
+    impatient = asyncio.ensure_future(coalescer.complete(chat("Hi")))
+    patient = asyncio.ensure_future(coalescer.complete(chat("Hi")))
+    await asyncio.sleep(0)
+    impatient.cancel()
+    assert await patient == "reply to Hi"
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_distinct_prompts_are_micro_batched():
+    llm = CountingLLM()
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=20, batch_max=8)
+    replies = await asyncio.gather(*[coalescer.complete(chat(f"ZIP {94100 + i}")) for i in range(K)])
+    assert llm.calls == math.ceil(K / 8)
+    assert replies == [f"reply to ZIP {94100 + i}" for i in range(K)]
+
+
+@pytest.mark.asyncio
+async def test_unsplittable_batch_falls_back_to_separate_calls():
+    llm = CountingLLM(split_batches=False)
+    coalescer = PromptCoalescer(llm, single_flight=True, batch_window_ms=20, batch_max=4)
+    replies = await asyncio.gather(*[coalescer.complete(chat(f"ZIP {94100 + i}")) for i in range(4)])
+    assert replies == [f"reply to ZIP {94100 + i}" for i in range(4)]
+    assert llm.calls == 1 + 4
+    assert coalescer.stats()["batch_fallbacks"] == 1
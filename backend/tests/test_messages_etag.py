@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import Message, Session
+
+
+def add_messages(session_id: str, count: int, start: datetime):
+    db = SessionLocal()
+    for i in range(count):
+        db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user",
+                       content=f"Message {i}", created_at=start + timedelta(seconds=i)))
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def session_id():
+    session_id = str(uuid.uuid4())
+    db = SessionLocal()
+    db.add(Session(id=session_id, current_step="zip_code", data={}))
+    db.commit()
+    db.close()
+    add_messages(session_id, 5, datetime(2026, 1, 1))
+    return session_id
+
+
+@pytest.fixture
+def statements():
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ["", "?limit=3", "?limit=2&before="])
+async def test_not_modified_without_reading_messages(session_id, statements, query):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        url = f"/api/messages/{session_id}{query}"
+        if query.endswith("before="):
+            first = await client.get(f"/api/messages/{session_id}")
+            url += first.headers["X-Next-Cursor"]
+        page = await client.get(url)
+        assert page.status_code == 200 and page.json()
+
+        statements.clear()
+        cached = await client.get(url, headers={"If-None-Match": page.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == page.headers["ETag"]
+        assert statements and not any("content" in statement for statement in statements)
+
+
+@pytest.mark.asyncio
+async def test_new_message_changes_etag(session_id):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        url = f"/api/messages/{session_id}"
+        page = await client.get(url)
+        add_messages(session_id, 1, datetime(2026, 1, 2))
+        fresh = await client.get(url, headers={"If-None-Match": page.headers["ETag"]})
+        assert fresh.status_code == 200
+        assert len(fresh.json()) == len(page.json()) + 1
+        assert fresh.headers["ETag"] != page.headers["ETag"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.chatbot import ChatBot
+from app.error_replies import ErrorReplyTable
+from app.llm_client import LLMClient
+from app.llm_providers import FakeProvider
+from app.prefetch import Prefetcher
+
+
+class SlowProvider(FakeProvider):
+    """Fake provider that records calls and cancellations"""
+
+    def __init__(self, latency: float):
+        super().__init__(latency=latency, token_latency=0)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, session, messages, model, timeout, **params):
+        self.calls += 1
+        try:
+            return await super().complete(session, messages, model, timeout, **params)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def make_bot(provider: FakeProvider) -> ChatBot:
+    bot = ChatBot(llm=LLMClient(providers=[provider]), error_replies=ErrorReplyTable(), prefetcher=Prefetcher())
+    bot.response_cache = None
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_discarded_prefetch_cancels_its_upstream_call():
+    provider = SlowProvider(latency=5)
+    bot = make_bot(provider)
+    assert bot.prefetch("session-1", "zip_code", {})
+    await asyncio.sleep(0.05)
+    assert provider.calls == 1
+
+    bot.prefetcher.discard("session-1")
+    await asyncio.sleep(0.05)
+    assert provider.cancelled == 1
+    # Nothing finished yet, so the route's token budget stands in for the reply
+    assert bot.prefetcher.wasted_tokens == bot.router.route("enhance", "zip_code").max_tokens
+    await bot.llm.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_prefetch_is_counted_at_the_step_average():
+    provider = SlowProvider(latency=0)
+    bot = make_bot(provider)
+    bot.prefetch("session-1", "zip_code", {})
+    await asyncio.sleep(0.05)
+    bot.prefetcher.discard("session-1")
+    finished = bot.prefetcher.wasted_tokens
+    assert finished == len(FakeProvider.reply) // 4
+
+    provider.latency_seconds = 5
+    bot.prefetch("session-2", "zip_code", {})
+    await asyncio.sleep(0.05)
+    bot.prefetcher.discard("session-2")
+    assert bot.prefetcher.wasted_tokens == 2 * finished
+    await bot.llm.close()
+
+
+@pytest.mark.asyncio
+async def test_next_turn_is_served_from_the_prefetch():
+    provider = SlowProvider(latency=0)
+    bot = make_bot(provider)
+    assert bot.prefetch("session-1", "zip_code", {})
+    await asyncio.sleep(0.05)
+
+    await bot.process_message("94105", "zip_code", {}, session_id="session-1")
+    assert provider.calls == 1
+    assert bot.prefetcher.counts.get("hit") == 1
+    assert bot.prefetcher.wasted_tokens == 0
+    await bot.llm.close()
+
+
+@pytest.mark.asyncio
+async def test_vehicle_prefetch_matches_the_structured_answer():
+    provider = SlowProvider(latency=0)
+    bot = make_bot(provider)
+    # One answer teaches the bot the step's shape: year, make and body type
+    await bot.process_message("2022 Toyota Camry Sedan", "vehicle_info", {}, session_id="session-1")
+    calls = provider.calls
+
+    assert bot.prefetch("session-2", "vehicle_info", {})
+    await asyncio.sleep(0.05)
+    await bot.process_message("2019 Honda Civic Coupe", "vehicle_info", {}, session_id="session-2")
+    assert provider.calls == calls + 1
+    assert bot.prefetcher.counts.get("hit") == 1 and not bot.prefetcher.counts.get("miss")
+    await bot.llm.close()
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import database
+from app.database import async_engine
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_no_timer_behind(monkeypatch):
+    timings = []
+    monkeypatch.setattr(database, "observe_db", lambda seconds, statement: timings.append(statement))
+
+    async with async_engine.connect() as conn:
+        info = conn.sync_connection.info
+        before = {key: list(value) if isinstance(value, list) else value for key, value in info.items()}
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM no_such_table"))
+        await conn.rollback()
+        assert info == before
+        await conn.execute(text("SELECT 1"))
+
+    assert timings == ["SELECT 1"]
@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import func, select, update
+
+from app import main
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import ArchivedSession, ArchivedVehicle, Message, Session, SessionStatus, Vehicle
+from app.retention import RetentionJob, RetentionPolicy, load_transcript
+
+
+def seed(status: SessionStatus, idle: timedelta, messages: int = 3) -> str:
+    """One session last updated ``idle`` ago, with a transcript and a vehicle"""
+    session_id = str(uuid.uuid4())
+    updated_at = datetime.utcnow() - idle
+    db = SessionLocal()
+    db.add(Session(id=session_id, status=status, current_step="zip_code", data={"zip_code": "94105"},
+                   created_at=updated_at, updated_at=updated_at))
+    for i in range(messages):
+        db.add(Message(id=str(uuid.uuid4()), session_id=session_id, sender="user", content=f"Message {i}",
+                       created_at=updated_at + timedelta(seconds=i)))
+    db.add(Vehicle(id=str(uuid.uuid4()), session_id=session_id, year=2022, make="Toyota", body_type="Camry",
+                   vehicle_use="commuting", blind_spot_warning=True, created_at=updated_at))
+    db.commit()
+    # onupdate would otherwise have moved updated_at to now
+    db.execute(update(Session).where(Session.id == session_id).values(updated_at=updated_at))
+    db.commit()
+    db.close()
+    return session_id
+
+
+async def count(model, *where) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(*where))
+
+
+def job(abandon_action: str = "mark", removed: list = None) -> RetentionJob:
+    policy = RetentionPolicy(archive_days=30, abandon_hours=72, abandon_action=abandon_action, batch_size=2, pause_ms=0)
+    return RetentionJob(AsyncSessionLocal, policy, on_removed=removed.extend if removed is not None else None)
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_marked_abandoned():
+    idle = seed(SessionStatus.active, timedelta(days=5))
+    recent = seed(SessionStatus.active, timedelta(hours=1))
+    removed = []
+    await job("mark", removed).run()
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.get(Session, idle)).status == SessionStatus.abandoned
+        assert (await db.get(Session, recent)).status == SessionStatus.active
+    assert await count(Message, Message.session_id == idle) == 3
+    assert idle in removed and recent not in removed
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_purged():
+    idle = seed(SessionStatus.active, timedelta(days=5))
+    await job("purge").run()
+
+    assert await count(Session, Session.id == idle) == 0
+    assert await count(Message, Message.session_id == idle) == 0
+    assert await count(Vehicle, Vehicle.session_id == idle) == 0
+    assert await count(ArchivedSession, ArchivedSession.id == idle) == 0
+
+
+@pytest.mark.asyncio
+async def test_old_completed_sessions_are_archived():
+    old = seed(SessionStatus.completed, timedelta(days=45), messages=4)
+    new = seed(SessionStatus.completed, timedelta(days=2))
+    async with AsyncSessionLocal() as db:
+        transcript = [row.content for row in await db.execute(
+            select(Message.content).where(Message.session_id == old).order_by(Message.created_at)
+        )]
+
+    planned = await job().run(dry_run=True)
+    assert planned["archived"] >= 1 and await count(ArchivedSession, ArchivedSession.id == old) == 0
+    await job().run()
+
+    assert await count(Session, Session.id.in_([old])) == 0
+    assert await count(Message, Message.session_id == old) == 0
+    assert await count(Session, Session.id == new) == 1
+    async with AsyncSessionLocal() as db:
+        archived = await db.get(ArchivedSession, old)
+    assert archived.message_count == 4
+    assert [message["content"] for message in load_transcript(archived.transcript)] == transcript
+    assert await count(ArchivedVehicle, ArchivedVehicle.session_id == old) == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_session_can_still_be_read():
+    idle = seed(SessionStatus.active, timedelta(days=5))
+    await job("mark").run()
+    main.session_store.invalidate(idle)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.get(f"/api/sessions/{idle}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "abandoned"
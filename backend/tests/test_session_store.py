@@ -0,0 +1,15 @@
+from app import session_store
+from app.session_store import SessionStateStore
+
+
+def test_cache_is_off_by_default():
+    assert SessionStateStore().max_entries == 0
+
+
+def test_cache_is_refused_with_several_workers(monkeypatch):
+    assert SessionStateStore(100).max_entries == 100
+    monkeypatch.setattr(session_store, "WS_BROKER", "unix")
+    assert SessionStateStore(100).max_entries == 0
+    monkeypatch.setattr(session_store, "WS_BROKER", "inprocess")
+    monkeypatch.setattr(session_store, "WEB_CONCURRENCY", 4)
+    assert SessionStateStore(100).max_entries == 0
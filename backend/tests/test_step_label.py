@@ -0,0 +1,21 @@
+import httpx
+import pytest
+
+from app import main, metrics
+from app.database import AsyncSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_does_not_leak_its_step_label(monkeypatch):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        session_id = (await client.post("/api/sessions")).json()["id"]
+
+    async def fail(*args, **kwargs):
+        assert metrics.current_step.get() == "zip_code"
+        raise RuntimeError("LLM is down")
+
+    monkeypatch.setattr(main.chatbot, "process_message", fail)
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(RuntimeError):
+            await main.run_turn(db, session_id, "94105", False)
+    assert metrics.current_step.get() == "none"
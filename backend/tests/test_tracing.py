@@ -0,0 +1,39 @@
+import asyncio
+import os
+import threading
+
+import httpx
+import pytest
+
+from app import tracing
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_profile_is_flushed_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "PROFILE_DIR", str(tmp_path))
+    flushed_on = []
+    stop = tracing.SamplingProfiler.stop
+
+    def record_thread(profiler):
+        flushed_on.append(threading.current_thread())
+        return stop(profiler)
+
+    monkeypatch.setattr(tracing.SamplingProfiler, "stop", record_thread)
+    with tracing.trace("GET /slow", profile=True) as current:
+        await asyncio.sleep(0.05)
+
+    path = current.attrs["profile"]
+    for _ in range(100):
+        if not tracing.profile_gate.active:
+            break
+        await asyncio.sleep(0.01)
+    assert not tracing.profile_gate.active
+    assert flushed_on and flushed_on[0] is not threading.current_thread()
+    assert os.path.dirname(path) == str(tmp_path) and os.path.exists(path)
+
+
+@pytest.mark.asyncio
+async def test_debug_traces_is_off_by_default():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/api/debug/traces")).status_code == 404
@@ -0,0 +1,51 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import ASYNC_DATABASE_URL
+from app.models import Message, Session
+from app.transcript_writer import TranscriptWriter
+
+
+def row(session_id: str, message_id: str = None) -> dict:
+    return {"id": message_id or str(uuid.uuid4()), "session_id": session_id, "sender": "user",
+            "content": "94105", "created_at": datetime.utcnow()}
+
+
+@pytest.mark.asyncio
+async def test_bad_row_is_dead_lettered_without_stalling_the_writer(tmp_path):
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    session_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        db.add(Session(id=session_id, status="active", current_step="zip_code", data={}))
+        db.add(Message(**row(session_id, "already-written")))
+        await db.commit()
+
+    dead_letter = tmp_path / "dead.ndjson"
+    writer = TranscriptWriter(AsyncSessionLocal, flush_interval_ms=10, batch_size=10, max_pending=5,
+                              max_retries=2, retry_max_seconds=0.02, dead_letter_path=str(dead_letter))
+    writer.start()
+    # The duplicate id fails every multi-row insert it is part of
+    good = [row(session_id) for _ in range(3)]
+    for message in [row(session_id, "already-written")] + good:
+        await writer.enqueue(message)
+    # Later writes still go through once the bad batch is dealt with
+    later = [row(session_id) for _ in range(10)]
+    for message in later:
+        await asyncio.wait_for(writer.enqueue(message), timeout=5)
+    await writer.stop()
+
+    async with AsyncSessionLocal() as db:
+        written = await db.scalar(select(func.count()).select_from(Message).where(Message.session_id == session_id))
+    assert written == 1 + len(good) + len(later)
+    assert writer.dead_lettered == 1
+    assert [json.loads(line)["id"] for line in dead_letter.read_text().splitlines()] == ["already-written"]
+    assert writer.pending_messages(session_id) == []
+    await engine.dispose()
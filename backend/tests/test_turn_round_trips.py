@@ -0,0 +1,102 @@
+import httpx
+import pytest
+from sqlalchemy import event, func, select
+
+from app import main
+from app.database import AsyncSessionLocal, async_engine
+from app.llm_providers import FakeProvider
+from app.models import Vehicle
+from app.session_store import SessionStateStore
+
+# From the ZIP code through the first vehicle; the commute miles answer
+# completes the vehicle and writes its row, the most expensive turn
+TURNS = [
+    ("94105", False), ("x", False), ("Jane Doe", True), ("jane@example.com", False), ("VIN", False),
+    ("2022 Toyota Camry Sedan", False), ("commuting", False), ("yes", False), ("5", False), ("12", True),
+]
+VEHICLE_TURN = "12"
+
+# Per turn: INSERT messages, UPDATE session, plus a SELECT for the session
+# unless its state is cached in process
+MAX_STATEMENTS_PER_TURN = 3
+MAX_CACHED_STATEMENTS_PER_TURN = 2
+# The vehicle turn also checks for an existing vehicle and INSERTs one
+VEHICLE_TURN_EXTRA_STATEMENTS = 2
+MAX_COMMITS_PER_TURN = 1
+
+
+class StubLLM:
+    providers = [FakeProvider(latency=0)]
+
+    async def complete(self, **params):
+        return "Thanks! Next question."
+
+    async def stream(self, **params):
+        yield "Thanks! Next question."
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    llm = StubLLM()
+    monkeypatch.setattr(main.chatbot, "llm", llm)
+    monkeypatch.setattr(main.chatbot.prompts, "llm", llm)
+
+
+@pytest.fixture
+def round_trips():
+    """Per turn: the first word of each SQL statement run, and the number of commits"""
+    seen = {"statements": [], "commits": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        seen["statements"].append(" ".join(statement.split()).upper())
+
+    def on_commit(conn):
+        seen["commits"] += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(async_engine.sync_engine, "commit", on_commit)
+    yield seen
+    event.remove(async_engine.sync_engine, "before_cursor_execute", on_execute)
+    event.remove(async_engine.sync_engine, "commit", on_commit)
+
+
+async def run_turns(round_trips) -> list:
+    """POST each turn to one new session and return the round trips of each"""
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        session_id = (await client.post("/api/sessions")).json()["id"]
+        for message, stream in TURNS:
+            round_trips["statements"], round_trips["commits"] = [], 0
+            response = await client.post("/api/messages", json={
+                "session_id": session_id, "message": message, "stream": stream
+            })
+            response.raise_for_status()
+            results.append((message, list(round_trips["statements"]), round_trips["commits"]))
+    async with AsyncSessionLocal() as db:
+        vehicles = await db.scalar(select(func.count()).select_from(Vehicle).where(Vehicle.session_id == session_id))
+    assert vehicles == 1
+    return results
+
+
+def budget(message: str, per_turn: int) -> int:
+    return per_turn + (VEHICLE_TURN_EXTRA_STATEMENTS if message == VEHICLE_TURN else 0)
+
+
+@pytest.mark.asyncio
+async def test_turn_is_one_transaction(stub_llm, round_trips):
+    for message, statements, commits in await run_turns(round_trips):
+        assert len(statements) <= budget(message, MAX_STATEMENTS_PER_TURN), (message, statements)
+        assert commits <= MAX_COMMITS_PER_TURN, message
+
+
+@pytest.mark.asyncio
+async def test_cached_session_state_skips_the_select(stub_llm, round_trips, monkeypatch):
+    monkeypatch.setattr(main, "session_store", SessionStateStore(100))
+    for message, statements, commits in await run_turns(round_trips):
+        assert not any(statement.startswith("SELECT") and "FROM SESSIONS" in statement for statement in statements), \
+            message
+        assert len(statements) <= budget(message, MAX_CACHED_STATEMENTS_PER_TURN), (message, statements)
+        assert commits <= MAX_COMMITS_PER_TURN, message
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app import wire
+from app.broker import InProcessBroker
+from app.websocket_manager import ConnectionManager
+
+
+class StalledWebSocket:
+    """Accepts the connection, then never finishes a send"""
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.Event().wait()
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoding", [wire.JSON, wire.MSGPACK])
+async def test_coalesce_merges_deltas_in_either_encoding(encoding):
+    manager = ConnectionManager(InProcessBroker(), queue_size=4, overflow_policy="coalesce",
+                                send_timeout=60, slow_consumer_seconds=60)
+    await manager.connect("s", StalledWebSocket(), encoding)
+    try:
+        for i in range(20):
+            await manager.broadcast("s", {"type": "message_delta", "message_id": "m", "delta": f"{i} "})
+        stats = manager.stats()
+        assert stats["dropped"] == 0 and stats["coalesced"] > 0
+
+        # Nothing is lost: the queue carries every delta the stalled sender has not taken, merged
+        queue = next(iter(manager._outboxes.values())).queue
+        assert len(queue) <= 4
+        assert all(isinstance(frame, bytes if encoding == wire.MSGPACK else str) for frame in queue)
+        deltas = "".join(wire.loads(frame)["delta"] for frame in queue).split()
+        assert len(deltas) >= 19 and deltas == [str(i) for i in range(20 - len(deltas), 20)]
+    finally:
+        await manager.disconnect_all()
@@ -1,5 +1,5 @@
-import { useState, useEffect, useCallback } from 'react';
-import type { Session, Message } from '../types';
+import { useState, useEffect, useCallback, useRef } from 'react';
+import type { Session, Message, WebSocketMessage, ChatResponse } from '../types';
 import { api } from '../services/api';
 import { websocketService } from '../services/websocket';
 
@@ -9,31 +9,43 @@ export const useChat = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [isTyping, setIsTyping] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const messagesRef = useRef<Message[]>([]);
+  messagesRef.current = messages;
 
   // Initialize session
-  const initializeSession = useCallback(async () => {
+  const initializeSession = useCallback(async (existingSessionId?: string) => {
     try {
       setIsLoading(true);
       setError(null);
       
-      // Create new session
-      const newSession = await api.createSession();
+      // Resume an existing session from one snapshot, or create a new one
+      // whose response already carries the greeting
+      let newSession: Session;
+      let initialMessages: Message[];
+      if (existingSessionId) {
+        const snapshot = await api.getSnapshot(existingSessionId);
+        newSession = snapshot.session;
+        initialMessages = snapshot.messages;
+      } else {
+        newSession = await api.createSession();
+        initialMessages = newSession.greeting ? [newSession.greeting] : [];
+      }
       setSession(newSession);
+      setMessages(initialMessages);
       
       // Connect WebSocket
+      websocketService.setLastMessageId(() => messagesRef.current[messagesRef.current.length - 1]?.id);
       websocketService.connect(newSession.id);
       
-      // Load initial messages
-      const initialMessages = await api.getMessages(newSession.id);
-      setMessages(initialMessages);
-      
       // Set up WebSocket listener
-      const handleWebSocketMessage = (wsMessage: any) => {
+      const handleWebSocketMessage = (wsMessage: WebSocketMessage) => {
         if (wsMessage.type === 'message') {
           setMessages(prev => {
-            // Check if message already exists (prevent duplicates)
+            // Replace a streamed draft with the final message (prevents duplicates)
             const exists = prev.some(msg => msg.id === wsMessage.message.id);
-            if (exists) return prev;
+            if (exists) {
+              return prev.map(msg => msg.id === wsMessage.message.id ? wsMessage.message : msg);
+            }
             
             return [...prev, wsMessage.message];
           });
@@ -42,6 +54,38 @@ export const useChat = () => {
           if (wsMessage.message.sender === 'bot') {
             setIsTyping(false);
           }
+        } else if (wsMessage.type === 'message_delta') {
+          setMessages(prev => {
+            const exists = prev.some(msg => msg.id === wsMessage.message_id);
+            if (exists) {
+              return prev.map(msg => msg.id === wsMessage.message_id
+                ? { ...msg, content: msg.content + wsMessage.delta }
+                : msg);
+            }
+            
+            // First delta starts a draft bot message
+            return [...prev, {
+              id: wsMessage.message_id,
+              session_id: newSession.id,
+              sender: 'bot',
+              content: wsMessage.delta,
+              created_at: new Date().toISOString(),
+            }];
+          });
+          
+          // Stop typing indicator on the first token
+          setIsTyping(false);
+        } else if (wsMessage.type === 'resync') {
+          if (wsMessage.since) {
+            // Only the missed messages were sent; append the ones we lack
+            setMessages(prev => {
+              const known = new Set(prev.map(msg => msg.id));
+              return [...prev, ...wsMessage.messages.filter(msg => !known.has(msg.id))];
+            });
+          } else {
+            setMessages(wsMessage.messages);
+          }
+          setSession(wsMessage.session);
         }
       };
       
@@ -66,8 +110,20 @@ export const useChat = () => {
       setIsTyping(true);
       setError(null);
       
-      // Send message to API
-      const response = await api.sendMessage(session.id, message);
+      // Send over the WebSocket when it is open, saving an HTTP round trip
+      let response: ChatResponse;
+      if (websocketService.isOpen()) {
+        const reply = await websocketService.request({ type: 'user_message', message });
+        if (reply.type === 'error') {
+          throw new Error(reply.detail);
+        }
+        if (reply.type !== 'turn_complete') {
+          throw new Error(`Unexpected reply: ${reply.type}`);
+        }
+        response = reply;
+      } else {
+        response = await api.sendMessage(session.id, message);
+      }
       
       // Update session status if changed
       if (response.session_status !== session.status) {
@@ -1,6 +1,6 @@
 import axios from 'axios';
 import type { AxiosInstance } from 'axios';
-import type { Session, Message, ChatRequest, ChatResponse } from '../types';
+import type { Session, Message, ChatRequest, ChatResponse, MessagePageParams, SessionSnapshot } from '../types';
 
 class ApiService {
   private client: AxiosInstance;
@@ -34,17 +34,26 @@ class ApiService {
     return response.data;
   }
 
+  // Session state, latest messages and vehicles in one request
+  async getSnapshot(sessionId: string, limit?: number): Promise<SessionSnapshot> {
+    const response = await this.client.get<SessionSnapshot>(`/api/sessions/${sessionId}/snapshot`, {
+      params: { limit },
+    });
+    return response.data;
+  }
+
   // Message endpoints
-  async sendMessage(sessionId: string, message: string): Promise<ChatResponse> {
+  async sendMessage(sessionId: string, message: string, stream = true): Promise<ChatResponse> {
     const response = await this.client.post<ChatResponse>('/api/messages', {
       session_id: sessionId,
       message,
+      stream,
     } as ChatRequest);
     return response.data;
   }
 
-  async getMessages(sessionId: string): Promise<Message[]> {
-    const response = await this.client.get<Message[]>(`/api/messages/${sessionId}`);
+  async getMessages(sessionId: string, params?: MessagePageParams): Promise<Message[]> {
+    const response = await this.client.get<Message[]>(`/api/messages/${sessionId}`, { params });
     return response.data;
   }
 }
@@ -1,4 +1,6 @@
-import type { WebSocketMessage } from '../types';
+import type { ClientFrame, WebSocketMessage } from '../types';
+
+type Reply = Extract<WebSocketMessage, { reply_to: string | null }>;
 
 export class WebSocketService {
   private ws: WebSocket | null = null;
@@ -6,6 +8,9 @@ export class WebSocketService {
   private maxReconnectAttempts = 5;
   private reconnectTimeout = 3000;
   private listeners: ((message: WebSocketMessage) => void)[] = [];
+  private pending = new Map<string, { resolve: (reply: Reply) => void; reject: (error: Error) => void }>();
+  private nextId = 0;
+  private lastMessageId: () => string | undefined = () => undefined;
 
   connect(sessionId: string) {
     const wsUrl = `${import.meta.env.VITE_WS_URL || 'ws://localhost:8000'}/ws/${sessionId}`;
@@ -15,12 +20,17 @@ export class WebSocketService {
       
       this.ws.onopen = () => {
         console.log('WebSocket connected');
+        if (this.reconnectAttempts > 0) {
+          // Catch up on anything broadcast while we were disconnected
+          this.send({ type: 'resync', since: this.lastMessageId() });
+        }
         this.reconnectAttempts = 0;
       };
 
       this.ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data) as WebSocketMessage;
+          this.resolvePending(data);
           this.notifyListeners(data);
         } catch (error) {
           console.error('Failed to parse WebSocket message:', error);
@@ -33,6 +43,7 @@ export class WebSocketService {
 
       this.ws.onclose = () => {
         console.log('WebSocket disconnected');
+        this.rejectPending(new Error('WebSocket disconnected'));
         this.attemptReconnect(sessionId);
       };
     } catch (error) {
@@ -53,12 +64,59 @@ export class WebSocketService {
 
   disconnect() {
     if (this.ws) {
+      this.ws.onclose = null;
       this.ws.close();
       this.ws = null;
     }
+    this.rejectPending(new Error('WebSocket disconnected'));
     this.listeners = [];
   }
 
+  // Tell the service how to find the newest message the client has, so a
+  // reconnect only fetches what it missed
+  setLastMessageId(lastMessageId: () => string | undefined) {
+    this.lastMessageId = lastMessageId;
+  }
+
+  isOpen() {
+    return this.ws?.readyState === WebSocket.OPEN;
+  }
+
+  send(frame: ClientFrame) {
+    if (!this.ws || !this.isOpen()) {
+      throw new Error('WebSocket is not connected');
+    }
+    this.ws.send(JSON.stringify(frame));
+  }
+
+  // Send a frame and resolve with the server frame that replies to it
+  request(frame: ClientFrame): Promise<Reply> {
+    const id = `${Date.now()}-${this.nextId++}`;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      try {
+        this.send({ ...frame, id });
+      } catch (error) {
+        this.pending.delete(id);
+        reject(error);
+      }
+    });
+  }
+
+  private resolvePending(message: WebSocketMessage) {
+    if (!('reply_to' in message) || message.reply_to === null) return;
+    const pending = this.pending.get(message.reply_to);
+    if (pending) {
+      this.pending.delete(message.reply_to);
+      pending.resolve(message);
+    }
+  }
+
+  private rejectPending(error: Error) {
+    this.pending.forEach(({ reject }) => reject(error));
+    this.pending.clear();
+  }
+
   addMessageListener(listener: (message: WebSocketMessage) => void) {
     this.listeners.push(listener);
   }
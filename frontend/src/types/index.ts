@@ -1,10 +1,12 @@
 // Session types
 export interface Session {
   id: string;
-  status: 'active' | 'completed';
+  status: 'active' | 'completed' | 'abandoned';
   current_step: string;
   created_at: string;
   data?: Record<string, any>;
+  // Only set on a newly created session
+  greeting?: Message | null;
 }
 
 // Message types
@@ -16,24 +18,92 @@ export interface Message {
   created_at: string;
 }
 
+export interface Vehicle {
+  id: string;
+  session_id: string;
+  vin?: string | null;
+  year?: number | null;
+  make?: string | null;
+  body_type?: string | null;
+  vehicle_use: string;
+  blind_spot_warning: boolean;
+  commute_days_per_week?: number | null;
+  commute_one_way_miles?: number | null;
+  annual_mileage?: number | null;
+  created_at: string;
+}
+
+export interface SessionSnapshot {
+  session: Session;
+  messages: Message[];
+  vehicles: Vehicle[];
+  has_more: boolean;
+  prev_cursor: string | null;
+  next_cursor: string | null;
+}
+
 // API Request/Response types
 export interface ChatRequest {
   session_id: string;
   message: string;
+  stream?: boolean;
 }
 
 export interface ChatResponse {
   message: string;
   current_step: string;
-  session_status: 'active' | 'completed';
+  session_status: 'active' | 'completed' | 'abandoned';
+  ttft_ms?: number | null;
 }
 
-// WebSocket message type
-export interface WebSocketMessage {
-  type: 'message';
-  message: Message;
+// Query parameters for paging through GET /api/messages/{session_id}
+export interface MessagePageParams {
+  after?: string;
+  before?: string;
+  since?: string;
+  limit?: number;
 }
 
+// WebSocket message types
+export type WebSocketMessage =
+  | {
+      type: 'message';
+      message: Message;
+      ttft_ms?: number | null;
+    }
+  | {
+      type: 'message_delta';
+      message_id: string;
+      delta: string;
+    }
+  | ({
+      type: 'turn_complete';
+      reply_to: string | null;
+    } & ChatResponse)
+  | {
+      type: 'pong';
+      reply_to: string | null;
+    }
+  | {
+      type: 'resync';
+      reply_to: string | null;
+      // Set when only messages after this id were sent
+      since: string | null;
+      session: Session;
+      messages: Message[];
+    }
+  | {
+      type: 'error';
+      reply_to: string | null;
+      detail: string;
+    };
+
+// Frames the client sends over the session WebSocket
+export type ClientFrame =
+  | { type: 'user_message'; id?: string; message: string; stream?: boolean }
+  | { type: 'ping'; id?: string }
+  | { type: 'resync'; id?: string; since?: string };
+
 // Component props types
 export interface ChatInterfaceProps {
   sessionId?: string;